@@ -0,0 +1,238 @@
+"""
+MARGEN AI - AI Response Cache
+Content-addressed cache for Gemini responses with pluggable storage backends
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_prompt(prompt):
+    """Collapse whitespace so cosmetic prompt differences share one cache entry"""
+    return _WHITESPACE_RE.sub(' ', prompt).strip()
+
+
+def make_cache_key(model_name, prompt, prompt_version=None):
+    """Content address for a prompt: sha256 of the model name, the prompt template's
+    version id (so a template change never serves answers to the old one) and the
+    normalized prompt"""
+    digest = hashlib.sha256()
+    digest.update(model_name.encode('utf-8'))
+    digest.update(b'\0')
+    if prompt_version:
+        digest.update(prompt_version.encode('utf-8'))
+        digest.update(b'\0')
+    digest.update(normalize_prompt(prompt).encode('utf-8'))
+    return digest.hexdigest()
+
+
+# -----------------------------------------------------------------------------
+# Storage Backends
+# -----------------------------------------------------------------------------
+
+class MemoryBackend:
+    """In-process LRU store, bounded by entry count"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key, allow_expired=False):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time() and not allow_expired:
+                # Kept until LRU eviction so it can still be served while Gemini is down
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """Cache table stored in a SQLite file, shared by every worker process on the host"""
+
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS ai_response_cache ('
+            ' cache_key TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL,'
+            ' last_access REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_ai_response_cache_last_access ON ai_response_cache (last_access)')
+        conn.commit()
+
+    def _connection(self):
+        # sqlite3 connections cannot be shared across threads, so keep one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, allow_expired=False):
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute(
+            'SELECT value, expires_at FROM ai_response_cache WHERE cache_key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now and not allow_expired:
+            # Expired rows are evicted first once the table is full
+            return None
+        conn.execute('UPDATE ai_response_cache SET last_access = ? WHERE cache_key = ?', (now, key))
+        conn.commit()
+        return row[0]
+
+    def set(self, key, value, ttl):
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            'INSERT OR REPLACE INTO ai_response_cache (cache_key, value, expires_at, last_access) VALUES (?, ?, ?, ?)',
+            (key, value, now + ttl, now)
+        )
+        count = conn.execute('SELECT COUNT(*) FROM ai_response_cache').fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            # Expired rows go first, then the least recently read ones
+            conn.execute(
+                'DELETE FROM ai_response_cache WHERE cache_key IN ('
+                ' SELECT cache_key FROM ai_response_cache'
+                ' ORDER BY expires_at > ?, last_access LIMIT ?)',
+                (now, overflow)
+            )
+            self.evictions += overflow
+        conn.commit()
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM ai_response_cache').fetchone()[0]
+
+
+class RedisBackend:
+    """Redis-compatible store; eviction is left to the server's maxmemory policy"""
+
+    def __init__(self, url, prefix='margen:ai:'):
+        import redis  # Optional dependency, only needed for this backend
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.evictions = 0
+
+    def get(self, key, allow_expired=False):
+        # Redis drops keys at their TTL, so there is nothing stale to fall back on
+        value = self._client.get(self.prefix + key)
+        return value.decode('utf-8') if value is not None else None
+
+    def set(self, key, value, ttl):
+        self._client.setex(self.prefix + key, int(ttl), value)
+
+    def __len__(self):
+        return sum(1 for _ in self._client.scan_iter(match=self.prefix + '*'))
+
+
+# -----------------------------------------------------------------------------
+# Cache Front-End
+# -----------------------------------------------------------------------------
+
+class ResponseCache:
+    """Keys responses by model name and normalized prompt, with per-route TTLs and hit/miss counters"""
+
+    def __init__(self, backend, route_ttls=None, default_ttl=3600):
+        self.backend = backend
+        self.route_ttls = route_ttls or {}
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _count(self, route, field):
+        with self._lock:
+            route_stats = self._stats.setdefault(route, {'hits': 0, 'misses': 0, 'stale': 0, 'errors': 0})
+            route_stats[field] += 1
+
+    def get(self, route, key):
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            # A broken cache must never take an AI route down with it
+            print(f"Cache Error in {route}: {e}")
+            self._count(route, 'errors')
+            return None
+        self._count(route, 'hits' if value is not None else 'misses')
+        return value
+
+    def get_stale(self, route, key):
+        """Last stored answer even if its TTL has passed, for when Gemini is unavailable"""
+        try:
+            value = self.backend.get(key, allow_expired=True)
+        except Exception as e:
+            print(f"Cache Error in {route}: {e}")
+            self._count(route, 'errors')
+            return None
+        if value is not None:
+            self._count(route, 'stale')
+        return value
+
+    def set(self, route, key, value):
+        ttl = self.route_ttls.get(route, self.default_ttl)
+        if ttl <= 0:
+            return
+        try:
+            self.backend.set(key, value, ttl)
+        except Exception as e:
+            print(f"Cache Error in {route}: {e}")
+            self._count(route, 'errors')
+
+    def stats(self):
+        with self._lock:
+            routes = {route: dict(counts) for route, counts in self._stats.items()}
+        hits = sum(r['hits'] for r in routes.values())
+        misses = sum(r['misses'] for r in routes.values())
+        return {
+            'backend': type(self.backend).__name__,
+            'entries': len(self.backend),
+            'evictions': self.backend.evictions,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            'routes': routes
+        }
+
+
+def create_cache_from_env(default_sqlite_path, route_ttls=None):
+    """Build the cache selected by AI_CACHE_BACKEND (memory, sqlite or redis)"""
+    backend_name = os.getenv('AI_CACHE_BACKEND', 'memory').lower()
+    max_entries = int(os.getenv('AI_CACHE_MAX_ENTRIES', '1024'))
+    if backend_name == 'sqlite':
+        backend = SQLiteBackend(os.getenv('AI_CACHE_SQLITE_PATH', default_sqlite_path), max_entries=max_entries)
+    elif backend_name == 'redis':
+        backend = RedisBackend(os.getenv('AI_CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+    else:
+        backend = MemoryBackend(max_entries=max_entries)
+    return ResponseCache(backend, route_ttls=route_ttls, default_ttl=int(os.getenv('AI_CACHE_DEFAULT_TTL', '3600')))
@@ -1,29 +1,69 @@
 import os
-import random
+import sys
+
+if __name__ == '__main__':
+    # `python Backend/app.py` (development server). Start-up runs in the imported `app`
+    # module and __main__ is swapped for an empty module first: the password hashing pool
+    # spawns processes that re-import __main__, and they must not create tables, start
+    # background threads or call Gemini again.
+    import types
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    from app import app as dev_app
+    dev_app.run(debug=True, port=5001)
+    sys.exit(0)
+
 import json
-from flask import Flask, request, jsonify, render_template
-from flask_sqlalchemy import SQLAlchemy
+import secrets
+import time
+from datetime import datetime, timedelta
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from flask_cors import CORS
 from twilio.rest import Client
 import google.generativeai as genai
 from dotenv import load_dotenv
-import re
-from werkzeug.security import generate_password_hash, check_password_hash
+from ai_cache import create_cache_from_env, make_cache_key
+from single_flight import SingleFlight
+from model_client import ModelUnavailableError, create_model_client_from_env, request_options
+from request_metrics import RequestMetrics, usage_tokens
+from structured_output import CAREER_BATCH_SCHEMA, CAREER_LIST_SCHEMA, PROJECT_PITCH_SCHEMA, ROADMAP_SCHEMA, ParseStats, ResponseFormat
+
+# The shared schema (database_models.py) lives in the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from database_models import db, User, migrate_ai_interactions, migrate_career_recommendations, migrate_roadmaps, upsert_career_recommendations
+from buffered_logging import BufferedEventWriter
+from sqlite_tuning import configure_sqlite, install_sqlite_pragmas
+from roadmap_store import RoadmapStore, normalize_career_title, validate_roadmap
+from skill_index import CareerSkillCatalog, analyze_roadmap, parse_user_skills
+from career_index import CareerIndex, match_scores
+from interview_sessions import InterviewSessionConflict, InterviewSessionStore, conversation_turns
+from career_batches import BATCH_PROMPT, CareerBatchRunner, normalize_profile
+from job_queue import FINISHED, JobQueue, JobWorker, webhook_allowed
+from otp_store import OTPStore, load_or_create_secret, migrate_otp_table
+from credentials import CredentialService, CredentialServiceBusy
+from session_tokens import SessionTokens
+from session_auth import RevocationList, SessionAuth, UserCache
+from http_cache import IMMUTABLE, HttpCaching, StaticBundle, etag_matches
+from prompt_registry import PromptRegistry, PromptTemplate
+from profile_store import (ProfileConflict, load_profile_version, load_recommendations, load_user_profile, merge_patch,
+                           migrate_legacy_users, profile_etag, save_user_profile, stored_profile, user_with_profile)
 
 # --- 1. INITIALIZATION & CONFIGURATION ---
 load_dotenv()
 # A more robust way to define the template folder
 # New, corrected line
 app = Flask(__name__, template_folder='../Frontend')
-CORS(app) 
+CORS(app, expose_headers=["ETag", "Retry-After", "Location"])
 
 # Database Configuration
 # Using an absolute path is more reliable for web servers.
 # It will create the database file in the same directory as this script.
 basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'users.db')
+# SQLITE_PROFILE=production (default) enables WAL, synchronous=NORMAL, busy_timeout,
+# mmap/cache sizing and pooled connections, plus a read-only pool for read-heavy routes.
+configure_sqlite(app, os.path.join(basedir, 'users.db'))
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db = SQLAlchemy(app)
+db.init_app(app)
+install_sqlite_pragmas(app, db)
 
 # Twilio Configuration
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
@@ -32,65 +72,265 @@ TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
 twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN) if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN else None
 
 # Gemini AI Configuration
+GEMINI_MODEL_NAME = 'gemini-1.5-flash-latest'
+
+def gemini_transport():
+    """Picks the Gemini transport. grpc's C core blocks the gevent hub, so when the
+    worker has patched sockets (see gunicorn.conf.py) the SDK talks REST instead."""
+    transport = os.getenv('GEMINI_TRANSPORT')
+    if transport:
+        return transport
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched('socket'):
+            return 'rest'
+    except ImportError:
+        pass
+    return None
+
 try:
     gemini_api_key = os.getenv("GEMINI_API_KEY")
     if not gemini_api_key:
         raise ValueError("GEMINI_API_KEY not found in environment variables.")
-    genai.configure(api_key=gemini_api_key)
-    model = genai.GenerativeModel('gemini-1.5-flash-latest')
+    genai.configure(api_key=gemini_api_key, transport=gemini_transport())
+    model = genai.GenerativeModel(GEMINI_MODEL_NAME)
 except Exception as e:
     print(f"Error configuring Gemini API: {e}")
     model = None
 
 # --- 2. DATABASE MODELS ---
-class User(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    email = db.Column(db.String(120), unique=True, nullable=False)
-    password = db.Column(db.String(256), nullable=False)
-    # New field to store user profile data as JSON
-    profile_data = db.Column(db.Text, nullable=True)
-
-class OTP(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    phone = db.Column(db.String(20), unique=True, nullable=False)
-    otp_code = db.Column(db.String(6), nullable=False)
+# Users, OTPs, profiles and recommendations all use the normalized schema in database_models.py.
+# Accounts from the old single-table `user` model are copied over on start.
+OTP_TTL = timedelta(minutes=int(os.getenv('OTP_TTL_MINUTES', '10')))
 
 with app.app_context():
     db.create_all()
+    migrated = migrate_legacy_users()
+    if migrated:
+        print(f"Migrated {migrated} legacy user accounts")
+    if migrate_otp_table():
+        print("Recreated the otps table for hashed codes")
+    if migrate_ai_interactions():
+        print("Added prompt_version to ai_interactions")
+    if migrate_roadmaps():
+        print("Added generated to roadmaps")
+    if migrate_career_recommendations():
+        print("Removed duplicate career recommendations and made (user, career) unique")
+
+# OTP codes are stored hashed; expired and used codes are swept every OTP_SWEEP_INTERVAL seconds.
+# Without OTP_SECRET a random secret is generated once and kept in OTP_SECRET_FILE, next to
+# (not inside) users.db, so every worker and restart uses the same one.
+otp_store = OTPStore(
+    app,
+    OTP_TTL,
+    secret=os.getenv('OTP_SECRET') or load_or_create_secret(os.getenv('OTP_SECRET_FILE', os.path.join(basedir, '.otp_secret'))),
+    max_attempts=int(os.getenv('OTP_MAX_ATTEMPTS', '5')),
+    sweep_interval=int(os.getenv('OTP_SWEEP_INTERVAL', '300'))
+)
+otp_store.start_sweeper()
+
+# Password hashing runs in its own process pool so a login storm does not hold the GIL;
+# PASSWORD_HASH_METHOD takes a werkzeug method string, e.g. 'scrypt:65536:8:1'
+credential_service = CredentialService(
+    method=os.getenv('PASSWORD_HASH_METHOD', 'scrypt'),
+    workers=int(os.getenv('CREDENTIAL_WORKERS', '2')),
+    max_pending=int(os.getenv('CREDENTIAL_MAX_PENDING', '64')),
+    cache_seconds=int(os.getenv('CREDENTIAL_CACHE_SECONDS', '300'))
+)
+
+SESSION_SECRET = os.getenv('SESSION_SECRET')
+if not SESSION_SECRET:
+    print("SESSION_SECRET is not set: session tokens only work within this process until it restarts")
+    SESSION_SECRET = secrets.token_hex(32)
+session_tokens = SessionTokens(SESSION_SECRET, ttl_seconds=int(os.getenv('SESSION_TTL_MINUTES', '60')) * 60)
+
+# Authenticated routes take 'Authorization: Bearer <token>'; the user comes from the token
+# and an in-process LRU, and sign-outs reach every worker within TOKEN_REVOCATION_REFRESH_SECONDS
+# (a read-only poll); rows of expired tokens are purged every TOKEN_REVOCATION_PURGE_SECONDS
+session_auth = SessionAuth(
+    session_tokens,
+    RevocationList(app, refresh_interval=int(os.getenv('TOKEN_REVOCATION_REFRESH_SECONDS', '5')),
+                   purge_interval=int(os.getenv('TOKEN_REVOCATION_PURGE_SECONDS', '3600'))),
+    UserCache(max_entries=int(os.getenv('USER_CACHE_MAX_ENTRIES', '10000')),
+              ttl=int(os.getenv('USER_CACHE_TTL', '300')))
+)
+session_auth.revocations.start()
+
+def credential_busy_response(error):
+    """503 with Retry-After when the hashing queue is full"""
+    response = jsonify({"error": "Too many sign-ins right now. Please try again in a moment."})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
+def session_response(message, identifier, user_id):
+    """Login response with a signed session token for later authenticated calls"""
+    return jsonify({"message": message, "identifier": identifier, "token": session_tokens.issue(user_id, identifier),
+                    "expiresIn": session_tokens.ttl_seconds})
+
+# AI interactions and analytics events are queued and bulk-written by a background thread
+event_log = BufferedEventWriter(
+    max_queue=int(os.getenv('EVENT_LOG_MAX_QUEUE', '10000')),
+    batch_size=int(os.getenv('EVENT_LOG_BATCH_SIZE', '500')),
+    policy=os.getenv('EVENT_LOG_POLICY', 'drop')
+)
+event_log.init_app(app)
+
+# AI Response Cache Configuration
+# Seconds to keep a generated answer per route. Open-ended answers (roadmaps, future scope)
+# are shared across many users, so they live longest.
+AI_CACHE_TTLS = {
+    '/find-interests': 24 * 3600,
+    '/generate-careers': 6 * 3600,
+    '/generate-roadmap': 7 * 24 * 3600,
+    '/generate-future-scope': 7 * 24 * 3600,
+    '/generate-project-pitch': 24 * 3600,
+}
+ai_cache = create_cache_from_env(os.path.join(basedir, 'users.db'), route_ttls=AI_CACHE_TTLS)
+# Identical prompts that miss the cache at the same moment share one Gemini call
+model_calls = SingleFlight()
+
+# Every Gemini call goes through the rate limiter, retry/backoff and circuit breaker.
+# Seconds each route may spend on one answer, including retries and rate-limit waits.
+MODEL_DEADLINES = {
+    '/find-interests': 20,
+    '/generate-careers': 30,
+    '/generate-careers/batch': 120,
+    '/generate-roadmap': 60,
+    '/generate-future-scope': 90,
+    '/generate-project-pitch': 20,
+    '/start-interview': 20,
+    '/continue-interview': 30,
+}
+model_client = create_model_client_from_env(os.path.join(basedir, 'users.db'), route_deadlines=MODEL_DEADLINES)
+
+# Per-route latency (queue/db/model/app phases), tokens, cost, cache results and response
+# sizes, served at /metrics. Model calls of a sampled fraction of requests go to ai_interactions.
+# Prices are USD per million tokens, used for the estimated cost counter.
+request_metrics = RequestMetrics(
+    sample_rate=float(os.getenv('METRICS_SAMPLE_RATE', '0.1')),
+    input_price_per_million=float(os.getenv('MODEL_PRICE_INPUT_PER_MILLION', '0.075')),
+    output_price_per_million=float(os.getenv('MODEL_PRICE_OUTPUT_PER_MILLION', '0.30'))
+)
+request_metrics.init_app(app)
+model_client.add_observer(request_metrics.observe_model_call)
+
+# Cache-Control per route (GET routes not listed revalidate with their ETag, other methods
+# are not stored), strong ETags with 304s, and gzip/brotli above HTTP_COMPRESS_MIN_BYTES.
+# Registered after request_metrics so it records compressed sizes.
+CACHE_POLICIES = {
+    '/': 'no-cache',
+    '/assets/<path:filename>': IMMUTABLE,
+    '/profile': 'private, no-cache',
+    '/recommendations': 'private, no-cache',
+    '/jobs/<job_id>': 'no-store',
+    '/generate-careers/batch/<job_id>': 'no-store',
+    '/metrics': 'no-store',
+    '/ai-stats': 'no-store',
+}
+http_caching = HttpCaching(
+    CACHE_POLICIES,
+    min_size=int(os.getenv('HTTP_COMPRESS_MIN_BYTES', '1024')),
+    level=int(os.getenv('HTTP_COMPRESS_LEVEL', '6'))
+)
+http_caching.init_app(app)
+
+# Precompressed, fingerprinted frontend from `python Backend/build_frontend.py`, if built
+frontend_bundle = StaticBundle(os.path.join(basedir, '..', 'Frontend', 'dist'))
+
+def model_unavailable_response(error):
+    """503 with Retry-After when Gemini is throttled or the circuit is open"""
+    response = jsonify({"error": "The AI service is busy right now. Please try again in a moment."})
+    response.headers['Retry-After'] = str(max(1, int(error.retry_after or 5)))
+    return response, 503
 
 # --- 3. HELPER FUNCTION ---
-def clean_json_response(text):
-    """More robustly cleans the AI's response to extract valid JSON."""
-    match = re.search(r'```json\s*([\s\S]*?)\s*```', text)
-    if match:
-        return match.group(1).strip()
-    
-    # Find the first '[' or '{' and the last ']' or '}'
-    start_bracket_pos = text.find('[')
-    start_brace_pos = text.find('{')
-    
-    if start_bracket_pos == -1 and start_brace_pos == -1: return text
-    
-    start_pos = -1
-    if start_bracket_pos != -1 and start_brace_pos != -1: start_pos = min(start_bracket_pos, start_brace_pos)
-    elif start_bracket_pos != -1: start_pos = start_bracket_pos
-    else: start_pos = start_brace_pos
+# Prompt templates are compiled once at import. Their fixed text is counted with Gemini's
+# count_tokens in the background (once per template version) and user fields are cut to
+# PROMPT_MAX_FIELD_TOKENS each, then to the template's budget. The version id of each
+# template is part of the cache key, so editing a template never serves old answers.
+prompts = PromptRegistry(
+    count_tokens=lambda text: model.count_tokens(text).total_tokens if model else None,
+    max_field_tokens=int(os.getenv('PROMPT_MAX_FIELD_TOKENS', '200'))
+)
 
-    end_char = ']' if text[start_pos] == '[' else '}'
-    end_pos = text.rfind(end_char)
+def generate_content_cached(route, prompt, parse=None, refresh=False, response_format=None):
+    """Calls Gemini through the response cache with a rendered `prompt` from the registry.
+    `parse` validates the text before it is cached.
+    `response_format` asks Gemini for schema-conforming JSON and parses (and repairs) it locally.
+    `refresh` skips the lookup so a stale answer gets replaced."""
+    if response_format:
+        parse = response_format.parse
+    key = make_cache_key(GEMINI_MODEL_NAME, prompt.text, prompt.version)
+    text = None if refresh else ai_cache.get(route, key)
+    if text is not None:
+        request_metrics.observe_cache(route, 'hit')
+        return parse(text) if parse else text
+    if not refresh:
+        request_metrics.observe_cache(route, 'miss')
 
-    if end_pos > start_pos: return text[start_pos:end_pos + 1]
-    
-    return text
+    def call_model():
+        started = time.perf_counter()
+        config = response_format.generation_config if response_format else None
+        response = model_client.call(route, lambda timeout: model.generate_content(
+            prompt.text, generation_config=config, request_options=request_options(timeout)))
+        text = response.text
+        if request_metrics.sampled():
+            event_log.log_ai_interaction(None, route.strip('/'), prompt.text, text, GEMINI_MODEL_NAME,
+                                         tokens_used=sum(usage_tokens(response)) or None,
+                                         processing_time_ms=int((time.perf_counter() - started) * 1000),
+                                         prompt_version=prompt.version)
+        # Parse first so an unusable answer is never served to the next user
+        if response_format:
+            try:
+                value, outcome = response_format.parse_with_outcome(text)
+            except ValueError:
+                parse_stats.record(route, 'failed')
+                raise
+            parse_stats.record(route, outcome)
+            # Cache the repaired JSON, not the raw text
+            text = json.dumps(value)
+        else:
+            value = parse(text) if parse else text
+        if text:
+            ai_cache.set(route, key, text)
+        return value
+
+    try:
+        return model_calls.do(key, call_model, label=route)
+    except ModelUnavailableError:
+        # While Gemini is down, an expired answer beats an error page
+        stale = ai_cache.get_stale(route, key)
+        if stale is None:
+            raise
+        request_metrics.observe_cache(route, 'stale')
+        return parse(stale) if parse else stale
+
+# JSON routes use Gemini's structured output mode; answers are validated against these
+# schemas and truncated ones are repaired locally instead of regenerated.
+CAREER_LIST_FORMAT = ResponseFormat(CAREER_LIST_SCHEMA)
+CAREER_BATCH_FORMAT = ResponseFormat(CAREER_BATCH_SCHEMA)
+ROADMAP_FORMAT = ResponseFormat(ROADMAP_SCHEMA, validate=validate_roadmap)
+PROJECT_PITCH_FORMAT = ResponseFormat(PROJECT_PITCH_SCHEMA)
+parse_stats = ParseStats()
 
 # --- 4. API ROUTES ---
 
 # ADDED: Root route to serve the frontend HTML file
 @app.route('/')
 def index():
+    if frontend_bundle.available:
+        return frontend_bundle.response('index.html', CACHE_POLICIES['/'])
     # This tells Flask to find and return 'index2.html' from the 'templates' folder
     return render_template('index2.html')
 
+@app.route('/assets/<path:filename>')
+def frontend_asset(filename):
+    """Fingerprinted CSS/JS of the frontend bundle, precompressed"""
+    response = frontend_bundle.response(filename, IMMUTABLE) if filename != 'index.html' else None
+    if response is None:
+        return jsonify({"error": "Not found"}), 404
+    return response
+
 # --- AUTHENTICATION & USER DATA ROUTES ---
 @app.route('/signup', methods=['POST'])
 def signup():
@@ -100,8 +340,11 @@ def signup():
     if User.query.filter_by(email=data['email']).first():
         return jsonify({"error": "Email already exists"}), 409
         
-    hashed_password = generate_password_hash(data['password'])
-    new_user = User(email=data['email'], password=hashed_password)
+    try:
+        password_hash = credential_service.hash(data['password'])
+    except CredentialServiceBusy as e:
+        return credential_busy_response(e)
+    new_user = User(email=data['email'], password_hash=password_hash)
     db.session.add(new_user)
     db.session.commit()
     return jsonify({"message": "User created successfully"}), 201
@@ -112,9 +355,20 @@ def signin():
     if not data or 'email' not in data or 'password' not in data:
         return jsonify({"error": "Missing email or password"}), 400
     user = User.query.filter_by(email=data['email']).first()
-    if user and check_password_hash(user.password, data['password']):
-        return jsonify({"message": "Login successful", "identifier": user.email}), 200
-    return jsonify({"error": "Invalid credentials"}), 401
+    if not user:
+        return jsonify({"error": "Invalid credentials"}), 401
+    try:
+        ok, new_hash = credential_service.verify(user.password_hash, data['password'])
+    except CredentialServiceBusy as e:
+        return credential_busy_response(e)
+    if not ok:
+        return jsonify({"error": "Invalid credentials"}), 401
+    if new_hash:
+        # Hash method or cost changed since this password was stored
+        user.password_hash = new_hash
+    user.last_login = datetime.utcnow()
+    db.session.commit()
+    return session_response("Login successful", user.email, user.id), 200
 
 @app.route('/send-otp', methods=['POST'])
 def send_otp():
@@ -123,11 +377,8 @@ def send_otp():
     phone = data.get('phone')
     if not phone: return jsonify({"error": "Phone number is required"}), 400
 
-    otp_code = str(random.randint(100000, 999999))
-    existing_otp = OTP.query.filter_by(phone=phone).first()
-    if existing_otp: existing_otp.otp_code = otp_code
-    else: db.session.add(OTP(phone=phone, otp_code=otp_code))
-    db.session.commit()
+    # One live code per phone: a new request replaces the previous one
+    otp_code = otp_store.issue(phone)
     try:
         twilio_client.messages.create(body=f"Your MARGEN AI verification code is: {otp_code}", from_=TWILIO_PHONE_NUMBER, to=phone)
         return jsonify({"message": f"OTP sent to {phone}"}), 200
@@ -140,64 +391,218 @@ def verify_otp():
     data = request.get_json()
     if not data or 'phone' not in data or 'code' not in data:
         return jsonify({"error": "Phone number and OTP code are required"}), 400
-    otp_entry = OTP.query.filter_by(phone=data['phone'], otp_code=data['code']).first()
-    if otp_entry:
-        # OTP is correct, log the user in (or create an account if it doesn't exist)
+    outcome = otp_store.verify(data['phone'], data['code'])
+    if outcome == 'ok':
+        # OTP is correct: phones linked to an account get a session token too
+        user_id = db.session.query(User.id).filter(User.phone == data['phone']).scalar()
+        if user_id is not None:
+            return session_response("Login successful", data['phone'], user_id), 200
         return jsonify({"message": "Login successful", "identifier": data['phone']}), 200
+    if outcome == 'expired':
+        return jsonify({"error": "OTP code has expired. Please request a new one."}), 401
+    if outcome == 'locked':
+        return jsonify({"error": "Too many incorrect attempts. Please request a new code."}), 429
     return jsonify({"error": "Invalid OTP code"}), 401
 
+@app.route('/signout', methods=['POST'])
+@session_auth.required
+def signout():
+    """Revokes the session token the request was made with"""
+    session_auth.revoke_current()
+    return jsonify({"message": "Signed out"}), 200
+
 @app.route('/save-profile', methods=['POST'])
+@session_auth.required
 def save_profile():
     data = request.get_json()
-    email = data.get('email')
     profile_data = data.get('profile') # This will be the dict with interests, skills etc.
-    if not email or not profile_data:
-        return jsonify({"error": "Email and profile data are required"}), 400
+    if not profile_data:
+        return jsonify({"error": "Profile data is required"}), 400
     
-    user = User.query.filter_by(email=email).first()
-    if user:
-        user.profile_data = json.dumps(profile_data)
-        db.session.commit()
-        return jsonify({"message": "Profile saved successfully"}), 200
-    return jsonify({"error": "User not found"}), 404
+    if not isinstance(profile_data, dict):
+        return jsonify({"error": "Profile must be a JSON object"}), 400
+
+    user_id = session_auth.current_user()['id']
+    user = user_with_profile(db.session, user_id)
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+    try:
+        if save_user_profile(user, profile_data):
+            db.session.commit()
+            session_auth.users.invalidate(user_id)
+    except ProfileConflict:
+        db.session.rollback()
+        return jsonify({"error": "The profile was changed by another request. Please try again."}), 409
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in /save-profile: {e}")
+        return jsonify({"error": "Could not save the profile."}), 500
+    response = jsonify({"message": "Profile saved successfully", "version": user.profile_version})
+    response.set_etag(profile_etag(user_id, user.profile_version))
+    return response, 200
+
+@app.route('/profile', methods=['GET'])
+@session_auth.required
+def get_profile():
+    """
+    The saved profile with its normalized skills and interests. The ETag carries the
+    profile version: send it back in If-None-Match to get a 304 after one query.
+    """
+    user_id = session_auth.current_user()['id']
+    if request.if_none_match:
+        version = load_profile_version(user_id)
+        if version is not None and etag_matches(request.if_none_match, profile_etag(user_id, version)):
+            response = Response(status=304)
+            response.set_etag(profile_etag(user_id, version))
+            return response
+    profile = load_user_profile(user_id)
+    if profile is None:
+        return jsonify({"error": "User not found"}), 404
+    response = jsonify(profile)
+    response.set_etag(profile_etag(user_id, profile['version']))
+    return response
+
+@app.route('/profile', methods=['PATCH'])
+@session_auth.required
+def patch_profile():
+    """
+    Applies a JSON merge patch (RFC 7386) to the profile document: send only the fields
+    that changed, null to remove one. With If-Match set to the ETag from GET /profile the
+    patch is refused with 412 when the profile changed in the meantime.
+    """
+    patch = request.get_json(force=True, silent=True)
+    if not isinstance(patch, dict):
+        return jsonify({"error": "The patch must be a JSON object"}), 400
+
+    user_id = session_auth.current_user()['id']
+    user = user_with_profile(db.session, user_id)
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+    etag = profile_etag(user_id, user.profile_version)
+    if request.if_match and not etag_matches(request.if_match, etag):
+        response = jsonify({"error": "The profile has changed. Reload it and try again.",
+                            "version": user.profile_version})
+        response.set_etag(etag)
+        return response, 412
+
+    profile = merge_patch(stored_profile(user), patch)
+    try:
+        if save_user_profile(user, profile):
+            db.session.commit()
+            session_auth.users.invalidate(user_id)
+    except ProfileConflict:
+        db.session.rollback()
+        return jsonify({"error": "The profile has changed. Reload it and try again."}), 412
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in PATCH /profile: {e}")
+        return jsonify({"error": "Could not save the profile."}), 500
+    response = jsonify({"profile": profile, "version": user.profile_version})
+    response.set_etag(profile_etag(user_id, user.profile_version))
+    return response, 200
+
+@app.route('/recommendations', methods=['GET'])
+@session_auth.required
+def get_recommendations():
+    """The user's most recent career recommendations, newest first"""
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    return jsonify({"recommendations": load_recommendations(session_auth.current_user()['id'], limit=limit)})
 
 
 # --- CORE AI ROUTES ---
-@app.route('/find-interests', methods=['POST'])
-def find_interests():
-    if not model: return jsonify({"error": "AI model not configured"}), 500
-    data = request.get_json().get('answers', {})
-    prompt = f"""
+QUIZ_QUESTIONS = ('q1', 'q2', 'q3', 'q4', 'q5')
+prompts.register(PromptTemplate('find_interests', 1, """
     Analyze a user's personality based on their answers to an interest assessment quiz.
     Based on these answers, generate a comma-separated list of 3 to 5 highly relevant interests for them.
     The interests should be concise and professional (e.g., "Data Analysis, Creative Design, Project Management").
 
     User's Answers:
-    1. On a free weekend, they'd be: {data.get('q1', 'not answered')}
-    2. Fascinating topic: {data.get('q2', 'not answered')}
-    3. Enjoys tasks involving: {data.get('q3', 'not answered')}
-    4. New project idea: {data.get('q4', 'not answered')}
-    5. Comfortable working with: {data.get('q5', 'not answered')}
+    1. On a free weekend, they'd be: {q1}
+    2. Fascinating topic: {q2}
+    3. Enjoys tasks involving: {q3}
+    4. New project idea: {q4}
+    5. Comfortable working with: {q5}
 
     Respond ONLY with the comma-separated list of interests and nothing else.
-    """
+    """, budget=600, trim=QUIZ_QUESTIONS))
+
+@app.route('/find-interests', methods=['POST'])
+def find_interests():
+    if not model: return jsonify({"error": "AI model not configured"}), 500
+    data = request.get_json().get('answers', {})
+    prompt = prompts.render('find_interests', **{question: data.get(question, 'not answered') for question in QUIZ_QUESTIONS})
     try:
-        response = model.generate_content(prompt)
-        return jsonify({"interests": response.text.strip()})
+        text = generate_content_cached('/find-interests', prompt)
+        return jsonify({"interests": text.strip()})
+    except ModelUnavailableError as e:
+        return model_unavailable_response(e)
     except Exception as e:
         print(f"Gemini Error in /find-interests: {e}")
         return jsonify({"error": f"Could not analyze interests due to a server error."}), 500
 
-@app.route('/generate-careers', methods=['POST'])
-def generate_careers():
-    if not model: return jsonify({"error": "AI model not configured"}), 500
-    data = request.get_json()
-    prompt = f"""
+# Catalog careers are ranked locally against the vector index built by
+# `python Backend/career_index.py build`; Gemini is only asked for careers when
+# fewer than CAREER_MATCH_MIN_RESULTS catalog entries clear CAREER_MATCH_MIN_SCORE.
+career_index = CareerIndex.load()
+CAREER_MATCH_MIN_SCORE = float(os.getenv('CAREER_MATCH_MIN_SCORE', '0.25'))
+CAREER_MATCH_MIN_RESULTS = int(os.getenv('CAREER_MATCH_MIN_RESULTS', '3'))
+CAREER_MATCH_TOP_K = 7
+
+def rank_catalog_careers(interests, skills, min_score=None, min_results=None):
+    """Returns catalog (career, cosine) matches good enough to skip the LLM, or []."""
+    min_score = CAREER_MATCH_MIN_SCORE if min_score is None else min_score
+    min_results = CAREER_MATCH_MIN_RESULTS if min_results is None else min_results
+    global career_index
+    if career_index is None:
+        career_index = CareerIndex.load()
+        if career_index is None:
+            return []
+    career_index = career_index.reload_if_changed()
+    matches = [(career, score) for career, score in career_index.search(interests, skills, k=CAREER_MATCH_TOP_K)
+               if score >= min_score]
+    return matches if len(matches) >= min_results else []
+
+prompts.register(PromptTemplate('describe_careers', 1, """
+    Write a short, compelling description (around 15-20 words) of each of these career paths for a user
+    interested in "{interests}" with skills "{skills}":
+    {titles}
+
+    Respond ONLY with a JSON array of objects, one per career, each with its "title" and "description".
+    """, budget=700, trim=('interests', 'skills')))
+
+def describe_generated_careers(titles, data):
+    """One Gemini call for descriptions of catalog careers that only have a placeholder."""
+    prompt = prompts.render('describe_careers', interests=data.get('interests', 'Not specified'),
+                            skills=data.get('skills', 'Not specified'), titles=json.dumps(titles))
+    try:
+        careers = generate_content_cached('/generate-careers', prompt, response_format=CAREER_LIST_FORMAT)
+        return {career['title']: career['description'] for career in careers}
+    except Exception as e:
+        print(f"Gemini Error describing catalog careers: {e}")
+        return {}
+
+def save_recommendations(user_id, scored_careers):
+    """Stores catalog matches as CareerRecommendation rows for the signed-in user; a career
+    recommended again updates its row instead of adding another."""
+    rows = []
+    for career, (percentage, confidence) in scored_careers:
+        rows.append({
+            'user_id': user_id,
+            'career_id': career['id'],
+            'match_percentage': percentage,
+            'confidence_score': confidence,
+            'ai_reasons': json.dumps(["Matched your interests and skills against the career catalog"]),
+            'learning_priority': 'high' if percentage >= 70 else 'medium' if percentage >= 40 else 'low'
+        })
+    upsert_career_recommendations(rows)
+    db.session.commit()
+
+prompts.register(PromptTemplate('generate_careers', 1, """
     Based on the following user profile, generate a diverse list of 7 creative and professional career path recommendations.
-    - Interests: "{data.get('interests', 'Not specified')}"
-    - Skills: "{data.get('skills', 'Not specified')}"
-    - Preferred Pace: "{data.get('pace', 'Balanced')}"
-    - Life Goals: "{', '.join(data.get('lifeGoals', []))}"
+    - Interests: "{interests}"
+    - Skills: "{skills}"
+    - Preferred Pace: "{pace}"
+    - Life Goals: "{life_goals}"
 
     For each recommendation, provide a "title" and a short, compelling "description" (around 15-20 words).
     Respond ONLY with a valid JSON array of objects. Each object must have a "title" and a "description". Do not include any other text or markdown.
@@ -206,78 +611,276 @@ def generate_careers():
       {{"title": "AI Ethics Consultant", "description": "Guide companies in the responsible development and deployment of artificial intelligence systems."}},
       {{"title": "UX/UI Designer", "description": "Craft intuitive and visually appealing digital experiences for users."}}
     ]
-    """
+    """, budget=700, trim=('interests', 'skills', 'pace', 'life_goals')))
+
+@app.route('/generate-careers', methods=['POST'])
+def generate_careers():
+    data = request.get_json()
+
+    try:
+        matches = rank_catalog_careers(str(data.get('interests', '')), str(data.get('skills', '')))
+    except Exception as e:
+        print(f"Career index search failed: {e}")
+        matches = []
+    if matches:
+        scored = [(career, match_scores(score)) for career, score in matches]
+        generated = [career['title'] for career, _ in scored if career['generated']]
+        descriptions = describe_generated_careers(generated, data) if generated and model else {}
+        user = session_auth.current_user()
+        try:
+            if user:
+                save_recommendations(user['id'], scored)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Saving career recommendations failed: {e}")
+        return jsonify([
+            {
+                "title": career['title'],
+                "description": descriptions.get(career['title']) or career['description'],
+                "match_percentage": percentage,
+                "confidence_score": confidence
+            }
+            for career, (percentage, confidence) in scored
+        ])
+
+    if not model: return jsonify({"error": "AI model not configured"}), 500
+    prompt = prompts.render('generate_careers', interests=data.get('interests', 'Not specified'),
+                            skills=data.get('skills', 'Not specified'), pace=data.get('pace', 'Balanced'),
+                            life_goals=', '.join(data.get('lifeGoals', [])))
     try:
-        response = model.generate_content(prompt)
-        json_data = json.loads(clean_json_response(response.text))
+        json_data = generate_content_cached('/generate-careers', prompt, response_format=CAREER_LIST_FORMAT)
         return jsonify(json_data)
+    except ModelUnavailableError as e:
+        # Degraded answer: the closest catalog careers, even below the usual match bar
+        try:
+            matches = rank_catalog_careers(str(data.get('interests', '')), str(data.get('skills', '')), min_score=0.0, min_results=1)
+        except Exception:
+            matches = []
+        if not matches:
+            return model_unavailable_response(e)
+        return jsonify([
+            {
+                "title": career['title'],
+                "description": career['description'],
+                "match_percentage": percentage,
+                "confidence_score": confidence
+            }
+            for career, (percentage, confidence) in ((career, match_scores(score)) for career, score in matches)
+        ])
     except Exception as e:
         print(f"Gemini Error in /generate-careers: {e}")
         return jsonify({"error": f"AI returned an invalid response for careers. Please try again."}), 500
 
-@app.route('/generate-future-scope', methods=['POST'])
-def generate_future_scope():
-    try:
-        data = request.get_json()
-        career_title = data.get('careerTitle')
+prompts.register(PromptTemplate('future_scope', 1, """
+    You are an expert career analyst and technology futurist specializing in the Indian job market. The current year is 2025. Your task is to generate a comprehensive and encouraging "Future Scope in India" analysis for the career path of a: "{career_title}".
 
-        if not career_title:
-            return jsonify({'error': 'Career title is required'}), 400
+    The analysis must be structured, detailed, and exclusively focused on the Indian context. Format the entire output as clean Markdown.
+
+    Use the following structure with the specified headings and emojis:
+
+    ## 🇮🇳 Market Outlook & Demand
+    Provide a 2-3 paragraph summary of the current demand for this role in India. Is it a growing field? What are the key drivers for its growth (e.g., Digital India, startup ecosystem, global capability centers)?
+
+    ## 🏙️ Key Hiring Hubs
+    List the top 5-6 cities in India that are hotspots for this career, briefly explaining why (e.g., Bengaluru for its startup culture, Hyderabad for its pharma and tech parks).
 
-        # This is the high-quality prompt from our previous discussion
-        prompt = f"""
-        You are an expert career analyst and technology futurist specializing in the Indian job market. The current year is 2025. Your task is to generate a comprehensive and encouraging "Future Scope in India" analysis for the career path of a: "{career_title}".
+    ## 💰 Salary Projections (INR)
+    Provide estimated annual salary ranges in Indian Rupees (₹) for different experience levels. Use a Markdown table:
+    | Experience Level      | Salary Range (Per Annum) | Notes                               |
+    | --------------------- | ------------------------ | ----------------------------------- |
+    | Entry-Level (0-2 Yrs) | *Your Estimate* | Fresh graduates from top-tier colleges |
+    | Mid-Level (3-7 Yrs)   | *Your Estimate* | Strong portfolio, proven skills       |
+    | Senior-Level (8+ Yrs) | *Your Estimate* | Team leadership, architectural skills |
 
-        The analysis must be structured, detailed, and exclusively focused on the Indian context. Format the entire output as clean Markdown.
+    ## 🚀 Career Progression Path
+    Outline a typical career ladder for a professional in this field in India. For example: `Associate -> Senior {{career_title}} -> Lead {{career_title}} -> Principal/Architect -> Managerial roles`.
 
-        Use the following structure with the specified headings and emojis:
+    ## 🛠️ Essential & Future-Proofing Skills
+    Create two lists:
+    - **Core Skills for Today:** List the top 5-7 non-negotiable skills required right now.
+    - **Skills for Tomorrow (2027-2030):** List 3-5 emerging skills or technologies that professionals in this role should start learning to stay ahead in the Indian market.
 
-        ## 🇮🇳 Market Outlook & Demand
-        Provide a 2-3 paragraph summary of the current demand for this role in India. Is it a growing field? What are the key drivers for its growth (e.g., Digital India, startup ecosystem, global capability centers)?
+    ## 🏢 Top Companies Hiring in India
+    List a mix of 8-10 prominent companies hiring for this role in India. Include both major MNCs and leading Indian startups.
 
-        ## 🏙️ Key Hiring Hubs
-        List the top 5-6 cities in India that are hotspots for this career, briefly explaining why (e.g., Bengaluru for its startup culture, Hyderabad for its pharma and tech parks).
+    Conclude with a final, motivational paragraph summarizing why India is an exciting place for a "{career_title}" right now.
+    """, budget=1200, trim=('career_title',)))
 
-        ## 💰 Salary Projections (INR)
-        Provide estimated annual salary ranges in Indian Rupees (₹) for different experience levels. Use a Markdown table:
-        | Experience Level      | Salary Range (Per Annum) | Notes                               |
-        | --------------------- | ------------------------ | ----------------------------------- |
-        | Entry-Level (0-2 Yrs) | *Your Estimate* | Fresh graduates from top-tier colleges |
-        | Mid-Level (3-7 Yrs)   | *Your Estimate* | Strong portfolio, proven skills       |
-        | Senior-Level (8+ Yrs) | *Your Estimate* | Team leadership, architectural skills |
+def build_future_scope_prompt(career_title):
+    return prompts.render('future_scope', career_title=career_title)
 
-        ## 🚀 Career Progression Path
-        Outline a typical career ladder for a professional in this field in India. For example: `Associate -> Senior {{career_title}} -> Lead {{career_title}} -> Principal/Architect -> Managerial roles`.
+def sse_event(event, payload):
+    """Formats one Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
 
-        ## 🛠️ Essential & Future-Proofing Skills
-        Create two lists:
-        - **Core Skills for Today:** List the top 5-7 non-negotiable skills required right now.
-        - **Skills for Tomorrow (2027-2030):** List 3-5 emerging skills or technologies that professionals in this role should start learning to stay ahead in the Indian market.
+# Slow generations can run as background jobs: the jobs table lives in users.db and
+# job_worker.py claims and runs them, so web workers stay free for fast routes.
+job_queue = JobQueue(
+    db,
+    lease_seconds=int(os.getenv('JOB_LEASE_SECONDS', '300')),
+    max_attempts=int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+)
+JOB_WEBHOOK_HOSTS = {host.strip().lower() for host in os.getenv('JOB_WEBHOOK_HOSTS', '').split(',') if host.strip()}
 
-        ## 🏢 Top Companies Hiring in India
-        List a mix of 8-10 prominent companies hiring for this role in India. Include both major MNCs and leading Indian startups.
+def wants_async(data):
+    """Clients opt in with {"async": true} or a 'Prefer: respond-async' header."""
+    return data.get('async') is True or 'respond-async' in request.headers.get('Prefer', '')
 
-        Conclude with a final, motivational paragraph summarizing why India is an exciting place for a "{career_title}" right now.
-        """
+def enqueue_job(kind, payload, data):
+    """Queues a job and returns the 202 response pointing at /jobs/<id>."""
+    callback_url = data.get('callbackUrl')
+    if callback_url and not webhook_allowed(callback_url, JOB_WEBHOOK_HOSTS):
+        return jsonify({"error": "callbackUrl host is not allowed."}), 400
+    job = job_queue.enqueue(kind, payload, callback_url=callback_url)
+    status_url = f"/jobs/{job.id}"
+    response = jsonify({"jobId": job.id, "status": job.status, "statusUrl": status_url})
+    response.headers['Location'] = status_url
+    return response, 202
+
+# Cohort onboarding: profiles are packed BATCH_PACK_SIZE to a prompt and at most
+# BATCH_MAX_CONCURRENCY packed prompts run at once per worker process.
+BATCH_MAX_PROFILES = int(os.getenv('BATCH_MAX_PROFILES', '5000'))
+prompts.register(BATCH_PROMPT)
+career_batches = CareerBatchRunner(
+    lambda prompt: generate_content_cached('/generate-careers/batch', prompt, response_format=CAREER_BATCH_FORMAT),
+    prompts,
+    pack_size=int(os.getenv('BATCH_PACK_SIZE', '10')),
+    max_workers=int(os.getenv('BATCH_MAX_CONCURRENCY', '4'))
+)
+
+@app.route('/generate-careers/batch', methods=['POST'])
+def generate_careers_batch():
+    """
+    Starts career generation for a cohort. Send {profiles: [{email, interests, skills,
+    pace, lifeGoals}, ...]}; poll the returned job for progress and results.
+    """
+    if not model: return jsonify({"error": "AI model not configured"}), 500
+    data = request.get_json() or {}
+    profiles = data.get('profiles')
+    if not isinstance(profiles, list) or not profiles:
+        return jsonify({"error": "A non-empty 'profiles' list is required."}), 400
+    if len(profiles) > BATCH_MAX_PROFILES:
+        return jsonify({"error": f"At most {BATCH_MAX_PROFILES} profiles per batch."}), 400
+    try:
+        profiles = [normalize_profile(profile) for profile in profiles]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        response = model.generate_content(prompt)
+    return enqueue_job('career_batch', {'profiles': profiles}, data)
+
+@app.route('/generate-careers/batch/<job_id>', methods=['GET'])
+def career_batch_status(job_id):
+    """Kept for batch clients; same as GET /jobs/<job_id>."""
+    return job_status(job_id)
+
+@app.route('/generate-future-scope', methods=['POST'])
+def generate_future_scope():
+    try:
+        data = request.get_json()
+        career_title = data.get('careerTitle')
+
+        if not career_title:
+            return jsonify({'error': 'Career title is required'}), 400
+        if wants_async(data):
+            return enqueue_job('future_scope', {'careerTitle': career_title}, data)
+
+        prompt = build_future_scope_prompt(career_title)
+        scope = generate_content_cached('/generate-future-scope', prompt)
         
-        if not response.text:
+        if not scope:
              return jsonify({'error': 'Failed to generate content from AI model'}), 500
 
-        return jsonify({'scope': response.text})
+        return jsonify({'scope': scope})
 
+    except ModelUnavailableError as e:
+        return model_unavailable_response(e)
     except Exception as e:
         print(f"Error in /generate-future-scope: {e}")
         return jsonify({'error': 'An internal error occurred'}), 500
 
-@app.route('/generate-roadmap', methods=['POST'])
-def generate_roadmap():
+@app.route('/generate-future-scope/stream', methods=['POST'])
+def generate_future_scope_stream():
+    """
+    Streaming variant of /generate-future-scope. Sends the Markdown report as
+    Server-Sent Events ('chunk' frames with a 'text' field, then 'done' or 'error')
+    so the frontend can render sections while Gemini is still writing.
+    """
     if not model: return jsonify({"error": "AI model not configured"}), 500
-    data = request.get_json()
-    career_title = data.get('careerTitle', 'the selected career')
-    
-    prompt = f"""
+    data = request.get_json() or {}
+    career_title = data.get('careerTitle')
+    if not career_title:
+        return jsonify({'error': 'Career title is required'}), 400
+
+    route = '/generate-future-scope'
+    prompt = build_future_scope_prompt(career_title)
+    key = make_cache_key(GEMINI_MODEL_NAME, prompt.text, prompt.version)
+    cached = ai_cache.get(route, key)
+    request_metrics.observe_cache(route, 'hit' if cached is not None else 'miss')
+
+    def events():
+        # Flush headers and a first byte right away, before Gemini answers
+        yield ": stream open\n\n"
+        if cached is not None:
+            yield sse_event('chunk', {'text': cached})
+            yield sse_event('done', {'cached': True})
+            return
+
+        parts = []
+        started = time.perf_counter()
+        try:
+            stream = model_client.call(route, lambda timeout: model.generate_content(
+                prompt.text, stream=True, request_options=request_options(timeout)), stream=True)
+        except ModelUnavailableError as e:
+            stale = ai_cache.get_stale(route, key)
+            if stale is None:
+                yield sse_event('error', {'error': 'The AI service is busy right now. Please try again in a moment.',
+                                          'retryAfter': max(1, int(e.retry_after or 5))})
+                return
+            request_metrics.observe_cache(route, 'stale')
+            yield sse_event('chunk', {'text': stale})
+            yield sse_event('done', {'cached': True, 'stale': True})
+            return
+        except Exception as e:
+            print(f"Gemini Error in /generate-future-scope/stream: {e}")
+            yield sse_event('error', {'error': 'An internal error occurred'})
+            return
+        chunk = None
+        streaming_started = time.perf_counter()
+        try:
+            for chunk in stream:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    continue  # Chunks that only carry safety/finish metadata have no text
+                if text:
+                    parts.append(text)
+                    yield sse_event('chunk', {'text': text})
+        except Exception as e:
+            print(f"Gemini Error in /generate-future-scope/stream: {e}")
+            yield sse_event('error', {'error': 'An internal error occurred'})
+            return
+
+        request_metrics.observe_stream(route, chunk, time.perf_counter() - streaming_started)
+
+        scope = ''.join(parts)
+        if not scope:
+            yield sse_event('error', {'error': 'Failed to generate content from AI model'})
+            return
+        if request_metrics.sampled():
+            event_log.log_ai_interaction(None, route.strip('/'), prompt.text, scope, GEMINI_MODEL_NAME,
+                                         tokens_used=sum(usage_tokens(chunk)) or None,
+                                         processing_time_ms=int((time.perf_counter() - started) * 1000),
+                                         prompt_version=prompt.version)
+        # Only complete reports are cached, so the non-streaming route can reuse them
+        ai_cache.set(route, key, scope)
+        yield sse_event('done', {'cached': False})
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Stop nginx-style proxies from buffering the stream
+    })
+
+prompts.register(PromptTemplate('roadmap', 1, """
     You are an expert career advisor. Create a detailed, step-by-step learning roadmap for a user aspiring to become a "{career_title}".
     The roadmap must be structured as a JSON array of 3 to 5 major milestone objects.
 
@@ -294,15 +897,130 @@ def generate_roadmap():
     2. A "link" (string): A direct, valid, and clickable HTTPS URL to the resource.
 
     Respond ONLY with the valid JSON array of these milestone objects. Do not include any explanatory text, markdown formatting, or any other characters outside of the JSON structure.
-    """
+    """, budget=600, trim=('career_title',)))
+
+def generate_roadmap_milestones(career_title, refresh=False):
+    """Asks Gemini for a validated milestone list for `career_title`."""
+    prompt = prompts.render('roadmap', career_title=career_title)
+    return generate_content_cached('/generate-roadmap', prompt, response_format=ROADMAP_FORMAT, refresh=refresh)
+
+# Generated roadmaps are materialized into the Roadmap/RoadmapSkill tables and
+# regenerated in the background once they are older than this.
+ROADMAP_STALE_AFTER = timedelta(days=int(os.getenv('ROADMAP_STALE_AFTER_DAYS', '30')))
+roadmap_store = RoadmapStore(app, lambda title: generate_roadmap_milestones(title, refresh=True), stale_after=ROADMAP_STALE_AFTER)
+
+def generate_and_store_roadmap(career_title):
+    """Generates a roadmap and writes it to the Roadmap tables."""
+    def generate_and_store():
+        milestones = generate_roadmap_milestones(career_title)
+        try:
+            roadmap_store.save(career_title, milestones)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Roadmap store write failed for {career_title}: {e}")
+        return milestones
+
+    # Only one of a burst of identical requests generates and writes the roadmap
+    return model_calls.do('roadmap-store:' + career_title.lower(), generate_and_store, label='/generate-roadmap')
+
+# Featured careers and their skills, indexed for /analyze-skills/careers
+career_skill_catalog = CareerSkillCatalog(max_age=int(os.getenv('SKILL_CATALOG_MAX_AGE', '300')))
+
+@app.route('/generate-roadmap', methods=['POST'])
+def generate_roadmap():
+    data = request.get_json()
+    career_title = normalize_career_title(data.get('careerTitle'))
+
+    if career_title:
+        try:
+            milestones = roadmap_store.get(career_title)
+            if milestones:
+                return jsonify(milestones)
+        except Exception as e:
+            print(f"Roadmap store read failed for {career_title}: {e}")
+
+    if not model: return jsonify({"error": "AI model not configured"}), 500
+    if career_title and wants_async(data):
+        return enqueue_job('roadmap', {'careerTitle': career_title}, data)
+    if not career_title:
+        try:
+            return jsonify(generate_roadmap_milestones('the selected career'))
+        except ModelUnavailableError as e:
+            return model_unavailable_response(e)
+        except Exception as e:
+            print(f"Gemini Error in /generate-roadmap: {e}")
+            return jsonify({"error": f"AI returned an invalid response for the roadmap. Please try again."}), 500
+
     try:
-        response = model.generate_content(prompt)
-        json_data = json.loads(clean_json_response(response.text))
-        return jsonify(json_data)
+        json_data = generate_and_store_roadmap(career_title)
+    except ModelUnavailableError as e:
+        return model_unavailable_response(e)
     except Exception as e:
         print(f"Gemini Error in /generate-roadmap: {e}")
         return jsonify({"error": f"AI returned an invalid response for the roadmap. Please try again."}), 500
+    return jsonify(json_data)
         
+# --- BACKGROUND JOBS ---
+# handler(payload, progress) -> JSON result, run by JobWorker inside an app context
+def run_future_scope_job(payload, progress):
+    scope = generate_content_cached('/generate-future-scope', build_future_scope_prompt(payload['careerTitle']))
+    if not scope:
+        raise ValueError('Failed to generate content from AI model')
+    return {'scope': scope}
+
+def run_roadmap_job(payload, progress):
+    return generate_and_store_roadmap(payload['careerTitle'])
+
+def run_career_batch_job(payload, progress):
+    return career_batches.run(payload['profiles'], progress=progress)
+
+JOB_HANDLERS = {
+    'future_scope': run_future_scope_job,
+    'roadmap': run_roadmap_job,
+    'career_batch': run_career_batch_job,
+}
+
+# Workers normally run in their own process (python Backend/job_worker.py); set
+# JOB_INLINE_WORKERS for a single-process setup such as local development.
+JOB_INLINE_WORKERS = int(os.getenv('JOB_INLINE_WORKERS', '0'))
+if JOB_INLINE_WORKERS:
+    JobWorker(app, job_queue, JOB_HANDLERS, concurrency=JOB_INLINE_WORKERS, webhook_hosts=JOB_WEBHOOK_HOSTS).start()
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """
+    State of a background job, with its result once it has finished. Send
+    'Accept: text/event-stream' to get 'progress' events and a final 'done' or
+    'error' event instead of polling.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job."}), 404
+    if 'text/event-stream' not in request.headers.get('Accept', ''):
+        return jsonify(job.to_dict())
+
+    def events():
+        yield ": stream open\n\n"
+        current = job
+        last_progress = None
+        last_sent = time.monotonic()
+        while current.status not in FINISHED:
+            if current.progress != last_progress:
+                last_progress = current.progress
+                last_sent = time.monotonic()
+                yield sse_event('progress', current.to_dict(include_result=False))
+            elif time.monotonic() - last_sent >= 15:
+                last_sent = time.monotonic()
+                yield ": keepalive\n\n"
+            time.sleep(1)
+            current = job_queue.get(job_id)
+        yield sse_event('done' if current.status == 'completed' else 'error', current.to_dict())
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/analyze-skills', methods=['POST'])
 def analyze_skills():
     """
@@ -315,101 +1033,153 @@ def analyze_skills():
     if not user_skills_raw or not roadmap:
         return jsonify({"error": "Missing user skills or roadmap data."}), 400
 
-    # Sanitize user skills: lowercase, trim whitespace, remove empty strings
-    user_skills = {s.strip().lower() for s in user_skills_raw.split(',') if s.strip()}
-    
-    # Extract required skills from the roadmap
-    required_skills = {skill['name'].lower() for milestone in roadmap for skill in milestone.get('skills', [])}
-    
-    # Find matches. A user skill matches if it's a substring of a required skill.
-    skills_have = {req_skill for req_skill in required_skills if any(user_skill in req_skill for user_skill in user_skills)}
-    skills_to_learn = required_skills - skills_have
-    
-    percentage = round((len(skills_have) / len(required_skills)) * 100) if required_skills else 0
+    return jsonify(analyze_roadmap(parse_user_skills(user_skills_raw), roadmap))
+
+@app.route('/analyze-skills/careers', methods=['POST'])
+def analyze_skills_careers():
+    """
+    Bulk skill gap analysis: scores the user's skills against every featured
+    career in the catalog in one call, best match first.
+    """
+    data = request.get_json() or {}
+    user_skills_raw = data.get('userSkills', '')
+    if not user_skills_raw:
+        return jsonify({"error": "Missing user skills."}), 400
+    return jsonify({"careers": career_skill_catalog.get().score(parse_user_skills(user_skills_raw))})
+
+prompts.register(PromptTemplate('project_pitch', 1, """
+    Based on a user's interest in "{interests}" and the required skills for the milestone "{milestone_title}" which are [{skills}], generate a single, creative, and actionable project idea.
+    The project idea should help the user practice the specified skills.
+    Describe the project in a concise paragraph (about 50-70 words).
     
-    # Capitalize for display
-    def capitalize_skill(s):
-        return ' '.join(word.capitalize() for word in s.split())
+    Respond ONLY with a valid JSON object containing a single key "pitch" with the project description as its value.
+    Example: {{"pitch": "Build an interactive portfolio website using React. This site could dynamically showcase your projects, filtering them based on the technologies used, and include a blog section where you write about your learning journey."}}
+    """, budget=500, trim=('interests', 'skills', 'milestone_title')))
 
-    return jsonify({
-        "percentage": percentage,
-        "skillsHave": sorted(list(map(capitalize_skill, skills_have))),
-        "skillsToLearn": sorted(list(map(capitalize_skill, skills_to_learn)))
-    })
+def build_project_pitch_prompt(interests, skills, milestone_title):
+    return prompts.render('project_pitch', interests=interests, skills=', '.join(skills), milestone_title=milestone_title)
+
+# The frontend sends this when the interests field is left empty
+DEFAULT_PITCH_INTERESTS = 'general topics'
 
 @app.route('/generate-project-pitch', methods=['POST'])
 def generate_project_pitch():
     if not model: return jsonify({"error": "AI model not configured"}), 500
     data = request.get_json()
-    interests = data.get('interests', 'general topics')
+    interests = data.get('interests', DEFAULT_PITCH_INTERESTS)
     skills = data.get('skills', [])
     milestone_title = data.get('milestoneTitle', 'the current milestone')
 
     if not skills:
         return jsonify({"error": "Skills are required for a project pitch."}), 400
 
-    prompt = f"""
-    Based on a user's interest in "{interests}" and the required skills for the milestone "{milestone_title}" which are [{', '.join(skills)}], generate a single, creative, and actionable project idea.
-    The project idea should help the user practice the specified skills.
-    Describe the project in a concise paragraph (about 50-70 words).
-    
-    Respond ONLY with a valid JSON object containing a single key "pitch" with the project description as its value.
-    Example: {{"pitch": "Build an interactive portfolio website using React. This site could dynamically showcase your projects, filtering them based on the technologies used, and include a blog section where you write about your learning journey."}}
-    """
+    prompt = build_project_pitch_prompt(interests, skills, milestone_title)
     try:
-        response = model.generate_content(prompt)
-        json_data = json.loads(clean_json_response(response.text))
+        json_data = generate_content_cached('/generate-project-pitch', prompt, response_format=PROJECT_PITCH_FORMAT)
         return jsonify(json_data)
+    except ModelUnavailableError as e:
+        return model_unavailable_response(e)
     except Exception as e:
         print(f"Gemini Error in /generate-project-pitch: {e}")
         return jsonify({"error": "AI failed to generate a project pitch."}), 500
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/ai-stats', methods=['GET'])
+def ai_stats():
+    return jsonify({
+        "cache": ai_cache.stats(),
+        "single_flight": model_calls.stats(),
+        "model_client": model_client.stats(),
+        "structured_output": parse_stats.stats(),
+        "interviews": interview_sessions.stats(),
+        "jobs": job_queue.stats(),
+        "otp": otp_store.stats(),
+        "credentials": credential_service.stats(),
+        "sessions": session_auth.stats(),
+        "http": http_caching.stats(),
+        "prompts": prompts.stats(),
+        "event_log": event_log.stats()
+    })
+
 # --- NEW MOCK INTERVIEW ROUTES ---
+# Transcripts live in the interview_sessions table, so any worker can take the next
+# turn; older turns are summarized once a session's prompt passes
+# INTERVIEW_TOKEN_BUDGET (estimated tokens).
+interview_sessions = InterviewSessionStore(
+    lambda: model,
+    idle_ttl=int(os.getenv('INTERVIEW_SESSION_TTL', '3600')),
+    token_budget=int(os.getenv('INTERVIEW_TOKEN_BUDGET', '1500')),
+    call_model=model_client.call
+)
+
+prompts.register(PromptTemplate('start_interview', 1, """
+    You are an expert, friendly hiring manager conducting a mock interview for a "{career_title}" position.
+    Start the interview with a welcoming greeting and then ask your first, open-ended question to gauge the candidate's interest and background.
+    Keep your response to a single, concise paragraph.
+    """, budget=200, trim=('career_title',)))
+
 @app.route('/start-interview', methods=['POST'])
 def start_interview():
     if not model: return jsonify({"error": "AI model not configured"}), 500
     data = request.get_json()
     career_title = data.get('careerTitle', 'the selected field')
-    prompt = f"""
-    You are an expert, friendly hiring manager conducting a mock interview for a "{career_title}" position.
-    Start the interview with a welcoming greeting and then ask your first, open-ended question to gauge the candidate's interest and background.
-    Keep your response to a single, concise paragraph.
-    """
+    prompt = prompts.render('start_interview', career_title=career_title)
     try:
-        response = model.generate_content(prompt)
-        return jsonify({"greeting": response.text.strip()})
+        response = model_client.call('/start-interview', lambda timeout: model.generate_content(prompt.text, request_options=request_options(timeout)))
+        greeting = response.text.strip()
+        session = interview_sessions.create(career_title, turns=[('model', greeting)])
+        return jsonify({"greeting": greeting, "sessionId": session.id})
+    except ModelUnavailableError as e:
+        return model_unavailable_response(e)
     except Exception as e:
         print(f"Gemini Error in /start-interview: {e}")
         return jsonify({"error": "Failed to start the interview due to a server error."}), 500
 
 @app.route('/continue-interview', methods=['POST'])
 def continue_interview():
+    """
+    Continues a mock interview. Clients send {sessionId, message} and only the new
+    answer goes to Gemini. When the session has expired the server answers 410
+    and the client resends {careerTitle, conversation} once to rebuild it.
+    """
     if not model: return jsonify({"error": "AI model not configured"}), 500
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     career_title = data.get('careerTitle', 'the selected field')
-    conversation = data.get('conversation', [])
-    
-    # Format the conversation history for the AI
-    history_text = ""
-    for turn in conversation:
-        role = "You (Interviewer)" if turn['role'] == 'model' else "Candidate"
-        history_text += f"{role}: {turn['parts'][0]['text']}\n"
-        
-    prompt = f"""
-    You are an expert, friendly hiring manager continuing a mock interview for a "{career_title}" position.
-    Here is the conversation so far:
-    {history_text}
-    Based on the candidate's last response, ask a relevant follow-up question or provide brief feedback. 
-    Keep the conversation flowing naturally. Your response should be a single, concise paragraph.
-    Do not repeat questions. Ask behavioral, situational, or technical questions as appropriate for the role.
-    """
+    session_id = data.get('sessionId')
+    message = data.get('message')
+    conversation = data.get('conversation')
+
+    session = interview_sessions.get(session_id) if isinstance(session_id, str) and session_id else None
+    if session is None:
+        if not conversation:
+            return jsonify({"error": "Interview session expired. Please resend the conversation."}), 410
+        # Rebuild from the client's transcript; its last entry is the new answer
+        try:
+            turns = conversation_turns(conversation)
+        except ValueError as e:
+            return jsonify({"error": f"Invalid conversation: {e}"}), 400
+        if turns and turns[-1][0] == 'user':
+            message = turns.pop()[1]
+        session = interview_sessions.create(str(career_title), turns=turns)
+    if not isinstance(message, str) or not message:
+        return jsonify({"error": "A message is required"}), 400
+
     try:
-        response = model.generate_content(prompt)
-        return jsonify({"text": response.text.strip()})
+        reply = interview_sessions.send(session, message)
+        return jsonify({"text": reply, "sessionId": session.id})
+    except InterviewSessionConflict:
+        return jsonify({"error": "This interview was answered from another request. Please reload and try again."}), 409
+    except ModelUnavailableError as e:
+        return model_unavailable_response(e)
     except Exception as e:
         print(f"Gemini Error in /continue-interview: {e}")
         return jsonify({"error": "Failed to continue the interview due to a server error."}), 500
 
+# Every template is registered by now; count their tokens off the request path
+prompts.start_counting()
+
 # --- 5. RUN THE APP ---
-if __name__ == '__main__':
-    app.run(debug=True, port=5001)
+# `python Backend/app.py` starts the development server from the guard at the top of this file
@@ -0,0 +1,111 @@
+"""
+MARGEN AI - Frontend Bundle Builder
+Splits Frontend/index2.html into a small HTML shell plus fingerprinted app.<hash>.css
+and app.<hash>.js, and writes gzip (and brotli, when installed) copies of each into
+Frontend/dist. The app serves the bundle from memory when it exists: the CSS and JS
+are cached by browsers for a year, and only the shell is revalidated.
+
+    python Backend/build_frontend.py
+
+Rebuild after editing index2.html; running apps pick up the new bundle on restart.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FRONTEND_DIR = os.path.join(BASE_DIR, '..', 'Frontend')
+SOURCE = os.path.join(FRONTEND_DIR, 'index2.html')
+DEFAULT_DIST_DIR = os.path.join(FRONTEND_DIR, 'dist')
+ASSET_PREFIX = '/assets/'
+
+# Inline blocks without attributes; CDN scripts and the mermaid module stay as they are
+_STYLE_RE = re.compile(r'<style>\s*(.*?)\s*</style>', re.S)
+_SCRIPT_RE = re.compile(r'<script>\s*(.*?)\s*</script>', re.S)
+
+
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def split_page(html):
+    """(shell html, css, js) with the inline blocks replaced by references to the assets"""
+    styles = _STYLE_RE.findall(html)
+    scripts = _SCRIPT_RE.findall(html)
+    css = '\n'.join(styles)
+    js = '\n'.join(scripts)
+    css_name = f"app.{fingerprint(css.encode('utf-8'))}.css"
+    js_name = f"app.{fingerprint(js.encode('utf-8'))}.js"
+
+    # Keep each block's position: the first one becomes the reference, later ones are dropped
+    replaced = {'style': False, 'script': False}
+
+    def link_style(_):
+        if replaced['style']:
+            return ''
+        replaced['style'] = True
+        return f'<link rel="stylesheet" href="{ASSET_PREFIX}{css_name}">'
+
+    def link_script(_):
+        if replaced['script']:
+            return ''
+        replaced['script'] = True
+        return f'<script src="{ASSET_PREFIX}{js_name}"></script>'
+
+    shell = _SCRIPT_RE.sub(link_script, _STYLE_RE.sub(link_style, html))
+    assets = {}
+    if styles:
+        assets[css_name] = css
+    if scripts:
+        assets[js_name] = js
+    return shell, assets
+
+
+def write_variants(path, data, brotli_module):
+    with open(path, 'wb') as f:
+        f.write(data)
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli_module is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli_module.compress(data, quality=11))
+
+
+def build(source=SOURCE, dist_dir=DEFAULT_DIST_DIR):
+    try:
+        import brotli  # Optional dependency; gzip copies are always written
+    except ImportError:
+        brotli = None
+
+    with open(source, encoding='utf-8') as f:
+        shell, assets = split_page(f.read())
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    os.makedirs(dist_dir)
+
+    files = {}
+    for name, text in list(assets.items()) + [('index.html', shell)]:
+        data = text.encode('utf-8')
+        write_variants(os.path.join(dist_dir, name), data, brotli)
+        files[name] = {'hash': fingerprint(data), 'bytes': len(data),
+                       'gzip_bytes': os.path.getsize(os.path.join(dist_dir, name + '.gz'))}
+    with open(os.path.join(dist_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump({'files': files, 'brotli': brotli is not None}, f, indent=2)
+    return files
+
+
+def main():
+    dist_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DIST_DIR
+    files = build(dist_dir=dist_dir)
+    for name, info in files.items():
+        print(f"📦 {name:<24} {info['bytes']:>8} bytes, gzip {info['gzip_bytes']:>7}")
+    print(f"✅ Frontend bundle built -> {dist_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""
+MARGEN AI - Batch Career Generation
+Career recommendations for a whole cohort in one job: profiles are packed several to a
+prompt, packed prompts run on a bounded pool, the answers are split back per profile and
+CareerRecommendation rows are written in bulk
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from database_models import db, Career, User, upsert_career_recommendations
+from prompt_registry import PromptTemplate
+from roadmap_store import normalize_career_title
+
+CAREERS_PER_PROFILE = 7
+
+
+def normalize_profile(raw):
+    """Validated copy of one submitted profile; raises ValueError when it cannot be used"""
+    if not isinstance(raw, dict):
+        raise ValueError("Each profile must be an object")
+    interests = str(raw.get('interests') or '').strip()
+    skills = str(raw.get('skills') or '').strip()
+    if not interests and not skills:
+        raise ValueError("Each profile needs interests or skills")
+    life_goals = raw.get('lifeGoals') or []
+    if isinstance(life_goals, str):
+        life_goals = [life_goals]
+    return {
+        'email': str(raw['email']).strip() if raw.get('email') else None,
+        'interests': interests,
+        'skills': skills,
+        'pace': str(raw.get('pace') or 'Balanced'),
+        'lifeGoals': [str(goal) for goal in life_goals],
+    }
+
+
+# Packed prompts are already long, so each profile's free-text fields get a tighter cap
+# than the registry default instead of a whole-prompt budget that could cut profiles off
+BATCH_FIELD_TOKENS = 100
+
+BATCH_PROMPT = PromptTemplate('career_batch', 1, """
+    You are an expert career advisor. Below are {count} user profiles, numbered.
+    For EACH profile, generate a diverse list of {careers_per_profile} creative and professional career path recommendations.
+    For each recommendation, provide a "title", a short, compelling "description" (around 15-20 words)
+    and a "match_percentage" (0-100) for how well it fits that profile.
+
+    Profiles:
+    {listing}
+
+    Respond ONLY with a JSON array containing one object per profile: {{"profile": <profile number>, "careers": [...]}}.
+    """)
+
+
+def build_batch_prompt(prompts, profiles):
+    def field(value):
+        return prompts.trim_field(value, BATCH_FIELD_TOKENS)
+
+    listing = '\n'.join(
+        f'{number}. Interests: "{field(profile["interests"] or "Not specified")}"; '
+        f'Skills: "{field(profile["skills"] or "Not specified")}"; '
+        f'Preferred Pace: "{field(profile["pace"])}"; Life Goals: "{field(", ".join(profile["lifeGoals"]))}"'
+        for number, profile in enumerate(profiles, start=1)
+    )
+    return prompts.render('career_batch', count=len(profiles), careers_per_profile=CAREERS_PER_PROFILE, listing=listing)
+
+
+class BatchRun:
+    """State of one cohort while it is being generated"""
+
+    def __init__(self, profiles):
+        self.profiles = profiles
+        self.results = [None] * len(profiles)  # careers per profile, in submission order
+        self.errors = {}  # profile index -> message
+        self.model_calls = 0
+        self.saved = 0
+        self.seconds = None
+        self.lock = threading.Lock()
+
+    def to_dict(self, include_results=False):
+        with self.lock:
+            data = {
+                'total': len(self.profiles),
+                'completed': sum(1 for careers in self.results if careers is not None),
+                'failed': len(self.errors),
+                'modelCalls': self.model_calls,
+                'recommendationsSaved': self.saved,
+                'seconds': self.seconds,
+            }
+            if include_results:
+                data['results'] = [
+                    {'index': index, 'email': profile['email'], 'careers': careers, 'error': self.errors.get(index)}
+                    for index, (profile, careers) in enumerate(zip(self.profiles, self.results))
+                ]
+        return data
+
+
+def save_batch_recommendations(run):
+    """Bulk-write CareerRecommendation rows for profiles with a known user; returns rows written.
+    Careers the model named that are not in the catalog yet are added as ai_generated careers."""
+    from bulk_import import BulkImporter  # Lives in the project root, next to database_models
+
+    answered = [(profile, careers) for profile, careers in zip(run.profiles, run.results) if careers and profile['email']]
+    if not answered:
+        return 0
+    emails = {profile['email'] for profile, _ in answered}
+    users = dict(db.session.query(User.email, User.id).filter(User.email.in_(emails)))
+    answered = [(profile, careers) for profile, careers in answered if profile['email'] in users]
+    if not answered:
+        return 0
+
+    importer = BulkImporter(db.session)
+    importer.import_careers(
+        {'title': normalize_career_title(career['title']), 'description': career['description'], 'category': 'ai_generated'}
+        for _, careers in answered for career in careers
+    )
+    career_ids = importer.ids(Career, 'title')
+
+    rows = []
+    for profile, careers in answered:
+        for rank, career in enumerate(careers):
+            # Rank order stands in for a score the model left out
+            percentage = max(0.0, min(100.0, float(career.get('match_percentage', 90 - 5 * rank))))
+            rows.append({
+                'user_id': users[profile['email']],
+                'career_id': career_ids[normalize_career_title(career['title']).lower()],
+                'match_percentage': percentage,
+                'confidence_score': round(percentage / 100, 4),
+                'ai_reasons': json.dumps(["Generated for your cohort from your interests and skills"]),
+                'learning_priority': 'high' if percentage >= 70 else 'medium' if percentage >= 40 else 'low',
+                'created_at': datetime.utcnow()
+            })
+    # Re-running a cohort updates its (user, career) rows; one commit so a failed chunk leaves nothing half-written
+    for start in range(0, len(rows), 5000):
+        upsert_career_recommendations(rows[start:start + 5000])
+    db.session.commit()
+    return len(rows)
+
+
+class CareerBatchRunner:
+    """Generates a cohort's recommendations. `generate(prompt)` returns the parsed answer to one
+    packed prompt ([{'profile': n, 'careers': [...]}]); prompts are rendered from BATCH_PROMPT in
+    the `prompts` registry. At most `max_workers` packed prompts are in flight across all
+    cohorts run by this process."""
+
+    def __init__(self, generate, prompts, pack_size=10, max_workers=4):
+        self.generate = generate
+        self.prompts = prompts
+        self.pack_size = pack_size
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='career-batch')
+
+    def run(self, profiles, progress=None):
+        """Generate and save recommendations for `profiles` (call inside an app context).
+        progress(counts) is called after every packed prompt."""
+        started = time.perf_counter()
+        run = BatchRun(profiles)
+        indexes = list(range(len(profiles)))
+        packs = [indexes[start:start + self.pack_size] for start in range(0, len(indexes), self.pack_size)]
+        missing = self._run_packs(run, packs, progress)
+        if missing:
+            # Profiles the model skipped in a packed answer get one prompt each
+            for index in self._run_packs(run, [[index] for index in missing], progress):
+                run.errors[index] = "No recommendations returned for this profile"
+        if len(run.errors) == len(profiles):
+            raise RuntimeError("AI failed to generate recommendations for every profile")
+
+        try:
+            run.saved = save_batch_recommendations(run)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Saving batch recommendations failed: {e}")
+        run.seconds = round(time.perf_counter() - started, 3)
+        return run.to_dict(include_results=True)
+
+    def _run_packs(self, run, packs, progress):
+        """Run packed prompts on the pool; returns indexes the answers left out"""
+        futures = {self._pool.submit(self._run_pack, run, pack): pack for pack in packs}
+        missing = []
+        for future in as_completed(futures):
+            try:
+                missing.extend(future.result())
+            except Exception as e:
+                print(f"Gemini Error in /generate-careers/batch: {e}")
+                with run.lock:
+                    for index in futures[future]:
+                        run.errors[index] = "AI failed to generate recommendations for this profile"
+            if progress:
+                progress(run.to_dict())
+        return missing
+
+    def _run_pack(self, run, indexes):
+        answers = self.generate(build_batch_prompt(self.prompts, [run.profiles[index] for index in indexes]))
+        by_number = {}
+        for answer in answers:
+            by_number.setdefault(answer['profile'], answer['careers'])
+        missing = []
+        with run.lock:
+            run.model_calls += 1
+            for number, index in enumerate(indexes, start=1):
+                careers = by_number.get(number)
+                if careers:
+                    run.results[index] = careers[:CAREERS_PER_PROFILE]
+                else:
+                    missing.append(index)
+        return missing
@@ -0,0 +1,186 @@
+"""
+MARGEN AI - Career Vector Index
+Offline-built embedding matrix over the Career catalog with cosine top-k search,
+so /generate-careers can rank catalog careers locally before calling Gemini.
+
+Build (or rebuild) the index from Backend/users.db:
+    python Backend/career_index.py build
+"""
+
+import hashlib
+import json
+import os
+import sys
+from functools import lru_cache
+
+import numpy as np
+
+# The shared schema (database_models.py) lives in the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from skill_index import tokenize  # noqa: E402
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'career_index')
+DEFAULT_DIM = 2048
+
+# How much each part of a career document counts towards its vector
+FIELD_WEIGHTS = {'title': 3.0, 'skills': 2.0, 'category': 1.0, 'description': 1.0}
+
+
+@lru_cache(maxsize=65536)
+def _feature(token, dim):
+    """Signed feature hashing: token -> (column, +1/-1)"""
+    digest = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+    return digest % dim, 1.0 if digest >> 63 else -1.0
+
+
+def embed(fields, dim, idf=None):
+    """Hashed bag-of-tokens vector of weighted text fields, L2-normalized"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for text, weight in fields:
+        for token in tokenize(text):
+            column, sign = _feature(token, dim)
+            vector[column] += sign * weight
+    if idf is not None:
+        vector *= idf
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def career_fields(career, skill_names):
+    return [
+        (career.title, FIELD_WEIGHTS['title']),
+        (' , '.join(skill_names), FIELD_WEIGHTS['skills']),
+        (career.category or '', FIELD_WEIGHTS['category']),
+        (career.description or '', FIELD_WEIGHTS['description']),
+    ]
+
+
+class CareerIndex:
+    """Memory-mapped (careers x dim) matrix of unit vectors plus the career metadata"""
+
+    def __init__(self, matrix, idf, careers, path=None):
+        self.matrix = matrix
+        self.idf = idf
+        self.careers = careers  # list of {'id', 'title', 'description', 'generated'}
+        self.path = path
+        self.dim = matrix.shape[1]
+        self._mtime = self._stat(path)
+
+    @staticmethod
+    def _stat(path):
+        try:
+            return os.stat(os.path.join(path, 'careers.json')).st_mtime if path else None
+        except OSError:
+            return None
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_DIR):
+        """Load a built index, or return None when none has been built yet"""
+        meta_path = os.path.join(path, 'careers.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, encoding='utf-8') as f:
+            careers = json.load(f)
+        matrix = np.load(os.path.join(path, 'vectors.npy'), mmap_mode='r')
+        idf = np.load(os.path.join(path, 'idf.npy'))
+        return cls(matrix, idf, careers, path=path)
+
+    def reload_if_changed(self):
+        """Pick up a rebuilt index without restarting the app"""
+        if self.path and self._stat(self.path) != self._mtime:
+            fresh = CareerIndex.load(self.path)
+            if fresh is not None:
+                return fresh
+        return self
+
+    def search(self, interests, skills, k=7):
+        """Top-k catalog careers for a profile as (career, cosine) pairs, best first"""
+        if not len(self.careers):
+            return []
+        query = embed([(interests, 1.0), (skills, 1.0)], self.dim, self.idf)
+        if not query.any():
+            return []
+        scores = self.matrix @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.careers[i], float(scores[i])) for i in top]
+
+
+def match_scores(cosine):
+    """Map a cosine similarity to (match_percentage 0-100, confidence_score 0-1).
+    Short profiles rarely exceed ~0.5 cosine against a full career document, so
+    the percentage is square-root scaled to spread that range out."""
+    cosine = max(0.0, min(1.0, cosine))
+    return round(100 * cosine ** 0.5, 1), round(cosine, 4)
+
+
+def build_index(out_dir=DEFAULT_INDEX_DIR, dim=DEFAULT_DIM):
+    """Embed every Career with its required and roadmap skills; call inside an app context"""
+    from sqlalchemy.orm import joinedload
+    from database_models import Career, CareerSkill, Roadmap, RoadmapSkill
+
+    careers = Career.query.options(
+        joinedload(Career.career_skills).joinedload(CareerSkill.skill),
+        joinedload(Career.roadmaps).joinedload(Roadmap.roadmap_skills).joinedload(RoadmapSkill.skill)
+    ).order_by(Career.id).all()
+
+    rows, meta = [], []
+    document_frequency = np.zeros(dim, dtype=np.float32)
+    for career in careers:
+        skill_names = [cs.skill.name for cs in career.career_skills]
+        skill_names.extend(rs.skill.name for roadmap in career.roadmaps for rs in roadmap.roadmap_skills)
+        raw = embed(career_fields(career, skill_names), dim)
+        document_frequency += raw != 0
+        rows.append(raw)
+        meta.append({
+            'id': career.id,
+            'title': career.title,
+            'description': career.description,
+            # Careers first created by the roadmap store only have a placeholder description
+            'generated': career.category == 'ai_generated'
+        })
+
+    idf = np.log((1 + len(rows)) / (1 + document_frequency)).astype(np.float32) + 1.0
+    matrix = np.zeros((len(rows), dim), dtype=np.float32)
+    for i, raw in enumerate(rows):
+        weighted = raw * idf
+        norm = np.linalg.norm(weighted)
+        matrix[i] = weighted / norm if norm else weighted
+
+    os.makedirs(out_dir, exist_ok=True)
+    # Running apps memory-map the old files, so write aside and swap them in atomically.
+    # Metadata goes last: its mtime is what running apps watch for a rebuild.
+    for name, array in (('vectors.npy', matrix), ('idf.npy', idf)):
+        with open(os.path.join(out_dir, name + '.tmp'), 'wb') as f:
+            np.save(f, array)
+        os.replace(os.path.join(out_dir, name + '.tmp'), os.path.join(out_dir, name))
+    with open(os.path.join(out_dir, 'careers.json.tmp'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(os.path.join(out_dir, 'careers.json.tmp'), os.path.join(out_dir, 'careers.json'))
+    return len(meta)
+
+
+def main():
+    """Build the index from the app database"""
+    if len(sys.argv) < 2 or sys.argv[1] != 'build':
+        print("Usage: python Backend/career_index.py build [database_path]")
+        sys.exit(1)
+
+    from flask import Flask
+    from database_models import db
+
+    basedir = os.path.abspath(os.path.dirname(__file__))
+    db_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(basedir, 'users.db')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.abspath(db_path)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    with app.app_context():
+        count = build_index()
+    print(f"✅ Career index built: {count} careers -> {DEFAULT_INDEX_DIR}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+MARGEN AI - Credential Service
+Password hashing and checking off the request thread: the CPU-heavy work runs in a
+process pool behind a bounded queue, the hash method and cost come from configuration
+(old hashes are upgraded on the next successful login), and recently verified
+credentials are remembered briefly so repeated sign-ins skip the hash. The functions
+the pool runs live in password_hashing.py.
+"""
+
+import hashlib
+import hmac
+import multiprocessing
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import generate_password_hash
+
+from password_hashing import hash_method_of, hash_password, verify_password
+
+
+class CredentialServiceBusy(Exception):
+    """Too many hashes are already queued; the caller should retry after `retry_after` seconds"""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CredentialService:
+    """Hash and verify passwords. With workers=0 hashing runs inline (development, scripts).
+
+    method is a werkzeug method string such as 'scrypt', 'scrypt:65536:8:1' or
+    'pbkdf2:sha256:1000000'; hashes made with other parameters are flagged for rehash.
+    """
+
+    def __init__(self, method='scrypt', workers=2, max_pending=64, queue_timeout=2.0,
+                 cache_seconds=300, cache_size=10000):
+        # werkzeug fills in default cost parameters, so compare against what it actually writes
+        self.method = hash_method_of(generate_password_hash('probe', method=method))
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self.cache_seconds = cache_seconds
+        self.cache_size = cache_size
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        # Per-process key: cache entries are useless outside this process and its lifetime
+        self._cache_key = secrets.token_bytes(32)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.counts = {'hashed': 0, 'verified': 0, 'rejected': 0, 'cache_hits': 0, 'rehashed': 0, 'busy': 0}
+
+    def _count(self, field):
+        with self._lock:
+            self.counts[field] += 1
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: pool processes start clean instead of forking a threaded (gevent) worker
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._count('busy')
+            raise CredentialServiceBusy("Too many sign-ins in progress")
+        try:
+            return self._executor().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def needs_rehash(self, password_hash):
+        return hash_method_of(password_hash) != self.method
+
+    def hash(self, password):
+        self._count('hashed')
+        return self._run(hash_password, password, self.method)
+
+    def _cache_token(self, password_hash, password):
+        return hmac.new(self._cache_key, f"{password_hash}\0{password}".encode('utf-8'), hashlib.sha256).digest()
+
+    def _cached(self, token):
+        with self._lock:
+            expires = self._cache.get(token)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self._cache[token]
+                return False
+            self._cache.move_to_end(token)
+            return True
+
+    def _remember(self, token):
+        with self._lock:
+            self._cache[token] = time.monotonic() + self.cache_seconds
+            self._cache.move_to_end(token)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def verify(self, password_hash, password):
+        """(ok, new_hash). new_hash is set when the password was right but its stored
+        hash uses old parameters; the caller saves it in place of the old one."""
+        token = self._cache_token(password_hash, password)
+        if self.cache_seconds and self._cached(token):
+            self._count('cache_hits')
+            ok = True
+        else:
+            ok = self._run(verify_password, password_hash, password)
+            self._count('verified' if ok else 'rejected')
+            if ok and self.cache_seconds:
+                self._remember(token)
+        if ok and self.needs_rehash(password_hash):
+            self._count('rehashed')
+            return True, self.hash(password)
+        return ok, None
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+            counts['cached'] = len(self._cache)
+        counts['method'] = self.method.split(':', 1)[0]
+        counts['workers'] = self.workers
+        return counts
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
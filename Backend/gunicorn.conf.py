@@ -0,0 +1,29 @@
+"""
+MARGEN AI - Gunicorn Configuration
+Cooperative (gevent) workers so a single process can hold hundreds of in-flight
+Gemini and Twilio calls instead of one per worker thread.
+
+Run from the Backend directory:
+    gunicorn app:app
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:' + os.getenv('PORT', '5001'))
+
+# gevent patches sockets, so every blocking network call in a view (Gemini REST,
+# Twilio) yields to other requests instead of pinning a worker. sqlite3 is not
+# patched: sqlite_tuning detects gevent and turns SQLite's busy timeout off, then
+# waits for a held write lock in sleeps that yield (CooperativeConnection), so one
+# request queued behind the lock no longer freezes the whole worker.
+# Set GUNICORN_WORKER_CLASS=sync to get the old one-request-per-worker behaviour.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+workers = int(os.getenv('GUNICORN_WORKERS', str(min(multiprocessing.cpu_count(), 4))))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+
+# Long generations (future scope) can take a while; streaming responses keep the
+# connection busy, so the timeout only has to cover the slowest single chunk.
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
@@ -0,0 +1,190 @@
+"""
+MARGEN AI - HTTP Caching and Compression
+Response layer for the Flask app: per-route Cache-Control policies, strong ETags with
+304 answers for GET routes, gzip/brotli negotiation above a size threshold, and the
+precompressed, fingerprinted frontend bundle written by build_frontend.py
+"""
+
+import gzip
+import json
+import mimetypes
+import os
+import threading
+
+from flask import Response, request
+
+try:
+    import brotli  # Optional dependency; without it only gzip is offered
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def supported_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding, available):
+    """Best of `available` (in server preference order) that the Accept-Encoding header allows"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    wildcard = accepted.get('*', 0.0)
+    candidates = [(accepted.get(encoding, wildcard), -rank, encoding) for rank, encoding in enumerate(available)]
+    best = max(candidates, default=None)
+    return best[2] if best and best[0] > 0 else None
+
+
+def compress(data, encoding, level=6):
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    # mtime=0 keeps the output, and so the ETag, the same for the same input
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def encoded_etag(tag, encoding):
+    """Each encoded representation gets its own strong ETag"""
+    return f"{tag}-{encoding}" if encoding else tag
+
+
+def etag_matches(etags, tag):
+    """Whether an If-None-Match/If-Match set names `tag` in any of its encodings"""
+    return any(etags.contains(encoded_etag(tag, encoding)) for encoding in (None, 'br', 'gzip'))
+
+
+class HttpCaching:
+    """Flask extension. policies maps a URL rule to its Cache-Control value; GET routes
+    without one get 'no-cache' (store, but revalidate with the ETag) and everything else
+    'no-store'. Register it after RequestMetrics so sizes are counted after compression."""
+
+    def __init__(self, policies=None, min_size=1024, level=6):
+        self.policies = dict(policies or {})
+        self.min_size = min_size
+        self.level = level
+        self.counts = {'compressed': 0, 'not_modified': 0, 'bytes_in': 0, 'bytes_out': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, **amounts):
+        with self._lock:
+            for field, amount in amounts.items():
+                self.counts[field] += amount
+
+    def init_app(self, app):
+        app.after_request(self._finish_response)
+
+    def _policy(self):
+        rule = request.url_rule.rule if request.url_rule is not None else None
+        if rule in self.policies:
+            return self.policies[rule]
+        return 'no-cache' if request.method in ('GET', 'HEAD') else 'no-store'
+
+    def _finish_response(self, response):
+        policy = self._policy()
+        if 'Cache-Control' not in response.headers:
+            response.headers['Cache-Control'] = policy
+        # Streams (SSE) go out as they are written; passthrough bodies are files
+        if response.is_streamed or response.direct_passthrough or response.status_code != 200:
+            return response
+        if 'Content-Encoding' in response.headers:
+            return response  # Already encoded (the precompressed bundle)
+
+        encoding = None
+        mimetype = response.mimetype or ''
+        if response.calculate_content_length() >= self.min_size and mimetype.startswith(COMPRESSIBLE_TYPES):
+            encoding = negotiate_encoding(request.headers.get('Accept-Encoding'), supported_encodings())
+            response.vary.add('Accept-Encoding')
+
+        etag_encoded = False  # whether the ETag below got this response's encoding suffix
+        if request.method in ('GET', 'HEAD') and 'no-store' not in policy:
+            tag, weak = response.get_etag()
+            if tag is None:
+                response.add_etag()  # Strong: a hash of the uncompressed body
+                tag, weak = response.get_etag()
+            if not weak:
+                if etag_matches(request.if_none_match, tag):
+                    self._count(not_modified=1)
+                    not_modified = Response(status=304, headers={'Cache-Control': response.headers['Cache-Control']})
+                    not_modified.set_etag(encoded_etag(tag, encoding))
+                    if encoding:
+                        not_modified.vary.add('Accept-Encoding')
+                    return not_modified
+                response.set_etag(encoded_etag(tag, encoding))
+                etag_encoded = encoding is not None
+
+        if encoding:
+            data = response.get_data()
+            compressed = compress(data, encoding, self.level)
+            if len(compressed) < len(data):
+                response.set_data(compressed)
+                response.headers['Content-Encoding'] = encoding
+                self._count(compressed=1, bytes_in=len(data), bytes_out=len(compressed))
+            elif etag_encoded:
+                # Sent uncompressed after all: drop the suffix added above, never a view's own ETag
+                tag, weak = response.get_etag()
+                response.set_etag(tag[:-len(encoding) - 1])
+        return response
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        counts['ratio'] = round(counts['bytes_out'] / counts['bytes_in'], 3) if counts['bytes_in'] else None
+        counts['encodings'] = list(supported_encodings())
+        return counts
+
+
+class StaticBundle:
+    """Serves Frontend/dist from memory: every file with its .gz/.br twins, picked by
+    Accept-Encoding, under a content-hash ETag. Fingerprinted names never change content,
+    so they are cached for a year; index.html is revalidated."""
+
+    def __init__(self, dist_dir):
+        self.dist_dir = dist_dir
+        self.files = {}  # name -> {encoding or None: bytes}
+        self.etags = {}
+        manifest_path = os.path.join(dist_dir, 'manifest.json')
+        if not os.path.exists(manifest_path):
+            return
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        for name, info in manifest['files'].items():
+            variants = {}
+            for encoding, suffix in ((None, ''), ('gzip', '.gz'), ('br', '.br')):
+                path = os.path.join(dist_dir, name + suffix)
+                if os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        variants[encoding] = f.read()
+            self.files[name] = variants
+            self.etags[name] = info['hash']
+
+    @property
+    def available(self):
+        return 'index.html' in self.files
+
+    def response(self, name, cache_control):
+        variants = self.files.get(name)
+        if variants is None:
+            return None
+        available = tuple(encoding for encoding in ('br', 'gzip') if encoding in variants)
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding'), available)
+        tag = self.etags[name]
+        headers = {'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+        if etag_matches(request.if_none_match, tag):
+            response = Response(status=304, headers=headers)
+        else:
+            mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+            response = Response(variants[encoding], mimetype=mimetype, headers=headers)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(encoded_etag(tag, encoding))
+        return response
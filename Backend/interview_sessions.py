@@ -0,0 +1,208 @@
+"""
+MARGEN AI - Mock Interview Sessions
+Server-side interview transcripts on top of Gemini chat sessions. Each turn sends
+only the candidate's new answer; once the transcript outgrows a token budget the
+older turns are folded into a rolling summary so prompt size stays roughly flat.
+Transcripts are stored in the interview_sessions table so any gunicorn worker can
+serve the next turn; each worker keeps its live chat objects as a cache on top.
+"""
+
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from database_models import db, InterviewTranscript
+
+INTERVIEWER_INSTRUCTIONS = """
+You are an expert, friendly hiring manager conducting a mock interview for a "{career_title}" position.
+After each candidate answer, ask a relevant follow-up question or provide brief feedback.
+Keep the conversation flowing naturally. Each of your responses should be a single, concise paragraph.
+Do not repeat questions. Ask behavioral, situational, or technical questions as appropriate for the role.
+{summary}"""
+
+SUMMARY_PROMPT = """
+Summarize this part of a mock interview for a "{career_title}" position in at most 120 words.
+Keep the questions already asked, the candidate's key claims and any weaknesses noticed, so the interviewer does not repeat itself.
+{previous}
+Transcript:
+{transcript}
+"""
+
+
+class InterviewSessionConflict(Exception):
+    """The session took a turn in another worker since it was loaded here"""
+
+
+def estimate_tokens(text):
+    """Cheap local estimate (~4 characters per token); avoids a count_tokens round trip per turn"""
+    return len(text) // 4 + 1
+
+
+def conversation_turns(conversation):
+    """(role, text) turns from a client transcript of {role, parts: [{text}]} entries;
+    ValueError when it is not shaped like that"""
+    if not isinstance(conversation, list):
+        raise ValueError("conversation must be a list")
+    turns = []
+    for turn in conversation:
+        part = turn.get('parts') if isinstance(turn, dict) else None
+        part = part[0] if isinstance(part, list) and part else None
+        if not isinstance(part, dict) or not isinstance(turn.get('role'), str) or not isinstance(part.get('text'), str):
+            raise ValueError("each conversation entry needs a role and parts[0].text")
+        turns.append(('model' if turn['role'] == 'model' else 'user', part['text']))
+    return turns
+
+
+class InterviewSession:
+    def __init__(self, career_title, session_id=None):
+        self.id = session_id or uuid.uuid4().hex
+        self.career_title = career_title
+        self.summary = ''
+        self.turns = []  # (role, text) with role 'user' or 'model', oldest first
+        self.revision = 0  # the stored row's revision this copy was loaded from
+        self.chat = None
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_record(cls, record):
+        session = cls(record.career_title, session_id=record.id)
+        session.summary = record.summary or ''
+        session.turns = [tuple(turn) for turn in json.loads(record.turns)]
+        session.revision = record.revision
+        return session
+
+    def history(self):
+        """Chat history for start_chat: instructions (+ summary), then the turns kept verbatim"""
+        summary = f"Summary of the interview so far: {self.summary}" if self.summary else ''
+        instructions = INTERVIEWER_INSTRUCTIONS.format(career_title=self.career_title, summary=summary)
+        history = [
+            {'role': 'user', 'parts': [instructions]},
+            {'role': 'model', 'parts': ["Understood. I'll conduct the interview."]},
+        ]
+        for role, text in self.turns:
+            # Gemini wants alternating roles, so consecutive turns by one side share a message
+            if history[-1]['role'] == role:
+                history[-1]['parts'].append(text)
+            else:
+                history.append({'role': role, 'parts': [text]})
+        return history
+
+    def prompt_tokens(self):
+        return sum(estimate_tokens(text) for _, text in self.turns) + estimate_tokens(self.summary)
+
+
+class InterviewSessionStore:
+    """Interview sessions stored in the database, shared by every worker.
+
+    Each worker keeps an LRU of the sessions it served with their live chat
+    objects; a cached copy is reused only while its revision matches the stored
+    row, otherwise the session is reloaded and its chat rebuilt from history.
+    Two turns of one session racing in different workers: the later save fails
+    with InterviewSessionConflict instead of dropping the other turn.
+    """
+
+    def __init__(self, get_model, max_sessions=2000, idle_ttl=3600, token_budget=1500, keep_recent_turns=6, call_model=None):
+        self.get_model = get_model
+        # call_model(route, fn) runs fn(timeout) under the app's retry/rate-limit policy
+        self.call_model = call_model or (lambda route, fn: fn(None))
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.summaries = 0
+
+    def _cutoff(self):
+        return datetime.utcnow() - timedelta(seconds=self.idle_ttl)
+
+    def _cache(self, session):
+        with self._lock:
+            self._sessions[session.id] = session
+            self._sessions.move_to_end(session.id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def _forget(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def create(self, career_title, turns=()):
+        session = InterviewSession(career_title)
+        session.turns = list(turns)
+        self._compact(session)
+        # Sessions idle past the TTL are swept here; the index on updated_at keeps it cheap
+        InterviewTranscript.query.filter(InterviewTranscript.updated_at < self._cutoff()).delete(synchronize_session=False)
+        db.session.add(InterviewTranscript(id=session.id, career_title=career_title, summary=session.summary,
+                                           turns=json.dumps(session.turns), revision=0))
+        db.session.commit()
+        self._cache(session)
+        return session
+
+    def get(self, session_id):
+        record = db.session.get(InterviewTranscript, session_id)
+        if record is None or record.updated_at < self._cutoff():
+            self._forget(session_id)
+            return None
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None or session.revision != record.revision:
+            session = InterviewSession.from_record(record)
+        self._cache(session)
+        return session
+
+    def send(self, session, message):
+        """One interview turn: only `message` goes upstream on top of the chat state"""
+        with session.lock:
+            if session.chat is None:
+                session.chat = self.get_model().start_chat(history=session.history())
+            response = self.call_model('/continue-interview', lambda timeout: session.chat.send_message(
+                message, request_options={'timeout': timeout} if timeout else None))
+            reply = response.text.strip()
+            session.turns.append(('user', message))
+            session.turns.append(('model', reply))
+            if session.prompt_tokens() > self.token_budget:
+                self._compact(session)
+            self._save(session)
+            return reply
+
+    def _save(self, session):
+        """Store the session's turns if nobody saved a turn since it was loaded"""
+        saved = InterviewTranscript.query.filter(
+            InterviewTranscript.id == session.id, InterviewTranscript.revision == session.revision
+        ).update({
+            'summary': session.summary,
+            'turns': json.dumps(session.turns),
+            'revision': InterviewTranscript.revision + 1,
+            'updated_at': datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+        if not saved:
+            self._forget(session.id)
+            raise InterviewSessionConflict(session.id)
+        session.revision += 1
+
+    def _compact(self, session):
+        """Fold all but the most recent turns into the rolling summary and restart the chat"""
+        if session.prompt_tokens() <= self.token_budget or len(session.turns) <= self.keep_recent_turns:
+            return
+        older = session.turns[:-self.keep_recent_turns]
+        transcript = '\n'.join(f"{'Interviewer' if role == 'model' else 'Candidate'}: {text}" for role, text in older)
+        previous = f"Earlier summary: {session.summary}" if session.summary else ''
+        prompt = SUMMARY_PROMPT.format(career_title=session.career_title, previous=previous, transcript=transcript)
+        try:
+            session.summary = self.call_model('/continue-interview', lambda timeout: self.get_model().generate_content(
+                prompt, request_options={'timeout': timeout} if timeout else None)).text.strip()
+        except Exception as e:
+            # Without a summary, fall back to plain truncation; the interview goes on
+            print(f"Gemini Error summarizing interview {session.id}: {e}")
+        session.turns = session.turns[-self.keep_recent_turns:]
+        session.chat = None
+        self.summaries += 1
+
+    def stats(self):
+        active = InterviewTranscript.query.filter(InterviewTranscript.updated_at >= self._cutoff()).count()
+        with self._lock:
+            return {'active_sessions': active, 'cached_sessions': len(self._sessions), 'summaries': self.summaries}
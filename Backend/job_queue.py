@@ -0,0 +1,213 @@
+"""
+MARGEN AI - Background Job Queue
+Jobs table in the app's SQLite database for slow AI generations. Web workers enqueue
+and poll; job_worker.py claims jobs under a lease and runs them, so a job whose worker
+died is picked up again and queued jobs survive restarts.
+"""
+
+import json
+import os
+import socket
+import threading
+import urllib.request
+import uuid
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+from sqlalchemy import and_, func, or_
+
+from database_models import Job
+from sqlite_tuning import read_only_session
+
+FINISHED = ('completed', 'failed')
+
+
+def webhook_allowed(url, allowed_hosts):
+    """Callbacks only go to http(s) hosts listed in JOB_WEBHOOK_HOSTS, never anywhere a client asks"""
+    parsed = urlparse(url or '')
+    return parsed.scheme in ('http', 'https') and (parsed.hostname or '').lower() in allowed_hosts
+
+
+def post_webhook(url, body, timeout=10):
+    request = urllib.request.Request(url, data=json.dumps(body).encode('utf-8'), method='POST',
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+    except Exception as e:
+        print(f"Job webhook to {url} failed: {e}")
+
+
+class JobQueue:
+    """Enqueue, claim and finish jobs. `available_at` is when a queued job may start
+    (retries wait there) and, while it runs, when its lease runs out."""
+
+    def __init__(self, db, lease_seconds=300, max_attempts=3):
+        self.db = db
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+
+    def enqueue(self, kind, payload, callback_url=None):
+        job = Job(id=uuid.uuid4().hex, kind=kind, status='queued', payload=json.dumps(payload),
+                  callback_url=callback_url, attempts=0)
+        self.db.session.add(job)
+        self.db.session.commit()
+        return job
+
+    def get(self, job_id):
+        """Fresh read of one job, so pollers never see a cached row"""
+        with read_only_session(self.db) as session:
+            job = session.get(Job, job_id, populate_existing=True)
+            if job is not None:
+                session.expunge(job)
+            return job
+
+    def _claimable(self, now):
+        return and_(Job.status.in_(('queued', 'running')),
+                    or_(Job.available_at.is_(None), Job.available_at <= now))
+
+    def claim(self, worker_id, kinds=None):
+        """Take the oldest runnable job (or one whose worker's lease ran out); None when idle"""
+        session = self.db.session
+        for _ in range(5):
+            now = datetime.utcnow()
+            query = session.query(Job.id, Job.attempts).filter(self._claimable(now))
+            if kinds:
+                query = query.filter(Job.kind.in_(kinds))
+            candidate = query.order_by(Job.created_at).first()
+            if candidate is None:
+                return None
+            if candidate.attempts >= self.max_attempts:
+                # It has used up its attempts, most likely by taking its workers down with it
+                session.query(Job).filter(Job.id == candidate.id, self._claimable(now)).update({
+                    'status': 'failed', 'error': 'Gave up after repeated worker failures', 'finished_at': now,
+                    'available_at': None
+                }, synchronize_session=False)
+                session.commit()
+                continue
+            # Conditional update: only one of several racing workers gets the row
+            claimed = session.query(Job).filter(Job.id == candidate.id, self._claimable(now)).update({
+                'status': 'running', 'worker_id': worker_id, 'available_at': now + self.lease,
+                'attempts': Job.attempts + 1, 'started_at': func.coalesce(Job.started_at, now)
+            }, synchronize_session=False)
+            session.commit()
+            if claimed:
+                return session.get(Job, candidate.id, populate_existing=True)
+        return None
+
+    def _finish(self, job_id, worker_id, values):
+        """Update a job this worker still holds; False when its lease was lost to another worker"""
+        updated = self.db.session.query(Job).filter(
+            Job.id == job_id, Job.worker_id == worker_id, Job.status == 'running'
+        ).update(values, synchronize_session=False)
+        self.db.session.commit()
+        return bool(updated)
+
+    def heartbeat(self, job_id, worker_id, progress=None):
+        values = {'available_at': datetime.utcnow() + self.lease}
+        if progress is not None:
+            values['progress'] = json.dumps(progress)
+        return self._finish(job_id, worker_id, values)
+
+    def complete(self, job_id, worker_id, result):
+        return self._finish(job_id, worker_id, {
+            'status': 'completed', 'result': json.dumps(result), 'error': None,
+            'finished_at': datetime.utcnow(), 'available_at': None
+        })
+
+    def fail(self, job_id, worker_id, error):
+        return self._finish(job_id, worker_id, {
+            'status': 'failed', 'error': error, 'finished_at': datetime.utcnow(), 'available_at': None
+        })
+
+    def retry(self, job_id, worker_id, delay, error):
+        """Back to the queue after `delay` seconds, or failed once its attempts are used up"""
+        job = self.db.session.get(Job, job_id, populate_existing=True)
+        if job is None or job.attempts >= self.max_attempts:
+            return self.fail(job_id, worker_id, error)
+        return self._finish(job_id, worker_id, {
+            'status': 'queued', 'worker_id': None, 'error': error,
+            'available_at': datetime.utcnow() + timedelta(seconds=delay)
+        })
+
+    def stats(self):
+        with read_only_session(self.db) as session:
+            counts = dict(session.query(Job.status, func.count(Job.id)).group_by(Job.status).all())
+        return {status: counts.get(status, 0) for status in ('queued', 'running', 'completed', 'failed')}
+
+
+class JobWorker:
+    """Claims and runs jobs on `concurrency` threads until stop() is called.
+
+    handlers maps a job kind to handler(payload, progress) -> JSON-able result; calling
+    progress(dict) stores progress and extends the lease. Errors that carry a
+    `retry_after` (Gemini throttled or unavailable) put the job back in the queue.
+    """
+
+    def __init__(self, app, queue, handlers, concurrency=2, poll_interval=1.0, webhook_hosts=()):
+        self.app = app
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.webhook_hosts = set(webhook_hosts)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        self.processed = {'completed': 0, 'failed': 0, 'retried': 0}
+
+    def start(self):
+        for number in range(self.concurrency):
+            thread = threading.Thread(target=self._loop, name=f'job-worker-{number}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """Stop claiming new jobs and wait for the running ones to finish"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _count(self, field):
+        with self._lock:
+            self.processed[field] += 1
+
+    def _loop(self):
+        with self.app.app_context():
+            while not self._stop.is_set():
+                try:
+                    job = self.queue.claim(self.worker_id, kinds=list(self.handlers))
+                except Exception as e:
+                    self.queue.db.session.rollback()
+                    print(f"Job claim failed: {e}")
+                    job = None
+                if job is None:
+                    self._stop.wait(self.poll_interval)
+                    continue
+                self.run(job)
+
+    def run(self, job):
+        session = self.queue.db.session
+        payload = json.loads(job.payload)
+
+        def progress(data):
+            self.queue.heartbeat(job.id, self.worker_id, data)
+
+        try:
+            result = self.handlers[job.kind](payload, progress)
+        except Exception as e:
+            session.rollback()
+            if hasattr(e, 'retry_after'):
+                print(f"Job {job.id} ({job.kind}) will be retried: {e}")
+                self.queue.retry(job.id, self.worker_id, max(1.0, e.retry_after or 30.0), str(e))
+                self._count('retried')
+                return
+            print(f"Job {job.id} ({job.kind}) failed: {e}")
+            finished = self.queue.fail(job.id, self.worker_id, str(e))
+            self._count('failed')
+        else:
+            finished = self.queue.complete(job.id, self.worker_id, result)
+            self._count('completed')
+        if finished and job.callback_url and webhook_allowed(job.callback_url, self.webhook_hosts):
+            post_webhook(job.callback_url, self.queue.get(job.id).to_dict())
@@ -0,0 +1,65 @@
+"""
+MARGEN AI - Job Worker
+Runs queued background jobs (future-scope reports, roadmaps, batch career generation)
+in its own process, so slow Gemini calls never hold a web worker. Run one or more next
+to the web server, against the same users.db:
+
+    python Backend/job_worker.py --concurrency 4
+
+SIGTERM/SIGINT stop claiming new jobs and let running ones finish; a job whose worker
+is killed outright is picked up again once its lease (JOB_LEASE_SECONDS) runs out.
+"""
+
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv('JOB_WORKER_CONCURRENCY', '2')),
+                        help='jobs run at once by this process')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='seconds between claims when idle')
+    parser.add_argument('--shutdown-timeout', type=float, default=300.0,
+                        help='seconds to wait for running jobs on shutdown')
+    args = parser.parse_args()
+
+    # This process is the worker; the app must not start its own inline workers too
+    os.environ['JOB_INLINE_WORKERS'] = '0'
+    sys.path.insert(0, BASE_DIR)
+    import app as margen
+    from job_queue import JobWorker
+
+    if not margen.model:
+        print("❌ AI model not configured (GEMINI_API_KEY)")
+        sys.exit(1)
+
+    worker = JobWorker(margen.app, margen.job_queue, margen.JOB_HANDLERS, concurrency=args.concurrency,
+                       poll_interval=args.poll_interval, webhook_hosts=margen.JOB_WEBHOOK_HOSTS)
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stopping.set())
+
+    print(f"👷 Job worker {worker.worker_id}: {args.concurrency} threads, kinds {', '.join(margen.JOB_HANDLERS)}")
+    worker.start()
+    started = time.monotonic()
+    while not stopping.wait(60):
+        with margen.app.app_context():
+            queued = margen.job_queue.stats()['queued']
+        print(f"📊 {worker.processed['completed']} completed, {worker.processed['failed']} failed, "
+              f"{worker.processed['retried']} retried, {queued} queued")
+
+    print("🛑 Stopping: finishing running jobs...")
+    worker.stop(args.shutdown_timeout)
+    margen.event_log.flush()
+    print(f"✅ Stopped after {time.monotonic() - started:.0f}s: {worker.processed['completed']} completed, "
+          f"{worker.processed['failed']} failed, {worker.processed['retried']} retried")
+
+
+if __name__ == '__main__':
+    main()
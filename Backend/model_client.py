@@ -0,0 +1,369 @@
+"""
+MARGEN AI - Gemini Call Policy
+Token-bucket rate limiting (per process, or shared through SQLite/Redis), jittered
+exponential backoff for retryable errors, per-route deadlines and a circuit breaker
+around every Gemini call, with counters for /ai-stats
+"""
+
+import os
+import random
+import sqlite3
+import threading
+import time
+
+# HTTP status codes worth retrying: throttling and transient upstream failures
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def _retryable_types():
+    types = [TimeoutError, ConnectionError]
+    try:
+        from google.api_core import exceptions as google_exceptions
+        types += [google_exceptions.TooManyRequests, google_exceptions.ResourceExhausted,
+                  google_exceptions.ServiceUnavailable, google_exceptions.InternalServerError,
+                  google_exceptions.DeadlineExceeded, google_exceptions.GatewayTimeout]
+    except ImportError:
+        pass
+    try:
+        import requests  # The SDK's REST transport raises these
+        types += [requests.exceptions.ConnectionError, requests.exceptions.Timeout]
+    except ImportError:
+        pass
+    return tuple(types)
+
+
+RETRYABLE_ERRORS = _retryable_types()
+
+
+def is_retryable(error):
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    code = getattr(error, 'code', None) or getattr(error, 'status_code', None)
+    try:
+        return int(code) in RETRYABLE_STATUS
+    except (TypeError, ValueError):
+        return False
+
+
+def request_options(timeout):
+    """request_options for generate_content/send_message carrying the remaining deadline"""
+    return {'timeout': timeout} if timeout else None
+
+
+class ModelUnavailableError(Exception):
+    """Gemini could not answer in time: throttled, failing, or the breaker is open"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(ModelUnavailableError):
+    pass
+
+
+# -----------------------------------------------------------------------------
+# Rate Limiters
+# -----------------------------------------------------------------------------
+
+class TokenBucket:
+    """Per-process bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token and return 0, or return how long to wait before one is available"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+class SQLiteTokenBucket:
+    """Bucket row in a SQLite file, so every worker process on the host shares one budget"""
+
+    def __init__(self, rate, capacity, path, name='gemini'):
+        self.rate = rate
+        self.capacity = capacity
+        self.path = path
+        self.name = name
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS model_rate_limit ('
+            ' name TEXT PRIMARY KEY,'
+            ' tokens REAL NOT NULL,'
+            ' updated_at REAL NOT NULL)'
+        )
+        conn.execute('INSERT OR IGNORE INTO model_rate_limit (name, tokens, updated_at) VALUES (?, ?, ?)',
+                     (name, float(capacity), time.time()))
+        conn.commit()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def reserve(self):
+        conn = self._connection()
+        # IMMEDIATE takes the write lock up front so two processes cannot spend the same token
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            tokens, updated_at = conn.execute(
+                'SELECT tokens, updated_at FROM model_rate_limit WHERE name = ?', (self.name,)
+            ).fetchone()
+            now = time.time()
+            tokens = min(self.capacity, tokens + max(0.0, now - updated_at) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            conn.execute('UPDATE model_rate_limit SET tokens = ?, updated_at = ? WHERE name = ?',
+                         (tokens, now, self.name))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+
+class RedisTokenBucket:
+    """Bucket hash in Redis, shared by every process that points at the same server"""
+
+    _SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local capacity = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens') or capacity)
+    local updated = tonumber(redis.call('HGET', KEYS[1], 'updated') or now)
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    local wait = 0
+    if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], 3600)
+    return tostring(wait)
+    """
+
+    def __init__(self, rate, capacity, url, name='margen:ratelimit:gemini'):
+        import redis  # Optional dependency, only needed for this limiter
+        self.rate = rate
+        self.capacity = capacity
+        self.name = name
+        self._script = redis.Redis.from_url(url).register_script(self._SCRIPT)
+
+    def reserve(self):
+        return float(self._script(keys=[self.name], args=[self.rate, self.capacity, time.time()]))
+
+
+# -----------------------------------------------------------------------------
+# Circuit Breaker
+# -----------------------------------------------------------------------------
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive retryable failures; after `reset_timeout`
+    seconds one probe call is let through and its outcome closes or re-opens the circuit"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.trips = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def retry_after(self):
+        with self._lock:
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._probing = False
+
+    def release(self):
+        """Give back a probe slot when the call never reached Gemini"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.trips += 1
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+# -----------------------------------------------------------------------------
+# Client
+# -----------------------------------------------------------------------------
+
+class ModelClient:
+    """Runs Gemini calls under the rate limit, retry, deadline and breaker policy.
+
+    `call(route, fn)` invokes fn(timeout) with the seconds left before the route's
+    deadline; pass it on with request_options(timeout). Non-retryable errors (bad
+    prompts, safety blocks) are raised unchanged and do not count against the breaker.
+    Observers added with add_observer(fn) get fn(route, result, seconds, stream) after
+    every successful call; `stream` marks results whose usage is only known once consumed.
+    """
+
+    def __init__(self, limiter=None, breaker=None, max_attempts=3, backoff_base=0.5, backoff_cap=8.0,
+                 route_deadlines=None, default_deadline=30.0):
+        self.limiter = limiter
+        self.breaker = breaker or CircuitBreaker()
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.route_deadlines = route_deadlines or {}
+        self.default_deadline = default_deadline
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'succeeded': 0, 'failed': 0, 'retries': 0, 'rejected': 0,
+                       'deadline_exceeded': 0, 'rate_limit_wait_seconds': 0.0}
+        self._route_retries = {}
+        self._observers = []
+
+    def add_observer(self, observer):
+        self._observers.append(observer)
+
+    def _notify(self, route, result, seconds, stream):
+        for observer in self._observers:
+            try:
+                observer(route, result, seconds, stream)
+            except Exception as e:
+                # Instrumentation must never fail a model call
+                print(f"Model call observer failed for {route}: {e}")
+
+    def _count(self, field, n=1):
+        with self._lock:
+            self._stats[field] += n
+
+    def _acquire(self, deadline):
+        if self.limiter is None:
+            return
+        waited = 0.0
+        while True:
+            wait = self.limiter.reserve()
+            if wait <= 0:
+                break
+            if time.monotonic() + wait > deadline:
+                self._count('deadline_exceeded')
+                raise ModelUnavailableError("Rate limit wait exceeds the deadline", retry_after=wait)
+            time.sleep(wait)
+            waited += wait
+        if waited:
+            self._count('rate_limit_wait_seconds', waited)
+
+    def backoff(self, attempt):
+        """Full jitter: uniform in [0, min(cap, base * 2**attempt)]"""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def call(self, route, fn, stream=False):
+        self._count('calls')
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.route_deadlines.get(route, self.default_deadline)
+        if not self.breaker.allow():
+            self._count('rejected')
+            raise CircuitOpenError("Gemini circuit is open", retry_after=self.breaker.retry_after())
+
+        attempt = 0
+        while True:
+            try:
+                self._acquire(deadline)
+            except ModelUnavailableError:
+                # Our own budget ran out; that says nothing about upstream health
+                self.breaker.release()
+                self._count('failed')
+                raise
+            try:
+                result = fn(max(0.1, deadline - time.monotonic()))
+            except Exception as e:
+                if not is_retryable(e):
+                    # The call reached Gemini; a rejected prompt says nothing about upstream health
+                    self.breaker.record_success()
+                    self._count('failed')
+                    raise
+                self.breaker.record_failure()
+                delay = self.backoff(attempt)
+                attempt += 1
+                out_of_time = time.monotonic() + delay >= deadline
+                if attempt >= self.max_attempts or self.breaker.state == 'open' or out_of_time:
+                    self._count('failed')
+                    if out_of_time:
+                        self._count('deadline_exceeded')
+                    raise ModelUnavailableError(f"Gemini unavailable after {attempt} attempts: {e}",
+                                                retry_after=self.breaker.retry_after() or delay) from e
+                self._count('retries')
+                with self._lock:
+                    self._route_retries[route] = self._route_retries.get(route, 0) + 1
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            self._count('succeeded')
+            self._notify(route, result, time.perf_counter() - started, stream)
+            return result
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['retries_by_route'] = dict(self._route_retries)
+        stats['rate_limit_wait_seconds'] = round(stats['rate_limit_wait_seconds'], 3)
+        stats['breaker'] = {'state': self.breaker.state, 'trips': self.breaker.trips,
+                            'consecutive_failures': self.breaker.failures}
+        stats['limiter'] = type(self.limiter).__name__ if self.limiter else None
+        return stats
+
+
+def create_model_client_from_env(default_sqlite_path, route_deadlines=None):
+    """Build the client from MODEL_RATE_* / MODEL_RETRY_* / MODEL_BREAKER_* settings"""
+    per_minute = float(os.getenv('MODEL_RATE_PER_MINUTE', '600'))
+    burst = float(os.getenv('MODEL_RATE_BURST', '20'))
+    backend_name = os.getenv('MODEL_RATE_LIMIT_BACKEND', 'memory').lower()
+    limiter = None
+    if per_minute > 0:
+        rate = per_minute / 60.0
+        if backend_name == 'sqlite':
+            limiter = SQLiteTokenBucket(rate, burst, os.getenv('MODEL_RATE_LIMIT_SQLITE_PATH', default_sqlite_path))
+        elif backend_name == 'redis':
+            limiter = RedisTokenBucket(rate, burst, os.getenv('MODEL_RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0'))
+        else:
+            limiter = TokenBucket(rate, burst)
+    return ModelClient(
+        limiter=limiter,
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv('MODEL_BREAKER_FAILURES', '5')),
+            reset_timeout=float(os.getenv('MODEL_BREAKER_RESET_SECONDS', '30'))
+        ),
+        max_attempts=int(os.getenv('MODEL_RETRY_ATTEMPTS', '3')),
+        backoff_base=float(os.getenv('MODEL_RETRY_BACKOFF_BASE', '0.5')),
+        route_deadlines=route_deadlines,
+        default_deadline=float(os.getenv('MODEL_DEFAULT_DEADLINE', '30'))
+    )
@@ -0,0 +1,169 @@
+"""
+MARGEN AI - OTP Store
+One live code per phone, kept as a salted HMAC rather than plaintext. Verification is a
+single lookup on the unique phone index with a constant-time compare; wrong guesses are
+counted per code, and a background sweeper bulk-deletes expired and used codes so the
+table stays small under heavy SMS login traffic.
+"""
+
+import hashlib
+import hmac
+import os
+import secrets
+import tempfile
+import threading
+from datetime import datetime
+
+from sqlalchemy import inspect, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database_models import db, OTP
+
+
+def load_or_create_secret(path):
+    """The OTP secret stored at `path`, created on first use. It lives outside the database so a
+    copy of users.db alone does not reveal it. The secret is written to a temporary file and
+    hard-linked into place, so racing workers only ever see a complete file and agree on one value."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix='.otp_secret-', dir=directory)  # created 0600
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(secrets.token_hex(32))
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.link(temp_path, path)  # fails if another worker got there first
+        except FileExistsError:
+            pass
+    finally:
+        os.unlink(temp_path)
+    with open(path, encoding='utf-8') as f:
+        secret = f.read().strip()
+    if not secret:
+        raise RuntimeError(f"OTP secret file {path} is empty; delete it or set OTP_SECRET")
+    return secret
+
+
+def migrate_otp_table():
+    """Codes from the old plaintext `otps` layout cannot be checked against hashes and
+    live only minutes anyway, so that table is dropped and recreated. Safe on every start."""
+    columns = {column['name'] for column in inspect(db.engine).get_columns('otps')}
+    if 'code_hash' in columns:
+        return False
+    OTP.__table__.drop(db.engine)
+    OTP.__table__.create(db.engine)
+    return True
+
+
+class OTPStore:
+    """Issue and verify one-time codes. `secret` (OTP_SECRET, or the generated secret file)
+    is mixed into every hash, so a copy of the database alone is not enough to brute-force
+    the 6-digit codes."""
+
+    def __init__(self, app, ttl, secret, max_attempts=5, sweep_interval=300):
+        if not secret:
+            raise ValueError("OTPStore needs a non-empty secret")
+        self.app = app
+        self.ttl = ttl
+        self.secret = secret.encode('utf-8')
+        self.max_attempts = max_attempts
+        self.sweep_interval = sweep_interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.counts = {'issued': 0, 'verified': 0, 'rejected': 0, 'locked': 0, 'expired': 0, 'swept': 0}
+
+    def _count(self, field, n=1):
+        with self._lock:
+            self.counts[field] += n
+
+    def _digest(self, salt, phone, code):
+        return hmac.new(self.secret, f"{salt}:{phone}:{code}".encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def hash_code(self, phone, code):
+        salt = secrets.token_hex(8)
+        return f"{salt}:{self._digest(salt, phone, code)}"
+
+    def issue(self, phone):
+        """New code for `phone`, replacing any earlier one and its attempt count"""
+        code = f"{secrets.randbelow(900000) + 100000}"
+        now = datetime.utcnow()
+        values = {'phone': phone, 'code_hash': self.hash_code(phone, code), 'created_at': now,
+                  'expires_at': now + self.ttl, 'attempts': 0, 'is_used': False}
+        statement = sqlite_insert(OTP).values(**values)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=[OTP.phone],
+            set_={name: statement.excluded[name] for name in values if name != 'phone'}
+        ))
+        db.session.commit()
+        self._count('issued')
+        return code
+
+    def verify(self, phone, code):
+        """'ok', 'invalid', 'expired' or 'locked'. A correct code is deleted, so it works once."""
+        otp = db.session.query(OTP.id, OTP.code_hash, OTP.expires_at, OTP.is_used) \
+            .filter(OTP.phone == phone).first()
+        if otp is None or otp.is_used:
+            # Hash anyway, so an unknown phone takes as long as a wrong code
+            self._digest('', phone, code)
+            self._count('rejected')
+            return 'invalid'
+        if otp.expires_at < datetime.utcnow():
+            self._count('expired')
+            return 'expired'
+
+        # Claim the attempt before comparing, in one statement: concurrent guesses each take
+        # their own slot, so no more than max_attempts codes are ever compared
+        claimed = db.session.query(OTP).filter(OTP.id == otp.id, OTP.attempts < self.max_attempts) \
+            .update({'attempts': OTP.attempts + 1}, synchronize_session=False)
+        db.session.commit()
+        if not claimed:
+            self._count('locked')
+            return 'locked'
+
+        salt, _, expected = otp.code_hash.partition(':')
+        if hmac.compare_digest(self._digest(salt, phone, str(code)), expected):
+            # Conditional delete: of two racing requests with the right code, only one logs in
+            deleted = db.session.query(OTP).filter(OTP.id == otp.id).delete(synchronize_session=False)
+            db.session.commit()
+            if deleted:
+                self._count('verified')
+                return 'ok'
+            self._count('rejected')
+            return 'invalid'
+
+        self._count('rejected')
+        return 'invalid'
+
+    def sweep(self):
+        """Bulk-delete expired and used codes; returns rows removed"""
+        deleted = db.session.query(OTP).filter(
+            or_(OTP.expires_at < datetime.utcnow(), OTP.is_used.is_(True))
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        self._count('swept', deleted)
+        return deleted
+
+    def start_sweeper(self):
+        if self.sweep_interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='otp-sweeper', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.sweep_interval):
+            with self.app.app_context():
+                try:
+                    self.sweep()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"OTP sweep failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        counts['max_attempts'] = self.max_attempts
+        return counts
@@ -0,0 +1,20 @@
+"""
+MARGEN AI - Password Hashing
+The functions the credential pool runs in its worker processes. Spawned workers import
+this module to unpickle them, so it must stay free of app imports and start-up work.
+"""
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+def hash_password(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def verify_password(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+
+def hash_method_of(password_hash):
+    """'scrypt:32768:8:1' from 'scrypt:32768:8:1$salt$hash'"""
+    return (password_hash or '').split('$', 1)[0]
@@ -0,0 +1,227 @@
+"""
+MARGEN AI - Catalog Prewarmer
+Generates the roadmap, future-scope report and starter project pitches for every
+featured career ahead of time, so the first user to open one gets a stored answer.
+
+Roadmaps go to the Roadmap tables; reports and pitches go to the AI response
+cache, so run the app and the warmer with AI_CACHE_BACKEND=sqlite (or redis).
+Entries that are already stored and fresh are skipped, so the warmer can run from
+cron. An interrupted run leaves a checkpoint and picks up where it stopped:
+
+    python Backend/prewarm_catalog.py --concurrency 4 --rate-per-minute 30
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CHECKPOINT = os.path.join(BASE_DIR, 'prewarm_checkpoint.jsonl')
+
+
+class RateLimiter:
+    """Spaces calls at least 60/per_minute seconds apart across all threads"""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+        return slot - now
+
+
+class Checkpoint:
+    """Append-only JSONL of finished tasks; removed once a run ends without failures"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.finished = set()
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        self.finished.add(json.loads(line)['task'])
+
+    def mark(self, task, status):
+        with self._lock:
+            self.finished.add(task)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'task': task, 'status': status}) + '\n')
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class CatalogWarmer:
+    def __init__(self, margen, checkpoint, limiter, warm_cache=True):
+        self.margen = margen
+        self.checkpoint = checkpoint
+        self.limiter = limiter
+        self.warm_cache = warm_cache
+        self.results = {}  # kind -> {status: count}
+        self.timings = {}  # kind -> [seconds per generated item]
+        self.rate_wait = 0.0
+        self.complete_careers = 0
+        self._lock = threading.Lock()
+
+    def _record(self, kind, status, seconds=None):
+        with self._lock:
+            counts = self.results.setdefault(kind, {})
+            counts[status] = counts.get(status, 0) + 1
+            if seconds is not None:
+                self.timings.setdefault(kind, []).append(seconds)
+
+    def _run(self, kind, task, is_warm, generate):
+        """One unit of work; returns True when the item is stored after this call"""
+        if task in self.checkpoint.finished:
+            self._record(kind, 'resumed')
+            return True
+        if is_warm():
+            self.checkpoint.mark(task, 'cached')
+            self._record(kind, 'cached')
+            return True
+        waited = self.limiter.wait()
+        started = time.perf_counter()
+        try:
+            generate()
+        except Exception as e:
+            self.margen.db.session.rollback()
+            print(f"❌ {task}: {e}")
+            self._record(kind, 'failed')
+            return False
+        with self._lock:
+            self.rate_wait += waited
+        self.checkpoint.mark(task, 'generated')
+        self._record(kind, 'generated', time.perf_counter() - started)
+        return True
+
+    def _cached_text(self, route, prompt):
+        key = self.margen.make_cache_key(self.margen.GEMINI_MODEL_NAME, prompt.text, prompt.version)
+        return self.margen.ai_cache.get(route, key) is not None
+
+    def warm_career(self, title):
+        margen = self.margen
+        with margen.app.app_context():
+            store = margen.roadmap_store
+            stored = {}
+
+            def roadmap_is_warm():
+                milestones, generated_at = store.lookup(title)
+                stored['milestones'], stored['stale'] = milestones, milestones is not None and store.is_stale(generated_at)
+                return milestones is not None and not stored['stale']
+
+            def generate_roadmap():
+                milestones = margen.generate_roadmap_milestones(title, refresh=stored.get('stale', False))
+                store.save(title, milestones)
+                stored['milestones'] = milestones
+
+            ok = self._run('roadmap', f'roadmap:{title}', roadmap_is_warm, generate_roadmap)
+            if ok and stored.get('milestones') is None:
+                stored['milestones'], _ = store.lookup(title)
+            if self.warm_cache:
+                ok &= self._warm_cached_routes(title, stored.get('milestones') or [])
+            if ok and stored.get('milestones'):
+                with self._lock:
+                    self.complete_careers += 1
+
+    def _warm_cached_routes(self, title, milestones):
+        margen = self.margen
+        scope_prompt = margen.build_future_scope_prompt(title)
+        ok = self._run(
+            'future_scope', f'scope:{title}',
+            lambda: self._cached_text('/generate-future-scope', scope_prompt),
+            lambda: margen.generate_content_cached('/generate-future-scope', scope_prompt)
+        )
+        # Starter pitches use the interests the frontend sends when the field is empty
+        for milestone in milestones:
+            skills = [skill['name'] for skill in milestone['skills']]
+            if not skills:
+                continue
+            prompt = margen.build_project_pitch_prompt(margen.DEFAULT_PITCH_INTERESTS, skills, milestone['title'])
+            ok &= self._run(
+                'project_pitch', f"pitch:{title}:{milestone['title']}",
+                lambda prompt=prompt: self._cached_text('/generate-project-pitch', prompt),
+                lambda prompt=prompt: margen.generate_content_cached('/generate-project-pitch', prompt,
+                                                                     response_format=margen.PROJECT_PITCH_FORMAT)
+            )
+        return ok
+
+    def report(self, careers, elapsed):
+        lines = [f"⏱️  {elapsed:.1f}s wall time, {self.rate_wait:.1f}s spent waiting on the rate limit"]
+        for kind in ('roadmap', 'future_scope', 'project_pitch'):
+            counts = self.results.get(kind)
+            if not counts:
+                continue
+            timings = sorted(self.timings.get(kind, []))
+            timing = (f", p50 {timings[len(timings) // 2]:.1f}s, max {timings[-1]:.1f}s" if timings else '')
+            summary = ', '.join(f"{status} {count}" for status, count in sorted(counts.items()))
+            lines.append(f"   - {kind:<14} {summary}{timing}")
+        coverage = self.complete_careers / len(careers) * 100 if careers else 100.0
+        lines.append(f"📊 Coverage: {self.complete_careers}/{len(careers)} careers fully warm ({coverage:.0f}%)")
+        return '\n'.join(lines)
+
+
+def featured_career_titles(margen):
+    from database_models import Career
+    from sqlite_tuning import read_only_session
+
+    with margen.app.app_context(), read_only_session(margen.db) as session:
+        return [title for (title,) in session.query(Career.title).filter(Career.is_featured.is_(True)).order_by(Career.title)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=4, help='careers warmed in parallel (max in-flight model calls)')
+    parser.add_argument('--rate-per-minute', type=float, default=30, help='model calls per minute across all threads, 0 = unlimited')
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT)
+    parser.add_argument('--fresh', action='store_true', help='ignore an existing checkpoint')
+    parser.add_argument('--careers', nargs='*', help='warm these titles instead of the featured catalog')
+    args = parser.parse_args()
+
+    sys.path.insert(0, BASE_DIR)
+    import app as margen
+    from ai_cache import MemoryBackend
+
+    if not margen.model:
+        print("❌ AI model not configured (GEMINI_API_KEY)")
+        sys.exit(1)
+    warm_cache = not isinstance(margen.ai_cache.backend, MemoryBackend)
+    if not warm_cache:
+        print("⚠️  AI_CACHE_BACKEND is 'memory': only roadmaps are warmed. Use sqlite or redis to share reports and pitches.")
+
+    if args.fresh:
+        Checkpoint(args.checkpoint).clear()
+    checkpoint = Checkpoint(args.checkpoint)
+    careers = args.careers or featured_career_titles(margen)
+    print(f"🔥 Prewarming {len(careers)} careers, concurrency {args.concurrency}, {args.rate_per_minute:g} calls/min"
+          + (f", resuming {len(checkpoint.finished)} finished tasks" if checkpoint.finished else ''))
+    print("=" * 50)
+
+    warmer = CatalogWarmer(margen, checkpoint, RateLimiter(args.rate_per_minute), warm_cache=warm_cache)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix='prewarm') as pool:
+        list(pool.map(warmer.warm_career, careers))
+    margen.event_log.flush()
+
+    print(warmer.report(careers, time.perf_counter() - started))
+    if any(counts.get('failed') for counts in warmer.results.values()):
+        print(f"⚠️  Some items failed; re-run to retry them (checkpoint: {args.checkpoint})")
+        sys.exit(1)
+    checkpoint.clear()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""
+MARGEN AI - Profile Store
+Saves profile documents (whole from /save-profile, merge-patched from PATCH /profile)
+into the normalized UserSkill/UserInterest tables and reads profiles and recommendations
+back with eager loading, in a fixed number of queries
+"""
+
+import json
+
+from sqlalchemy import func, inspect, text
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from database_models import db, User, Skill, UserSkill, Interest, UserInterest, CareerRecommendation
+from sqlite_tuning import read_only_session
+
+PROFICIENCY_CONFIDENCE = {'beginner': 3, 'intermediate': 5, 'advanced': 7, 'expert': 9}
+INTENSITY_CONFIDENCE = {'low': 3, 'medium': 5, 'high': 7, 'very_high': 9}
+
+
+def parse_profile_items(value, level_key, default_level, levels):
+    """Normalize 'Python, SQL', ['Python'] or [{'name': 'Python', 'level': 'advanced'}]
+    into an ordered {name: level} dict, first spelling of a name wins"""
+    if isinstance(value, str):
+        value = value.split(',')
+    items = {}
+    seen = set()
+    for item in value or []:
+        if isinstance(item, dict):
+            name = str(item.get('name') or '').strip()
+            level = str(item.get(level_key) or item.get('level') or default_level).lower()
+        else:
+            name, level = str(item).strip(), default_level
+        if not name or name.lower() in seen:
+            continue
+        seen.add(name.lower())
+        items[name] = level if level in levels else default_level
+    return items
+
+
+def user_with_profile(session, user_id):
+    """User plus skills and interests: one query for the user, one per collection"""
+    return (
+        session.query(User)
+        .options(
+            selectinload(User.user_skills).joinedload(UserSkill.skill),
+            selectinload(User.user_interests).joinedload(UserInterest.interest)
+        )
+        .filter(User.id == user_id)
+        .first()
+    )
+
+
+def _resolve(model, names, **defaults):
+    """Map names to master rows with one case-insensitive query, creating the missing ones"""
+    if not names:
+        return {}
+    found = model.query.filter(func.lower(model.name).in_([n.lower() for n in names])).all()
+    by_lower = {row.name.lower(): row for row in found}
+    resolved = {}
+    for name in names:
+        row = by_lower.get(name.lower())
+        if row is None:
+            row = model(name=name, **defaults)
+            db.session.add(row)
+            by_lower[name.lower()] = row
+        resolved[name] = row
+    return resolved
+
+
+def _sync(existing, wanted, master_rows, key, make_row, update_row):
+    """Reconcile a user's association rows with `wanted` ({name: level}); returns the new list"""
+    by_master = {getattr(row, key): row for row in existing}
+    rows = []
+    for name, level in wanted.items():
+        master = master_rows[name]
+        row = by_master.get(master)
+        if row is None:
+            row = make_row(master, level)
+        else:
+            update_row(row, level)
+        rows.append(row)
+    return rows
+
+
+def merge_patch(target, patch):
+    """RFC 7386 JSON merge patch: objects merge key by key, null removes a key and
+    anything else (arrays included) replaces the old value"""
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def stored_profile(user):
+    return json.loads(user.profile_data) if user.profile_data else {}
+
+
+def profile_etag(user_id, version):
+    return f"profile-{user_id}-{version}"
+
+
+class ProfileConflict(Exception):
+    """The profile was saved by another request after `user` was loaded"""
+
+
+def save_user_profile(user, profile):
+    """Store the profile document and sync its skills and interests; caller commits.
+    Returns False, writing nothing, when the document is unchanged; skills and interests
+    are only re-synced when their part of the document changed.
+    The document and the version bump are one UPDATE ... WHERE profile_version = <version
+    `user` was loaded with>; ProfileConflict is raised when another save got there first.
+    `user` should come from user_with_profile so the collections are already loaded."""
+    previous = stored_profile(user)
+    if previous == profile and user.profile_completed:
+        return False
+    profile_data = json.dumps(profile)
+    if user.id is None:
+        # Not inserted yet (legacy migration): nothing to race with
+        user.profile_data = profile_data
+        user.profile_completed = True
+    else:
+        expected = user.profile_version
+        updated = db.session.query(User).filter(User.id == user.id, User.profile_version == expected).update(
+            {'profile_data': profile_data, 'profile_completed': True, 'profile_version': User.profile_version + 1},
+            synchronize_session=False)
+        if not updated:
+            raise ProfileConflict()
+        # Already written: record the values without marking the row dirty again
+        set_committed_value(user, 'profile_data', profile_data)
+        set_committed_value(user, 'profile_completed', True)
+        set_committed_value(user, 'profile_version', expected + 1)
+
+    if profile.get('skills') != previous.get('skills'):
+        _sync_skills(user, profile)
+    if profile.get('interests') != previous.get('interests'):
+        _sync_interests(user, profile)
+    return True
+
+
+def _sync_skills(user, profile):
+    skills = parse_profile_items(profile.get('skills'), 'proficiency', 'intermediate', PROFICIENCY_CONFIDENCE)
+    skill_rows = _resolve(Skill, list(skills), category='technical', subcategory='user_defined')
+
+    def set_skill_level(row, level):
+        row.proficiency_level = level
+        row.confidence_score = PROFICIENCY_CONFIDENCE[level]
+
+    # delete-orphan cascade removes the rows that are no longer listed
+    user.user_skills = _sync(
+        user.user_skills, skills, skill_rows, 'skill',
+        lambda skill, level: UserSkill(skill=skill, proficiency_level=level, confidence_score=PROFICIENCY_CONFIDENCE[level]),
+        set_skill_level
+    )
+
+
+def _sync_interests(user, profile):
+    interests = parse_profile_items(profile.get('interests'), 'intensity', 'medium', INTENSITY_CONFIDENCE)
+    interest_rows = _resolve(Interest, list(interests), category='general')
+
+    def set_interest_level(row, level):
+        row.intensity_level = level
+        row.confidence_score = INTENSITY_CONFIDENCE[level]
+
+    user.user_interests = _sync(
+        user.user_interests, interests, interest_rows, 'interest',
+        lambda interest, level: UserInterest(interest=interest, intensity_level=level, confidence_score=INTENSITY_CONFIDENCE[level]),
+        set_interest_level
+    )
+
+
+def load_user_profile(user_id):
+    """Profile document with normalized skills and interests, or None (3 queries)"""
+    with read_only_session(db) as session:
+        user = user_with_profile(session, user_id)
+        if user is None:
+            return None
+        return {
+            'user': user.to_dict(),
+            'profile': stored_profile(user),
+            'version': user.profile_version,
+            'skills': [user_skill.to_dict() for user_skill in user.user_skills],
+            'interests': [user_interest.to_dict() for user_interest in user.user_interests]
+        }
+
+
+def load_profile_version(user_id):
+    """Current version of a user's row, for answering If-None-Match in one query"""
+    with read_only_session(db) as session:
+        return session.query(User.profile_version).filter(User.id == user_id).scalar()
+
+
+def load_recommendations(user_id, limit=20):
+    """Latest career recommendations for a user, careers joined in (1 query)"""
+    with read_only_session(db) as session:
+        recommendations = (
+            session.query(CareerRecommendation)
+            .options(joinedload(CareerRecommendation.career))
+            .filter(CareerRecommendation.user_id == user_id)
+            .order_by(CareerRecommendation.created_at.desc(), CareerRecommendation.id.desc())
+            .limit(limit)
+            .all()
+        )
+        return [recommendation.to_dict() for recommendation in recommendations]
+
+
+def migrate_legacy_users():
+    """Copy accounts from the app's old `user` table (email, password, profile_data JSON)
+    into `users`, once per email. Safe to run on every start."""
+    inspector = inspect(db.engine)
+    columns = {column['name'] for column in inspector.get_columns('users')}
+    if 'profile_data' not in columns:
+        db.session.execute(text('ALTER TABLE users ADD COLUMN profile_data TEXT'))
+        db.session.commit()
+    if 'profile_version' not in columns:
+        db.session.execute(text('ALTER TABLE users ADD COLUMN profile_version INTEGER NOT NULL DEFAULT 1'))
+        db.session.commit()
+    if not inspector.has_table('user'):
+        return 0
+
+    legacy = db.session.execute(text(
+        'SELECT email, password, profile_data FROM "user" '
+        'WHERE email NOT IN (SELECT email FROM users)'
+    )).all()
+    for email, password_hash, profile_data in legacy:
+        user = User(email=email, password_hash=password_hash)
+        db.session.add(user)
+        if profile_data:
+            try:
+                save_user_profile(user, json.loads(profile_data))
+            except (ValueError, AttributeError):
+                user.profile_data = profile_data
+        # Flush per user so two legacy profiles naming a new skill share one Skill row
+        db.session.flush()
+    db.session.commit()
+    return len(legacy)
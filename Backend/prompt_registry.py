@@ -0,0 +1,204 @@
+"""
+MARGEN AI - Prompt Registry
+Versioned prompt templates, parsed once at startup and rendered by joining literal
+chunks with field values. The fixed part of each template is counted with the model's
+count_tokens once per template version (in the background; a local estimate stands in
+until then), so every render knows its prompt size without a round trip, and user fields
+are trimmed to keep each route inside its token budget. Each template has a version id
+(name@version+text hash) that goes into cache keys and logs.
+"""
+
+import hashlib
+import string
+import textwrap
+import threading
+from collections import Counter, namedtuple
+
+# A rendered prompt: text for the model, the template's version id, the estimated
+# prompt tokens and the names of fields that were trimmed to fit the budget
+Prompt = namedtuple('Prompt', 'text version tokens trimmed')
+
+ELLIPSIS = '…'
+
+
+def estimate_tokens(text):
+    """Cheap local estimate (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def trim_text(text, max_tokens):
+    """`text` cut to about `max_tokens`, on a word boundary when one is close"""
+    max_chars = max(0, max_tokens) * 4
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    space = cut.rfind(' ')
+    if space > max_chars // 2:
+        cut = cut[:space]
+    return cut.rstrip(' ,;') + ELLIPSIS
+
+
+class PromptTemplate:
+    """A str.format-style template compiled into literal chunks and field names.
+    `budget` caps the whole prompt in tokens; only fields named in `trim` (user input)
+    are cut to meet it. Indentation from triple-quoted source is removed at compile time."""
+
+    def __init__(self, name, version, text, budget=None, trim=()):
+        self.name = name
+        self.version = version
+        self.text = textwrap.dedent(text).strip()
+        self.budget = budget
+        self.trim = tuple(trim)
+
+        literals, fields = [], []
+        pending = ''
+        for literal, field, spec, conversion in string.Formatter().parse(self.text):
+            pending += literal
+            if field is None:
+                continue
+            if not field or spec or conversion:
+                raise ValueError(f"Prompt {name}: only plain named fields are supported, got {{{field}}}")
+            literals.append(pending)
+            fields.append(field)
+            pending = ''
+        literals.append(pending)
+        self.literals = tuple(literals)
+        self.fields = tuple(fields)
+        self.occurrences = Counter(fields)  # a field can appear more than once
+        self.static_text = ''.join(self.literals)
+        unknown = set(self.trim) - set(self.fields)
+        if unknown:
+            raise ValueError(f"Prompt {name}: trim names unknown fields {sorted(unknown)}")
+
+        digest = hashlib.sha256(self.text.encode('utf-8')).hexdigest()[:8]
+        self.version_id = f"{name}@{version}+{digest}"
+
+    def join(self, values):
+        """The prompt text for a {field: str} mapping"""
+        literals = self.literals
+        parts = [literals[0]]
+        for field, literal in zip(self.fields, literals[1:]):
+            parts.append(values[field])
+            parts.append(literal)
+        return ''.join(parts)
+
+
+class PromptRegistry:
+    """Registered templates by name. count_tokens(text) is the model's counter (None when
+    no model is configured); fields in a template's `trim` are capped at max_field_tokens."""
+
+    def __init__(self, count_tokens=None, max_field_tokens=200):
+        self.count_tokens = count_tokens
+        self.max_field_tokens = max_field_tokens
+        self._templates = {}
+        self._token_counts = {}  # version id -> (tokens, 'counted' or 'estimated')
+        self._counts = {}  # name -> {'renders', 'trimmed', 'tokens', 'max_tokens'}
+        self._lock = threading.Lock()
+        self._counter = None
+
+    def register(self, template):
+        with self._lock:
+            if template.name in self._templates:
+                raise ValueError(f"Prompt {template.name} is already registered")
+            self._templates[template.name] = template
+            self._counts[template.name] = {'renders': 0, 'trimmed': 0, 'tokens': 0, 'max_tokens': 0}
+        return template
+
+    def get(self, name):
+        return self._templates[name]
+
+    def version(self, name):
+        return self._templates[name].version_id
+
+    def template_tokens(self, template):
+        """Tokens in the template's fixed text: counted once per version, estimated until then"""
+        cached = self._token_counts.get(template.version_id)
+        if cached is not None:
+            return cached[0]
+        return estimate_tokens(template.static_text)
+
+    def count_templates(self):
+        """Count every template version not counted yet; returns how many were counted"""
+        counted = 0
+        for template in list(self._templates.values()):
+            if self._token_counts.get(template.version_id, (None, None))[1] == 'counted':
+                continue
+            tokens, source = estimate_tokens(template.static_text), 'estimated'
+            try:
+                result = self.count_tokens(template.static_text) if self.count_tokens is not None else None
+            except Exception as e:
+                result = None
+                print(f"Counting tokens for prompt {template.version_id} failed: {e}")
+            if result is not None:  # None: no model configured
+                tokens, source = int(result), 'counted'
+                counted += 1
+            with self._lock:
+                self._token_counts[template.version_id] = (tokens, source)
+        return counted
+
+    def start_counting(self):
+        """Count template tokens on a background thread so startup never waits on the model"""
+        if self._counter is not None:
+            return
+        self._counter = threading.Thread(target=self.count_templates, name='prompt-token-count', daemon=True)
+        self._counter.start()
+
+    def trim_field(self, value, max_tokens=None):
+        return trim_text(value, self.max_field_tokens if max_tokens is None else max_tokens)
+
+    def render(self, name, **fields):
+        """Render template `name`; every field is converted with str() and trimmable
+        fields are cut to fit the per-field cap and the template's budget"""
+        template = self._templates[name]
+        values = {field: str(fields[field]) for field in template.occurrences}
+        trimmed = []
+        for field in template.trim:
+            value = self.trim_field(values[field])
+            if value is not values[field]:
+                values[field] = value
+                trimmed.append(field)
+
+        fixed = self.template_tokens(template)
+        sizes = {field: estimate_tokens(value) * template.occurrences[field] for field, value in values.items()}
+        if template.budget is not None and template.trim:
+            # Whatever the fixed text and untrimmable fields leave is shared out among the
+            # trimmable ones: small fields keep their text, the largest give way first
+            available = template.budget - fixed - sum(size for field, size in sizes.items() if field not in template.trim)
+            remaining = sorted(template.trim, key=lambda field: sizes[field] / template.occurrences[field])
+            while remaining:
+                share = available // sum(template.occurrences[field] for field in remaining)
+                field = remaining.pop(0)
+                occurrences = template.occurrences[field]
+                if sizes[field] > share * occurrences:
+                    values[field] = trim_text(values[field], share - 1)  # the ellipsis costs a token
+                    sizes[field] = estimate_tokens(values[field]) * occurrences
+                    if field not in trimmed:
+                        trimmed.append(field)
+                available -= sizes[field]
+
+        tokens = fixed + sum(sizes.values())
+        with self._lock:
+            counts = self._counts[name]
+            counts['renders'] += 1
+            counts['trimmed'] += 1 if trimmed else 0
+            counts['tokens'] += tokens
+            counts['max_tokens'] = max(counts['max_tokens'], tokens)
+        return Prompt(template.join(values), template.version_id, tokens, tuple(trimmed))
+
+    def stats(self):
+        with self._lock:
+            stats = {}
+            for name, template in self._templates.items():
+                counts = self._counts[name]
+                tokens, source = self._token_counts.get(template.version_id, (estimate_tokens(template.static_text), 'estimated'))
+                stats[name] = {
+                    'version': template.version_id,
+                    'template_tokens': tokens,
+                    'token_source': source,
+                    'budget': template.budget,
+                    'renders': counts['renders'],
+                    'trimmed': counts['trimmed'],
+                    'avg_tokens': round(counts['tokens'] / counts['renders'], 1) if counts['renders'] else None,
+                    'max_tokens': counts['max_tokens'],
+                }
+            return stats
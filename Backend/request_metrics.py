@@ -0,0 +1,271 @@
+"""
+MARGEN AI - Request Metrics
+Per-request timing split into queue, database, model and app phases, Gemini token usage
+and cost, cache results and response sizes, rendered in the Prometheus text format
+"""
+
+import random
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list(extra or [])
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        with self._lock:
+            series = self._series.setdefault(labels, [0] * len(self.buckets) + [0.0, 0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            for bound, count in zip(self.buckets, values):
+                le = _format_labels(self.labelnames, labels, [('le', _format_number(float(bound)))])
+                lines.append(f"{self.name}_bucket{le} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, [('le', '+Inf')])} {values[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_number(values[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {values[-1]}")
+        return lines
+
+
+def usage_tokens(response):
+    """(prompt, output) token counts from a Gemini response's usage_metadata, 0 when absent"""
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return 0, 0
+    return int(getattr(usage, 'prompt_token_count', 0) or 0), int(getattr(usage, 'candidates_token_count', 0) or 0)
+
+
+def queue_seconds(header, now):
+    """Time spent before the app saw the request, from an X-Request-Start header
+    set by the proxy ('t=<epoch>' in seconds, milliseconds or microseconds)"""
+    try:
+        started = float(header.strip().lstrip('t='))
+    except (AttributeError, ValueError):
+        return None
+    if started > 1e14:
+        started /= 1e6
+    elif started > 1e11:
+        started /= 1e3
+    return max(0.0, now - started)
+
+
+class RequestTrace:
+    def __init__(self, route, method, queue=None):
+        self.route = route
+        self.method = method
+        self.started = time.perf_counter()
+        self.queue = queue
+        self.db = 0.0
+        self.model = 0.0
+        self.cache = None
+        self.status = None
+        self.size = 0
+        self.sampled = False
+
+
+class RequestMetrics:
+    """Flask extension collecting the per-route metrics served by `/metrics`.
+
+    sample_rate is the fraction of requests whose model calls are persisted to
+    ai_interactions; prices are USD per million prompt/output tokens for the cost counter.
+    """
+
+    def __init__(self, sample_rate=0.1, input_price_per_million=0.0, output_price_per_million=0.0):
+        self.sample_rate = sample_rate
+        self.input_price = input_price_per_million / 1e6
+        self.output_price = output_price_per_million / 1e6
+        self.requests = Histogram('margen_request_duration_seconds', 'Wall time per request, after queueing',
+                                  ('route', 'method', 'status', 'cache'))
+        self.phases = Histogram('margen_request_phase_seconds', 'Request wall time by phase (queue, db, model, app)',
+                                ('route', 'phase'))
+        self.response_size = Histogram('margen_response_size_bytes', 'Response body size', ('route',), SIZE_BUCKETS)
+        self.model_calls = Histogram('margen_model_call_seconds', 'Gemini call time including retries',
+                                     ('route',))
+        self.model_tokens = Histogram('margen_model_tokens', 'Tokens per Gemini call', ('route', 'kind'), TOKEN_BUCKETS)
+        self.tokens = Counter('margen_model_tokens_total', 'Gemini tokens used', ('route', 'kind'))
+        self.cost = Counter('margen_model_cost_usd_total', 'Estimated Gemini spend in USD', ('route',))
+        self.cache = Counter('margen_cache_lookups_total', 'AI response cache lookups by result', ('route', 'result'))
+        self._metrics = (self.requests, self.phases, self.response_size, self.model_calls,
+                         self.model_tokens, self.tokens, self.cost, self.cache)
+
+    def init_app(self, app):
+        app.before_request(self._start)
+        app.after_request(self._finish_response)
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(Engine, 'handle_error', self._handle_error)
+
+    # --- Request lifecycle ---
+
+    @staticmethod
+    def _route():
+        rule = request.url_rule
+        return rule.rule if rule is not None else 'unmatched'
+
+    def _start(self):
+        trace = RequestTrace(self._route(), request.method,
+                             queue_seconds(request.headers.get('X-Request-Start'), time.time()))
+        trace.sampled = random.random() < self.sample_rate
+        g.request_trace = trace
+
+    def _finish_response(self, response):
+        trace = g.get('request_trace')
+        if trace is None:
+            return response
+        trace.status = response.status_code
+        if response.is_streamed:
+            # The body is still being generated here, so wall time is taken once it is closed
+            response.response = self._count_bytes(response.response, trace)
+            response.call_on_close(lambda: self._observe(trace))
+        else:
+            trace.size = response.calculate_content_length() or 0
+            self._observe(trace)
+        return response
+
+    @staticmethod
+    def _count_bytes(body, trace):
+        try:
+            for chunk in body:
+                trace.size += len(chunk)
+                yield chunk
+        finally:
+            close = getattr(body, 'close', None)
+            if close:
+                close()
+
+    def _observe(self, trace):
+        wall = time.perf_counter() - trace.started
+        self.requests.observe(wall, (trace.route, trace.method, str(trace.status), trace.cache or 'none'))
+        if trace.queue is not None:
+            self.phases.observe(trace.queue, (trace.route, 'queue'))
+        self.phases.observe(trace.db, (trace.route, 'db'))
+        self.phases.observe(trace.model, (trace.route, 'model'))
+        self.phases.observe(max(0.0, wall - trace.db - trace.model), (trace.route, 'app'))
+        self.response_size.observe(trace.size, (trace.route,))
+
+    # --- Hooks ---
+
+    @staticmethod
+    def current():
+        return g.get('request_trace') if has_request_context() else None
+
+    # The start time rides on the statement's execution context, so a statement that fails
+    # (no after_cursor_execute) cannot leave a start behind for the next one to pick up
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.margen_query_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._add_db_time(context)
+
+    def _handle_error(self, exception_context):
+        self._add_db_time(exception_context.execution_context)
+
+    def _add_db_time(self, context):
+        started = getattr(context, 'margen_query_started', None)
+        if started is None:
+            return
+        context.margen_query_started = None
+        trace = self.current()
+        if trace is not None:
+            trace.db += time.perf_counter() - started
+
+    def observe_model_call(self, route, response, seconds, stream=False):
+        """ModelClient observer: model phase time, and tokens for non-streamed responses"""
+        self.model_calls.observe(seconds, (route,))
+        trace = self.current()
+        if trace is not None:
+            trace.model += seconds
+        if not stream:
+            self.observe_usage(route, response)
+
+    def observe_stream(self, route, last_chunk, seconds):
+        """Reading a streamed response is model time too; usage arrives on the last chunk"""
+        trace = self.current()
+        if trace is not None:
+            trace.model += seconds
+        self.observe_usage(route, last_chunk)
+
+    def observe_usage(self, route, response):
+        """Token and cost counters from a response (the last chunk, for streams)"""
+        prompt_tokens, output_tokens = usage_tokens(response)
+        if not prompt_tokens and not output_tokens:
+            return
+        self.model_tokens.observe(prompt_tokens, (route, 'prompt'))
+        self.model_tokens.observe(output_tokens, (route, 'output'))
+        self.tokens.inc((route, 'prompt'), prompt_tokens)
+        self.tokens.inc((route, 'output'), output_tokens)
+        self.cost.inc((route,), prompt_tokens * self.input_price + output_tokens * self.output_price)
+
+    def observe_cache(self, route, result):
+        """result is 'hit', 'miss' or 'stale'"""
+        self.cache.inc((route, result))
+        trace = self.current()
+        if trace is not None:
+            trace.cache = result
+
+    def sampled(self):
+        """Whether this request's model calls go to ai_interactions"""
+        trace = self.current()
+        return trace.sampled if trace is not None else random.random() < self.sample_rate
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,172 @@
+"""
+MARGEN AI - Roadmap Store
+Materializes validated /generate-roadmap output into the Roadmap/RoadmapSkill tables
+and serves later requests for the same career straight from the database
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.orm import contains_eager, joinedload
+
+from database_models import db, Career, Roadmap, RoadmapSkill, Skill
+from sqlite_tuning import read_only_session
+
+
+def normalize_career_title(title):
+    """Collapse whitespace so 'Data  Scientist ' and 'Data Scientist' share a roadmap"""
+    return ' '.join((title or '').split())
+
+
+def validate_roadmap(milestones):
+    """Check the milestone/skill shape the frontend relies on, raising ValueError if it is off"""
+    if not isinstance(milestones, list) or not milestones:
+        raise ValueError("Roadmap must be a non-empty list of milestones")
+    for milestone in milestones:
+        if not isinstance(milestone, dict) or not isinstance(milestone.get('title'), str):
+            raise ValueError("Every milestone needs a string 'title'")
+        skills = milestone.get('skills')
+        if not isinstance(skills, list):
+            raise ValueError(f"Milestone '{milestone['title']}' needs a 'skills' list")
+        for skill in skills:
+            if not isinstance(skill, dict) or not isinstance(skill.get('name'), str) or not skill['name'].strip():
+                raise ValueError(f"Milestone '{milestone['title']}' has a skill without a name")
+            resource = skill.get('resource')
+            if resource is not None and not isinstance(resource, dict):
+                raise ValueError(f"Skill '{skill['name']}' has an invalid resource")
+    return milestones
+
+
+class RoadmapStore:
+    """Read-through store for generated roadmaps, keyed by career title"""
+
+    def __init__(self, app, generate, stale_after=timedelta(days=30)):
+        self.app = app
+        # generate(career_title) -> validated milestones, used for background refreshes
+        self.generate = generate
+        self.stale_after = stale_after
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='roadmap-refresh')
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, career_title):
+        """Return stored milestones (or None) and schedule a refresh when they are stale"""
+        title = normalize_career_title(career_title)
+        milestones, generated_at = self.lookup(title)
+        if milestones is None:
+            return None
+        if self.is_stale(generated_at):
+            self.refresh_async(title)
+        return milestones
+
+    def is_stale(self, generated_at):
+        """Generated roadmaps go stale; curated ones (generated_at None) never do"""
+        return generated_at is not None and datetime.utcnow() - generated_at > self.stale_after
+
+    def lookup(self, career_title):
+        """(milestones, generated_at) for a stored roadmap, or (None, None); never refreshes.
+        generated_at is None for curated roadmaps, so they are never regenerated."""
+        title = normalize_career_title(career_title)
+        # One statement on the read-only pool: roadmaps joined to their career, skills and skill names
+        with read_only_session(db) as session:
+            roadmaps = (
+                session.query(Roadmap)
+                .join(Roadmap.career)
+                .options(
+                    contains_eager(Roadmap.career),
+                    joinedload(Roadmap.roadmap_skills).joinedload(RoadmapSkill.skill)
+                )
+                .filter(func.lower(Career.title) == title.lower(), Roadmap.is_active.is_(True))
+                .order_by(Roadmap.phase_order)
+                .all()
+            )
+            if not roadmaps:
+                return None, None
+            if all(roadmap.generated for roadmap in roadmaps):
+                generated_at = min(roadmap.created_at for roadmap in roadmaps)
+            else:
+                generated_at = None
+            return [self._milestone_to_dict(roadmap) for roadmap in roadmaps], generated_at
+
+    @staticmethod
+    def _milestone_to_dict(roadmap):
+        # Skills stored without a link (imported, or repaired answers) get resource None
+        skills = sorted(roadmap.roadmap_skills, key=lambda rs: rs.skill_order)
+        return {
+            'title': roadmap.title,
+            'skills': [
+                {
+                    'name': rs.skill.name,
+                    'resource': {'name': rs.resource_name, 'link': rs.resource_link} if rs.resource_link else None
+                }
+                for rs in skills
+            ]
+        }
+
+    def save(self, career_title, milestones):
+        """Store a validated roadmap as the career's active one. Roadmaps this store generated
+        before are replaced; curated or imported ones are kept but deactivated."""
+        title = normalize_career_title(career_title)
+        career = Career.query.filter(func.lower(Career.title) == title.lower()).first()
+        if career is None:
+            career = Career(
+                title=title,
+                description=f"AI-generated learning path for {title}",
+                category='ai_generated',
+                difficulty_level='intermediate'
+            )
+            db.session.add(career)
+
+        # Resolve every skill name with one query, creating only the missing ones
+        names = {skill['name'].strip() for milestone in milestones for skill in milestone['skills']}
+        skills_by_name = {s.name: s for s in Skill.query.filter(Skill.name.in_(names)).all()} if names else {}
+        for name in names - skills_by_name.keys():
+            skill = Skill(name=name, category='technical', subcategory='roadmap')
+            db.session.add(skill)
+            skills_by_name[name] = skill
+
+        for previous in list(career.roadmaps):
+            if previous.generated:
+                career.roadmaps.remove(previous)  # delete-orphan removes the phase and its skills
+            else:
+                previous.is_active = False
+        for phase_order, milestone in enumerate(milestones, start=1):
+            roadmap = Roadmap(
+                title=milestone['title'],
+                phase_order=phase_order,
+                difficulty_level=career.difficulty_level,
+                generated=True
+            )
+            for skill_order, skill_data in enumerate(milestone['skills'], start=1):
+                resource = skill_data.get('resource') or {}
+                roadmap.roadmap_skills.append(RoadmapSkill(
+                    skill=skills_by_name[skill_data['name'].strip()],
+                    skill_order=skill_order,
+                    skill_type='recommended',
+                    resource_name=resource.get('name'),
+                    resource_link=resource.get('link')
+                ))
+            career.roadmaps.append(roadmap)
+        career.updated_at = datetime.utcnow()
+        db.session.commit()
+
+    def refresh_async(self, career_title):
+        """Regenerate a roadmap off the request thread, at most once at a time per career"""
+        key = career_title.lower()
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        self._executor.submit(self._refresh, career_title, key)
+
+    def _refresh(self, career_title, key):
+        try:
+            with self.app.app_context():
+                self.save(career_title, self.generate(career_title))
+        except Exception as e:
+            print(f"Roadmap refresh failed for {career_title}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
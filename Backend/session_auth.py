@@ -0,0 +1,186 @@
+"""
+MARGEN AI - Session Authentication
+Resolves the caller from an 'Authorization: Bearer <token>' header: the signature and
+expiry are checked locally, revoked tokens come from an in-memory copy of the
+revoked_tokens table that a background thread keeps current, and user rows are served
+from an in-process LRU, so an authenticated request costs no identity query.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+
+from flask import g, jsonify, request
+
+from database_models import db, RevokedToken, User
+
+
+class UserCache:
+    """LRU of recently seen user rows (as dicts), each kept up to `ttl` seconds"""
+
+    def __init__(self, max_entries=10000, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counts = {'hits': 0, 'misses': 0}
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.counts['hits'] += 1
+                return entry[1]
+            self.counts['misses'] += 1
+
+        user = db.session.get(User, user_id)
+        row = user.to_dict() if user is not None else None
+        if row is not None:
+            with self._lock:
+                self._entries[user_id] = (time.monotonic() + self.ttl, row)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return row
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, entries=len(self._entries))
+
+
+class RevocationList:
+    """Revoked token ids. Revocations in this process apply at once; those made by other
+    workers are picked up by the refresh thread within `refresh_interval` seconds. Refreshes
+    only read; rows of expired tokens are deleted every `purge_interval` seconds."""
+
+    def __init__(self, app, refresh_interval=5, purge_interval=3600):
+        self.app = app
+        self.refresh_interval = refresh_interval
+        self.purge_interval = purge_interval
+        self._next_purge = time.monotonic() + purge_interval
+        self._revoked = {}  # jti -> token expiry
+        self._seen_until = None  # created_at of the newest row loaded
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def is_revoked(self, jti):
+        with self._lock:
+            return jti in self._revoked
+
+    def revoke(self, jti, user_id, expires_at):
+        db.session.merge(RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at))
+        db.session.commit()
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    def refresh(self):
+        """Load revocations made since the last refresh and forget expired ones"""
+        now = datetime.utcnow()
+        query = db.session.query(RevokedToken.jti, RevokedToken.expires_at, RevokedToken.created_at) \
+            .filter(RevokedToken.expires_at > now)
+        if self._seen_until is not None:
+            # Rows landing in the same instant as the last one are read again; harmless
+            query = query.filter(RevokedToken.created_at >= self._seen_until)
+        rows = query.all()
+        with self._lock:
+            for jti, expires_at, created_at in rows:
+                self._revoked[jti] = expires_at
+                if self._seen_until is None or created_at > self._seen_until:
+                    self._seen_until = created_at
+            for jti in [jti for jti, expires_at in self._revoked.items() if expires_at <= now]:
+                del self._revoked[jti]
+        return len(rows)
+
+    def purge(self):
+        """Delete rows of expired tokens (they fail their signature check anyway). The write
+        lock is only taken when there is something to delete; returns rows deleted."""
+        now = datetime.utcnow()
+        expired = db.session.query(RevokedToken).filter(RevokedToken.expires_at <= now)
+        if not db.session.query(expired.exists()).scalar():
+            return 0
+        deleted = expired.delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self.app.app_context():
+            self.refresh()
+        self._thread = threading.Thread(target=self._run, name='token-revocations', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            with self.app.app_context():
+                try:
+                    self.refresh()
+                    if time.monotonic() >= self._next_purge:
+                        self._next_purge = time.monotonic() + self.purge_interval
+                        self.purge()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Revocation list refresh failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {'revoked': len(self._revoked)}
+
+
+class SessionAuth:
+    def __init__(self, tokens, revocations, users):
+        self.tokens = tokens
+        self.revocations = revocations
+        self.users = users
+
+    def claims(self):
+        """Verified claims of this request's bearer token, or None"""
+        if 'session_claims' not in g:
+            header = request.headers.get('Authorization', '')
+            scheme, _, token = header.partition(' ')
+            claims = None
+            if scheme.lower() == 'bearer' and token:
+                claims = self.tokens.verify(token.strip())
+                if claims is not None and self.revocations.is_revoked(claims['jti']):
+                    claims = None
+            g.session_claims = claims
+        return g.session_claims
+
+    def current_user(self):
+        """The signed-in user's row (a dict), or None"""
+        if 'current_user' not in g:
+            claims = self.claims()
+            g.current_user = self.users.get(claims['uid']) if claims is not None else None
+        return g.current_user
+
+    def required(self, view):
+        """Route decorator: 401 unless the request carries a valid session token"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if self.current_user() is None:
+                response = jsonify({"error": "Sign in required"})
+                response.headers['WWW-Authenticate'] = 'Bearer'
+                return response, 401
+            return view(*args, **kwargs)
+        return wrapper
+
+    def revoke_current(self):
+        claims = self.claims()
+        if claims is None:
+            return False
+        self.revocations.revoke(claims['jti'], claims['uid'], claims['exp'])
+        return True
+
+    def stats(self):
+        return {'users': self.users.stats(), 'revocations': self.revocations.stats()}
@@ -0,0 +1,33 @@
+"""
+MARGEN AI - Session Tokens
+Short-lived, HMAC-signed bearer tokens carrying the user id, issued after a login so
+later calls prove who they are without sending (and re-hashing) a password
+"""
+
+import uuid
+from datetime import timedelta
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+
+class SessionTokens:
+    def __init__(self, secret, ttl_seconds=3600):
+        self.ttl_seconds = ttl_seconds
+        self._serializer = URLSafeTimedSerializer(secret, salt='margen-session')
+
+    def issue(self, user_id, subject):
+        """Token for `user_id`; subject is the email or phone the user signed in with,
+        jti names this token so it can be revoked on its own"""
+        return self._serializer.dumps({'uid': user_id, 'sub': subject, 'jti': uuid.uuid4().hex})
+
+    def verify(self, token):
+        """The token's claims plus 'exp' (naive UTC datetime), or None when it is
+        malformed, forged or expired"""
+        try:
+            claims, signed_at = self._serializer.loads(token, max_age=self.ttl_seconds, return_timestamp=True)
+        except BadSignature:  # SignatureExpired included
+            return None
+        if not isinstance(claims, dict) or 'uid' not in claims or 'jti' not in claims:
+            return None
+        claims['exp'] = signed_at.replace(tzinfo=None) + timedelta(seconds=self.ttl_seconds)
+        return claims
@@ -0,0 +1,66 @@
+"""
+MARGEN AI - Request Coalescing
+Single-flight execution: concurrent callers with the same key share one upstream call
+"""
+
+import threading
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs fn once per key at a time; callers arriving while it runs wait and share its outcome"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {}
+
+    def _count(self, label, field):
+        label_stats = self._stats.setdefault(label, {'calls': 0, 'collapsed': 0})
+        label_stats[field] += 1
+
+    def do(self, key, fn, label='default'):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            self._count(label, 'calls' if leader else 'collapsed')
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            # Followers see the same failure instead of stampeding upstream again
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            labels = {label: dict(counts) for label, counts in self._stats.items()}
+            in_flight = len(self._calls)
+        return {
+            'in_flight': in_flight,
+            'calls': sum(s['calls'] for s in labels.values()),
+            'collapsed': sum(s['collapsed'] for s in labels.values()),
+            'routes': labels
+        }
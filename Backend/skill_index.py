@@ -0,0 +1,215 @@
+"""
+MARGEN AI - Skill Matching Engine
+Normalized token/alias inverted index over skill names, with batch scoring of a
+user's skills against many careers at once
+"""
+
+import re
+import threading
+import time
+
+import numpy as np
+from sqlalchemy.orm import joinedload
+
+from database_models import db, Career, CareerSkill, Roadmap, RoadmapSkill
+from sqlite_tuning import read_only_session
+
+_TOKEN_RE = re.compile(r'[a-z0-9+#]+(?:\.[a-z0-9]+)*')
+
+# Words that carry no meaning when comparing skills ("Basics of SQL" == "SQL")
+STOPWORDS = frozenset({'and', 'the', 'of', 'for', 'with', 'in', 'to', 'a', 'an', 'basics', 'fundamentals', 'intro', 'introduction'})
+
+# Short forms people type, mapped to the tokens of the canonical skill name
+DEFAULT_ALIASES = {
+    'js': 'javascript',
+    'es6': 'javascript',
+    'ts': 'typescript',
+    'py': 'python',
+    'golang': 'go',
+    'ml': 'machine learning',
+    'dl': 'deep learning',
+    'ai': 'artificial intelligence',
+    'nlp': 'natural language processing',
+    'cv': 'computer vision',
+    'k8s': 'kubernetes',
+    'nodejs': 'node.js',
+    'node': 'node.js',
+    'reactjs': 'react',
+    'react.js': 'react',
+    'vuejs': 'vue',
+    'vue.js': 'vue',
+    'postgres': 'postgresql',
+    'mongo': 'mongodb',
+    'gcp': 'google cloud',
+    'oop': 'object oriented programming',
+    'dsa': 'data structures algorithms',
+    'pm': 'project management',
+}
+
+
+def tokenize(name, aliases=DEFAULT_ALIASES):
+    """Lowercased tokens of a skill name with aliases expanded and stopwords removed"""
+    tokens = set()
+    for token in _TOKEN_RE.findall(name.lower()):
+        expansion = aliases.get(token)
+        if expansion is not None:
+            tokens.update(t for t in _TOKEN_RE.findall(expansion) if t not in STOPWORDS)
+        elif token not in STOPWORDS:
+            tokens.add(token)
+    return frozenset(tokens)
+
+
+def display_name(name):
+    """Capitalize for display"""
+    return ' '.join(word.capitalize() for word in name.split())
+
+
+class SkillIndex:
+    """Inverted index from token to skill entry ids.
+
+    A user skill matches an entry when every one of its tokens appears in the
+    entry's tokens, so 'react' matches 'React State Management' and 'JS' matches
+    'JavaScript (ES6+)', but 'java' no longer matches 'JavaScript'.
+    """
+
+    def __init__(self, names, aliases=DEFAULT_ALIASES):
+        self.aliases = aliases
+        self.names = list(names)
+        self.tokens = [tokenize(name, aliases) for name in self.names]
+        postings = {}
+        for entry_id, tokens in enumerate(self.tokens):
+            for token in tokens:
+                postings.setdefault(token, []).append(entry_id)
+        self.postings = {token: frozenset(ids) for token, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def match(self, user_skill):
+        """Ids of every entry covered by one user skill"""
+        tokens = tokenize(user_skill, self.aliases)
+        if not tokens:
+            return frozenset()
+        lists = []
+        for token in tokens:
+            ids = self.postings.get(token)
+            if ids is None:
+                return frozenset()
+            lists.append(ids)
+        lists.sort(key=len)
+        return lists[0].intersection(*lists[1:])
+
+    def match_all(self, user_skills):
+        matched = set()
+        for user_skill in user_skills:
+            matched |= self.match(user_skill)
+        return matched
+
+
+def parse_user_skills(raw):
+    """'Python, JS , sql' -> ['python', 'js', 'sql']"""
+    return [s.strip().lower() for s in raw.split(',') if s.strip()]
+
+
+def analyze_roadmap(user_skills, roadmap):
+    """Skill-gap analysis of one roadmap (the /analyze-skills payload)"""
+    required = sorted({skill['name'].lower() for milestone in roadmap for skill in milestone.get('skills', [])})
+    index = SkillIndex(required)
+    have_ids = index.match_all(user_skills)
+    skills_have = [required[i] for i in have_ids]
+    skills_to_learn = [name for i, name in enumerate(required) if i not in have_ids]
+    percentage = round((len(skills_have) / len(required)) * 100) if required else 0
+    return {
+        "percentage": percentage,
+        "skillsHave": sorted(map(display_name, skills_have)),
+        "skillsToLearn": sorted(map(display_name, skills_to_learn))
+    }
+
+
+class CareerSkillMatrix:
+    """Careers x required-skills incidence, stored sparsely as one column array.
+
+    Only skills some career requires are indexed, so scoring cost follows the
+    size of the careers' requirements rather than the whole Skill catalog, and
+    scoring a user against every career is one vectorized gather + bincount.
+    """
+
+    def __init__(self, careers):
+        # careers: list of (title, iterable of required skill names)
+        self.titles = [title for title, _ in careers]
+        column_of = {}
+        names, columns, rows = [], [], []
+        for row, (_, skill_names) in enumerate(careers):
+            for name in {n.strip() for n in skill_names if n and n.strip()}:
+                column = column_of.get(name.lower())
+                if column is None:
+                    column = column_of[name.lower()] = len(names)
+                    names.append(name)
+                columns.append(column)
+                rows.append(row)
+        self.index = SkillIndex(names)
+        order = np.lexsort((columns, rows))
+        self.columns = np.asarray(columns, dtype=np.int64)[order]
+        self.rows = np.asarray(rows, dtype=np.int64)[order]
+        self.required_counts = np.bincount(self.rows, minlength=len(careers))
+        self.row_starts = np.concatenate(([0], np.cumsum(self.required_counts)))
+
+    @classmethod
+    def from_database(cls, featured_only=True):
+        """One eager query: careers with their CareerSkill and active roadmap skill names"""
+        careers = []
+        with read_only_session(db) as session:
+            query = session.query(Career).options(
+                joinedload(Career.career_skills).joinedload(CareerSkill.skill),
+                joinedload(Career.roadmaps).joinedload(Roadmap.roadmap_skills).joinedload(RoadmapSkill.skill)
+            )
+            if featured_only:
+                query = query.filter(Career.is_featured.is_(True))
+            for career in query.order_by(Career.title).all():
+                names = [cs.skill.name for cs in career.career_skills if cs.skill.is_active]
+                names.extend(rs.skill.name for roadmap in career.roadmaps if roadmap.is_active
+                             for rs in roadmap.roadmap_skills if rs.skill.is_active)
+                careers.append((career.title, names))
+        return cls(careers)
+
+    def score(self, user_skills):
+        """Match percentages of one user against every career, best first"""
+        matched = np.zeros(len(self.index), dtype=bool)
+        matched[list(self.index.match_all(user_skills))] = True
+        hits = matched[self.columns]
+        have = np.bincount(self.rows, weights=hits, minlength=len(self.titles))
+        percentages = np.divide(have * 100.0, self.required_counts,
+                                out=np.zeros(len(self.titles)), where=self.required_counts > 0)
+
+        results = []
+        for row in np.argsort(-percentages, kind='stable'):
+            start, end = self.row_starts[row], self.row_starts[row + 1]
+            row_columns, row_hits = self.columns[start:end], hits[start:end]
+            results.append({
+                "title": self.titles[row],
+                "percentage": int(round(float(percentages[row]))),
+                "skillsHave": sorted(self.index.names[c] for c in row_columns[row_hits]),
+                "skillsToLearn": sorted(self.index.names[c] for c in row_columns[~row_hits])
+            })
+        return results
+
+
+class CareerSkillCatalog:
+    """Process-wide CareerSkillMatrix, rebuilt from the database at most every `max_age` seconds"""
+
+    def __init__(self, max_age=300):
+        self.max_age = max_age
+        self._matrix = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._matrix is None or time.monotonic() - self._built_at > self.max_age:
+                self._matrix = CareerSkillMatrix.from_database()
+                self._built_at = time.monotonic()
+            return self._matrix
+
+    def invalidate(self):
+        with self._lock:
+            self._matrix = None
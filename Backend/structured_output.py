@@ -0,0 +1,304 @@
+"""
+MARGEN AI - Structured Output
+JSON response schemas for Gemini's structured output mode, typed validation of the
+answers, and local repair of truncated or chatty JSON so it does not have to be regenerated
+"""
+
+import json
+import re
+import threading
+
+_FENCE_RE = re.compile(r'```(?:json)?\s*([\s\S]*?)\s*```')
+_CLOSERS = {'[': ']', '{': '}'}
+
+
+class SchemaError(ValueError):
+    """The answer parsed as JSON but does not have the shape the route needs"""
+
+
+# -----------------------------------------------------------------------------
+# Repair
+# -----------------------------------------------------------------------------
+
+def _strip_trailing_comma(text):
+    text = text.rstrip()
+    return text[:-1].rstrip() if text.endswith(',') else text
+
+
+def repair_json(text):
+    """Parse the first JSON value in `text`, dropping surrounding prose, code fences and
+    trailing commas. A value cut off mid-way is closed after its last complete element."""
+    fenced = _FENCE_RE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    starts = [pos for pos in (text.find('['), text.find('{')) if pos != -1]
+    if not starts:
+        raise ValueError("No JSON value in the response")
+    text = text[min(starts):]
+
+    out = []
+    stack = []
+    cuts = []  # (length of out, open containers) at every comma between elements
+    in_string = escaped = False
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+        elif ch in ']}':
+            if not stack or ch != stack[-1]:
+                break
+            out = list(_strip_trailing_comma(''.join(out)))
+            stack.pop()
+            out.append(ch)
+            if not stack:
+                break
+            continue
+        elif ch == ',':
+            cuts.append((len(out), list(stack)))
+        out.append(ch)
+
+    body = ''.join(out)
+    if not stack:
+        return json.loads(body)
+
+    # Truncated: close what is open, backing off one element at a time until it parses
+    candidates = [] if in_string else [(len(body), stack)]
+    candidates.extend(reversed(cuts))
+    for length, open_containers in candidates:
+        candidate = _strip_trailing_comma(body[:length]) + ''.join(reversed(open_containers))
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    raise ValueError("Response JSON could not be repaired")
+
+
+# -----------------------------------------------------------------------------
+# Validation
+# -----------------------------------------------------------------------------
+
+def conform(value, schema, path='$', dropped=None):
+    """Check `value` against `schema` and return a cleaned copy.
+
+    Strings are stripped and must not be empty, numeric strings become numbers, unknown
+    object keys are removed and optional properties that do not fit are left out. Array
+    items that do not fit are dropped (recorded in `dropped`), since a truncated answer
+    usually loses only its last element. Anything else raises SchemaError."""
+    if value is None:
+        if schema.get('nullable'):
+            return None
+        raise SchemaError(f"{path} is missing")
+    kind = schema['type']
+
+    if kind == 'object':
+        if not isinstance(value, dict):
+            raise SchemaError(f"{path} should be an object")
+        required = schema.get('required', ())
+        cleaned = {}
+        for name, subschema in schema.get('properties', {}).items():
+            if name not in value and name not in required:
+                continue
+            try:
+                cleaned[name] = conform(value.get(name), subschema, f"{path}.{name}", dropped)
+            except SchemaError:
+                if name in required:
+                    raise
+                if dropped is not None:
+                    dropped.append(f"{path}.{name}")
+        return cleaned
+
+    if kind == 'array':
+        if isinstance(value, dict) and schema['items']['type'] == 'object':
+            value = [value]  # A lone object where a list of them was asked for
+        if not isinstance(value, list):
+            raise SchemaError(f"{path} should be an array")
+        items = []
+        first_error = None
+        for index, item in enumerate(value):
+            try:
+                items.append(conform(item, schema['items'], f"{path}[{index}]", dropped))
+            except SchemaError as e:
+                first_error = first_error or e
+                if dropped is not None:
+                    dropped.append(f"{path}[{index}]")
+        if len(items) < schema.get('min_items', 0):
+            raise first_error or SchemaError(f"{path} needs at least {schema['min_items']} items")
+        if 'max_items' in schema:
+            items = items[:schema['max_items']]
+        return items
+
+    if kind == 'string':
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        if not isinstance(value, str) or not value.strip():
+            raise SchemaError(f"{path} should be a non-empty string")
+        return value.strip()
+
+    if kind in ('number', 'integer'):
+        if isinstance(value, str):
+            try:
+                value = float(value.strip().rstrip('%'))
+            except ValueError:
+                raise SchemaError(f"{path} should be a number") from None
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise SchemaError(f"{path} should be a number")
+        return int(round(value)) if kind == 'integer' else value
+
+    if kind == 'boolean':
+        if not isinstance(value, bool):
+            raise SchemaError(f"{path} should be a boolean")
+        return value
+
+    raise SchemaError(f"{path} has unsupported schema type '{kind}'")
+
+
+# -----------------------------------------------------------------------------
+# Response Formats
+# -----------------------------------------------------------------------------
+
+class ResponseFormat:
+    """A response schema sent to Gemini, plus the local parse/repair/validate of its answers.
+    `validate` is an extra check run on the conformed value (it may raise ValueError)."""
+
+    def __init__(self, schema, validate=None):
+        self.schema = schema
+        self.validate = validate
+
+    @property
+    def generation_config(self):
+        return {'response_mime_type': 'application/json', 'response_schema': self.schema}
+
+    def parse_with_outcome(self, text):
+        """Returns (value, 'clean' | 'repaired'); raises ValueError when nothing usable is left"""
+        try:
+            value = json.loads(text)
+            repaired = False
+        except ValueError:
+            value = repair_json(text)
+            repaired = True
+        dropped = []
+        value = conform(value, self.schema, dropped=dropped)
+        if self.validate:
+            value = self.validate(value)
+        return value, 'repaired' if repaired or dropped else 'clean'
+
+    def parse(self, text):
+        return self.parse_with_outcome(text)[0]
+
+
+class ParseStats:
+    """Per-route counts of clean, locally repaired and unusable structured answers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, route, outcome):
+        with self._lock:
+            counts = self._counts.setdefault(route, {'clean': 0, 'repaired': 0, 'failed': 0})
+            counts[outcome] += 1
+
+    def stats(self):
+        with self._lock:
+            routes = {route: dict(counts) for route, counts in self._counts.items()}
+        for counts in routes.values():
+            total = sum(counts.values())
+            counts['failure_rate'] = round(counts['failed'] / total, 4) if total else 0.0
+        return routes
+
+
+def _string(description=None):
+    schema = {'type': 'string'}
+    if description:
+        schema['description'] = description
+    return schema
+
+
+CAREER_LIST_SCHEMA = {
+    'type': 'array',
+    'min_items': 1,
+    'items': {
+        'type': 'object',
+        'properties': {
+            'title': _string('Career title'),
+            'description': _string('Around 15-20 words'),
+        },
+        'required': ['title', 'description'],
+    },
+}
+
+ROADMAP_SCHEMA = {
+    'type': 'array',
+    'min_items': 1,
+    'max_items': 5,
+    'items': {
+        'type': 'object',
+        'properties': {
+            'title': _string('Milestone name'),
+            'skills': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'name': _string('Skill or technology'),
+                        'resource': {
+                            'type': 'object',
+                            'nullable': True,
+                            'properties': {
+                                'name': _string('Resource provider or type'),
+                                'link': _string('HTTPS URL'),
+                            },
+                            'required': ['name', 'link'],
+                        },
+                    },
+                    'required': ['name'],
+                },
+            },
+        },
+        'required': ['title', 'skills'],
+    },
+}
+
+PROJECT_PITCH_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'pitch': _string('About 50-70 words'),
+    },
+    'required': ['pitch'],
+}
+
+# One entry per numbered profile of a packed /generate-careers/batch prompt
+CAREER_BATCH_SCHEMA = {
+    'type': 'array',
+    'min_items': 1,
+    'items': {
+        'type': 'object',
+        'properties': {
+            'profile': {'type': 'integer', 'description': 'Profile number from the prompt'},
+            'careers': {
+                'type': 'array',
+                'min_items': 1,
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'title': _string('Career title'),
+                        'description': _string('Around 15-20 words'),
+                        'match_percentage': {'type': 'number', 'description': 'Fit for this profile, 0-100'},
+                    },
+                    'required': ['title', 'description'],
+                },
+            },
+        },
+        'required': ['profile', 'careers'],
+    },
+}
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+MARGEN AI - Bulk Import Check
+Imports JSONL catalogs whose records carry different sets of fields into a throwaway
+database, runs the same import a second time, and checks the row counts and column
+defaults. Exits non-zero when an import fails or is not idempotent.
+
+    python benchmarks/bulk_import_check.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'Backend'))
+
+from flask import Flask
+
+from bulk_import import BulkImporter, read_records
+from database_models import db, Career, RoadmapSkill, Skill
+from sqlite_tuning import configure_sqlite, install_sqlite_pragmas
+
+# Later records leave out fields that earlier ones set, and the other way round
+CAREERS = [
+    {'title': 'Data Scientist', 'description': 'd', 'is_featured': True},
+    {'title': 'Web Dev'},
+    {'title': 'UX Designer', 'category': 'design', 'average_salary_min': 40000},
+]
+SKILLS = [
+    {'name': 'Python', 'category': 'technical', 'description': 'Programming language'},
+    {'name': 'Figma'},
+]
+ROADMAPS = [
+    {'career': 'Data Scientist', 'phase_order': 1, 'skill': 'Python', 'resource_name': 'Docs',
+     'resource_link': 'https://docs.python.org'},
+    {'career': 'UX Designer', 'phase_order': 1, 'skill': 'Figma'},
+]
+
+
+def write_jsonl(directory, name, records):
+    path = os.path.join(directory, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+    return path
+
+
+def run_import(paths):
+    importer = BulkImporter(chunk_size=2)
+    importer.import_skills(read_records(paths['skills']))
+    importer.import_careers(read_records(paths['careers']))
+    importer.import_roadmap_entries(read_records(paths['roadmaps']))
+    return importer
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        configure_sqlite(app, os.path.join(tmp, 'bulk_import.db'))
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(app)
+        install_sqlite_pragmas(app, db)
+        paths = {
+            'careers': write_jsonl(tmp, 'careers.jsonl', CAREERS),
+            'skills': write_jsonl(tmp, 'skills.jsonl', SKILLS),
+            'roadmaps': write_jsonl(tmp, 'roadmaps.jsonl', ROADMAPS),
+        }
+
+        print("📥 Bulk import with mixed JSONL records")
+        print("=" * 50)
+        failures = []
+        with app.app_context():
+            db.create_all()
+            for attempt in ('first run', 'second run'):
+                try:
+                    run_import(paths)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"❌ {attempt}: {e}")
+                    failures.append(attempt)
+                    continue
+                counts = (Career.query.count(), Skill.query.count(), RoadmapSkill.query.count())
+                ok = counts == (len(CAREERS), len(SKILLS), len(ROADMAPS))
+                print(f"{'✅' if ok else '❌'} {attempt:<11} careers {counts[0]}, skills {counts[1]}, roadmap entries {counts[2]}")
+                if not ok:
+                    failures.append(attempt)
+
+            web_dev = Career.query.filter_by(title='Web Dev').first()
+            ok = web_dev is not None and web_dev.is_featured is False and web_dev.category == 'general'
+            print(f"{'✅' if ok else '❌'} defaults    fields a record leaves out fall back to column defaults")
+            if not ok:
+                failures.append('defaults')
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""
+MARGEN AI - Local Stand-ins for External Services
+Fake Gemini model and Twilio client so the backend can be load-tested offline
+"""
+
+import json
+import math
+import random
+import re
+import time
+
+
+CANNED_CAREERS = [
+    {"title": "Data Scientist", "description": "Turn raw data into decisions with statistics, machine learning and clear storytelling."},
+    {"title": "Frontend Developer", "description": "Build fast, accessible and delightful interfaces for the web and mobile browsers."},
+    {"title": "DevOps Engineer", "description": "Automate delivery pipelines and keep production systems reliable at scale."},
+    {"title": "UX/UI Designer", "description": "Craft intuitive and visually appealing digital experiences for users."},
+    {"title": "Product Manager", "description": "Lead products from discovery to launch by aligning users, business and engineering."},
+    {"title": "Cloud Architect", "description": "Design secure, cost-effective cloud platforms that scale with the business."},
+    {"title": "AI Ethics Consultant", "description": "Guide companies in the responsible development and deployment of AI systems."},
+]
+
+CANNED_ROADMAP = [
+    {"title": "Foundational Knowledge", "skills": [
+        {"name": "Python", "resource": {"name": "Official Docs", "link": "https://docs.python.org/3/tutorial/"}},
+        {"name": "SQL", "resource": {"name": "freeCodeCamp", "link": "https://www.freecodecamp.org/learn"}},
+    ]},
+    {"title": "Core Skills", "skills": [
+        {"name": "Statistics", "resource": {"name": "Khan Academy", "link": "https://www.khanacademy.org/math/statistics-probability"}},
+        {"name": "Machine Learning", "resource": {"name": "Coursera", "link": "https://www.coursera.org/learn/machine-learning"}},
+    ]},
+    {"title": "Advanced Skills & Portfolio", "skills": [
+        {"name": "Docker", "resource": {"name": "Official Docs", "link": "https://docs.docker.com/get-started/"}},
+        {"name": "Git", "resource": {"name": "Pro Git Book", "link": "https://git-scm.com/book/en/v2"}},
+    ]},
+]
+
+CANNED_SCOPE = """## 🇮🇳 Market Outlook & Demand
+Demand is growing quickly across Indian startups and global capability centers.
+
+## 🏙️ Key Hiring Hubs
+- **Bengaluru:** startup capital
+- **Hyderabad:** large tech parks
+
+## 💰 Salary Projections (INR)
+| Experience Level | Salary Range (Per Annum) | Notes |
+| --- | --- | --- |
+| Entry-Level (0-2 Yrs) | ₹6-10 LPA | Fresh graduates |
+
+## 🚀 Career Progression Path
+`Associate -> Senior -> Lead -> Principal`
+
+## 🛠️ Essential & Future-Proofing Skills
+- **Core Skills for Today:** Python, SQL
+- **Skills for Tomorrow (2027-2030):** GenAI tooling
+
+## 🏢 Top Companies Hiring in India
+- Flipkart, Infosys, Google
+
+India is an exciting place for this career right now.
+"""
+
+
+class Latency:
+    """Latency distribution in milliseconds, parsed from a spec string:
+
+    'fixed:800'             always 800 ms (a bare number means the same)
+    'uniform:200:1200'      uniformly between 200 and 1200 ms
+    'lognormal:800:0.5'     median 800 ms, sigma 0.5 (the long tail real APIs show)
+    """
+
+    def __init__(self, spec='fixed:800', seed=None):
+        self.spec = str(spec)
+        parts = self.spec.split(':')
+        if len(parts) == 1:
+            parts = ['fixed', parts[0]]
+        self.kind = parts[0]
+        self.params = [float(value) for value in parts[1:]]
+        expected = {'fixed': 1, 'uniform': 2, 'lognormal': 2}
+        if self.kind not in expected or len(self.params) != expected[self.kind]:
+            raise ValueError(f"Unknown latency spec '{self.spec}'")
+        self._random = random.Random(seed)
+
+    def sample_ms(self):
+        if self.kind == 'fixed':
+            return self.params[0]
+        if self.kind == 'uniform':
+            return self._random.uniform(*self.params)
+        median, sigma = self.params
+        return self._random.lognormvariate(math.log(median), sigma)
+
+    def sleep(self, fraction=1.0):
+        time.sleep(self.sample_ms() * fraction / 1000.0)
+
+
+def as_latency(latency):
+    return latency if isinstance(latency, Latency) else Latency(latency)
+
+
+class StubUsage:
+    def __init__(self, prompt, text):
+        # Rough 4-characters-per-token estimate, good enough for dashboards
+        self.prompt_token_count = max(1, len(prompt) // 4)
+        self.candidates_token_count = max(1, len(text) // 4)
+        self.total_token_count = self.prompt_token_count + self.candidates_token_count
+
+
+class StubTokenCount:
+    def __init__(self, text):
+        self.total_tokens = max(1, len(text) // 4)
+
+
+class StubResponse:
+    def __init__(self, prompt, text):
+        self.text = text
+        self.usage_metadata = StubUsage(prompt, text)
+
+
+class StubChat:
+    """Drop-in for a genai ChatSession: canned interviewer replies after a sampled latency"""
+
+    def __init__(self, model, history):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, message, **kwargs):
+        self.model.calls += 1
+        self.model.latency.sleep()
+        context = ' '.join(part for turn in self.history for part in turn.get('parts', [])) + ' ' + message
+        text = "Thanks for sharing. Can you walk me through a project you are proud of?"
+        self.history.append({'role': 'user', 'parts': [message]})
+        self.history.append({'role': 'model', 'parts': [text]})
+        return StubResponse(context, text)
+
+
+class StubModel:
+    """Drop-in for genai.GenerativeModel that sleeps for a sampled latency and returns canned output.
+    `latency` is a Latency or a spec string; `latency_ms` is kept for a fixed latency."""
+
+    def __init__(self, latency_ms=800.0, chunk_count=6, latency=None):
+        self.latency = as_latency(latency if latency is not None else latency_ms)
+        self.chunk_count = chunk_count
+        self.calls = 0
+
+    @staticmethod
+    def canned_text(prompt):
+        if 'user profiles, numbered' in prompt:
+            # Packed batch prompt: the canned careers for every numbered profile
+            count = len(re.findall(r'^\s*\d+\. Interests:', prompt, re.M))
+            return json.dumps([{"profile": number, "careers": [dict(career, match_percentage=90 - 5 * rank)
+                                                              for rank, career in enumerate(CANNED_CAREERS)]}
+                               for number in range(1, count + 1)])
+        if 'learning roadmap' in prompt:
+            return json.dumps(CANNED_ROADMAP)
+        if 'career path recommendations' in prompt:
+            return json.dumps(CANNED_CAREERS)
+        if 'compelling description' in prompt:
+            # Catalog careers with placeholder descriptions: echo the requested titles back
+            titles = json.loads(re.search(r'\[.*?\]', prompt, re.S).group(0))
+            return json.dumps([{"title": title, "description": f"Build a rewarding career as a {title}."} for title in titles])
+        if '"pitch"' in prompt:
+            return json.dumps({"pitch": "Build a small dashboard that tracks your learning hours and visualizes progress per skill."})
+        if 'Future Scope' in prompt:
+            return CANNED_SCOPE
+        if 'interest assessment' in prompt:
+            return "Data Analysis, Creative Design, Project Management"
+        return "Thanks for sharing. Can you walk me through a project you are proud of?"
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        text = self.canned_text(prompt)
+        if not stream:
+            self.latency.sleep()
+            return StubResponse(prompt, text)
+        return self._stream(prompt, text)
+
+    def _stream(self, prompt, text):
+        step = max(1, len(text) // self.chunk_count)
+        total_ms = self.latency.sample_ms()
+        for start in range(0, len(text), step):
+            time.sleep(total_ms / 1000.0 / self.chunk_count)
+            yield StubResponse(prompt, text[start:start + step])
+
+    def count_tokens(self, contents):
+        return StubTokenCount(contents)
+
+    def start_chat(self, history=None):
+        return StubChat(self, history)
+
+
+class StubMessage:
+    def __init__(self, sid):
+        self.sid = sid
+
+
+class StubMessages:
+    def __init__(self, latency):
+        self.latency = latency
+        self.sent = 0
+
+    def create(self, body, from_, to):
+        self.latency.sleep()
+        self.sent += 1
+        return StubMessage(f"SM{self.sent:032d}")
+
+
+class StubTwilioClient:
+    """Drop-in for twilio.rest.Client exposing only messages.create"""
+
+    def __init__(self, latency_ms=300.0, latency=None):
+        self.messages = StubMessages(as_latency(latency if latency is not None else latency_ms))
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+MARGEN AI - SQLite Lock Waits Under gevent
+Runs the app's SQLite setup in a gevent-patched process (like a gunicorn gevent
+worker): one greenlet holds the write lock for a second while another writes and a
+third ticks every 20 ms. Exits non-zero when the writer fails or a lock wait stalls
+the other greenlets.
+
+    python benchmarks/gevent_sqlite_check.py
+"""
+
+from gevent import monkey
+
+monkey.patch_all()
+
+import os  # noqa: E402
+import sqlite3  # noqa: E402
+import sys  # noqa: E402
+import tempfile  # noqa: E402
+import time  # noqa: E402
+
+import gevent  # noqa: E402
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from database_models import db  # noqa: E402
+from sqlite_tuning import configure_sqlite, install_sqlite_pragmas  # noqa: E402
+
+HOLD_SECONDS = 1.0
+TICK_SECONDS = 0.02
+MAX_STALL_SECONDS = 0.25
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'gevent_check.db')
+        app = Flask(__name__)
+        configure_sqlite(app, path)
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(app)
+        install_sqlite_pragmas(app, db)
+        with app.app_context():
+            db.session.execute(text('CREATE TABLE lock_check (n INTEGER)'))
+            db.session.commit()
+
+        waited, stalls, errors = [], [], []
+
+        def holder():
+            conn = sqlite3.connect(path, isolation_level=None)
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('INSERT INTO lock_check VALUES (1)')
+            gevent.sleep(HOLD_SECONDS)
+            conn.execute('COMMIT')
+            conn.close()
+
+        def writer():
+            gevent.sleep(TICK_SECONDS)
+            started = time.monotonic()
+            try:
+                with app.app_context():
+                    db.session.execute(text('INSERT INTO lock_check VALUES (2)'))
+                    db.session.commit()
+            except Exception as e:
+                errors.append(e)
+            waited.append(time.monotonic() - started)
+
+        def ticker():
+            last = time.monotonic()
+            for _ in range(int(HOLD_SECONDS * 1.5 / TICK_SECONDS)):
+                gevent.sleep(TICK_SECONDS)
+                now = time.monotonic()
+                stalls.append(now - last - TICK_SECONDS)
+                last = now
+
+        print("🔒 SQLite lock waits under gevent")
+        print("=" * 50)
+        gevent.joinall([gevent.spawn(holder), gevent.spawn(writer), gevent.spawn(ticker)])
+
+        failures = []
+        cooperative = app.config['SQLITE_PROFILE'].get('cooperative')
+        print(f"{'✅' if cooperative else '❌'} cooperative  gevent detected, SQLite's own busy wait is off")
+        if not cooperative:
+            failures.append('cooperative')
+        print(f"{'✅' if not errors else '❌'} writer       waited {waited[0]:.2f}s for the lock"
+              + (f" then failed: {errors[0]}" if errors else ""))
+        if errors:
+            failures.append('writer')
+        ok = max(stalls) <= MAX_STALL_SECONDS
+        print(f"{'✅' if ok else '❌'} other work   longest stall {max(stalls) * 1000:.0f} ms (budget {MAX_STALL_SECONDS * 1000:.0f} ms)")
+        if not ok:
+            failures.append('stall')
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
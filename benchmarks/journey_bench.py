@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+MARGEN AI - User Journey Benchmark
+Drives scripted user journeys (signup -> signin -> interest quiz -> careers -> roadmap -> skill
+analysis -> mock interview) at a fixed number of concurrent users against the app running
+on the stub Gemini model and Twilio client, then reports p50/p95/p99 per endpoint and
+throughput. Nothing leaves the machine, so it can gate changes to Backend/app.py in CI:
+
+    python benchmarks/journey_bench.py --users 50 --journeys 500 --model-latency lognormal:800:0.5
+    python benchmarks/journey_bench.py --budget /generate-careers=1.5 --budget /generate-roadmap=2 --json report.json
+
+Pass --url to drive a server that is already running instead of starting gunicorn.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+import uuid
+
+import aiohttp
+
+from fakes import Latency
+from load_test import free_port, start_server
+
+QUIZ_ANSWERS = {
+    'q1': ['Reading about new technology', 'Painting or drawing', 'Organizing a community event', 'Fixing things around the house'],
+    'q2': ['Artificial intelligence', 'Human psychology', 'Climate and energy', 'Markets and money'],
+    'q3': ['Solving puzzles', 'Designing visuals', 'Leading people', 'Building things'],
+    'q4': ['A mobile app', 'A short film', 'A small business', 'A robot'],
+    'q5': ['Data and numbers', 'Words and stories', 'People', 'Tools and machines'],
+}
+SKILL_SETS = ['Python, SQL', 'JavaScript, React, CSS', 'Excel, Communication', 'Figma, Illustration', 'Docker, Linux, Git']
+INTERVIEW_ANSWERS = [
+    "I built a small dashboard that tracked my study hours and shared it with classmates.",
+    "I would break the problem down, check the data first and ask for feedback early.",
+    "I am most proud of a group project where I coordinated three teammates to ship on time.",
+]
+
+
+class JourneyAborted(Exception):
+    pass
+
+
+class Recorder:
+    """Latency samples and error counts per endpoint"""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.recovered = 0
+
+    def add(self, route, seconds, ok):
+        self.samples.setdefault(route, []).append(seconds)
+        if not ok:
+            self.errors[route] = self.errors.get(route, 0) + 1
+
+    @staticmethod
+    def percentile(values, pct):
+        ordered = sorted(values)
+        # Nearest-rank percentile
+        return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+    def summary(self):
+        routes = {}
+        for route, values in self.samples.items():
+            routes[route] = {
+                'count': len(values),
+                'errors': self.errors.get(route, 0),
+                'p50_ms': round(self.percentile(values, 50) * 1000, 1),
+                'p95_ms': round(self.percentile(values, 95) * 1000, 1),
+                'p99_ms': round(self.percentile(values, 99) * 1000, 1),
+                'max_ms': round(max(values) * 1000, 1),
+            }
+        return routes
+
+
+class Journey:
+    """One scripted user. `unique` answers defeat the response cache, like a brand new profile."""
+
+    def __init__(self, session, base_url, recorder, index, run_id, rnd, unique, interview_turns):
+        self.session = session
+        self.base_url = base_url
+        self.recorder = recorder
+        self.index = index
+        self.run_id = run_id
+        self.rnd = rnd
+        self.unique = unique
+        self.interview_turns = interview_turns
+        self.headers = {}
+
+    async def step(self, route, payload, ok_statuses=(200, 201)):
+        started = time.perf_counter()
+        try:
+            async with self.session.post(self.base_url + route, json=payload, headers=self.headers) as response:
+                body = await response.read()
+                status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.recorder.add(route, time.perf_counter() - started, False)
+            raise JourneyAborted(route)
+        ok = status in ok_statuses
+        self.recorder.add(route, time.perf_counter() - started, ok)
+        if not ok:
+            raise JourneyAborted(f"{route} -> {status}")
+        return status, json.loads(body) if body else None
+
+    async def run(self):
+        email = f"journey-{self.run_id}-{self.index}@bench.local"
+        await self.step('/signup', {'email': email, 'password': 'bench-password'})
+        _, signed_in = await self.step('/signin', {'email': email, 'password': 'bench-password'})
+        self.headers = {'Authorization': f"Bearer {signed_in['token']}"}
+
+        answers = {question: self.rnd.choice(options) for question, options in QUIZ_ANSWERS.items()}
+        if self.unique:
+            answers['q4'] += f" ({self.run_id}-{self.index})"
+        _, found = await self.step('/find-interests', {'answers': answers})
+
+        skills = self.rnd.choice(SKILL_SETS)
+        _, careers = await self.step('/generate-careers', {
+            'interests': found['interests'], 'skills': skills, 'pace': 'Balanced',
+            'lifeGoals': ['Stability', 'Growth']
+        })
+        career_title = careers[0]['title']
+
+        _, roadmap = await self.step('/generate-roadmap', {'careerTitle': career_title})
+        await self.step('/analyze-skills', {'userSkills': skills, 'roadmap': roadmap})
+
+        _, started = await self.step('/start-interview', {'careerTitle': career_title})
+        session_id = started['sessionId']
+        conversation = [{'role': 'model', 'parts': [{'text': started['greeting']}]}]
+        for turn in range(self.interview_turns):
+            message = INTERVIEW_ANSWERS[turn % len(INTERVIEW_ANSWERS)]
+            conversation.append({'role': 'user', 'parts': [{'text': message}]})
+            status, reply = await self.step('/continue-interview', {'sessionId': session_id, 'message': message},
+                                            ok_statuses=(200, 410))
+            if status == 410:
+                # Another worker holds the session: resend the transcript once, as the frontend does
+                self.recorder.recovered += 1
+                _, reply = await self.step('/continue-interview', {'careerTitle': career_title, 'conversation': conversation})
+            session_id = reply['sessionId']
+            conversation.append({'role': 'model', 'parts': [{'text': reply['text']}]})
+
+
+async def drive(base_url, args, recorder):
+    """Run journeys with `args.users` concurrent users; returns (completed, aborted, elapsed)"""
+    run_id = uuid.uuid4().hex[:8]
+    rnd = random.Random(args.seed)
+    next_index = 0
+    completed = aborted = 0
+    stop_at = time.perf_counter() + args.duration if args.duration else None
+    timeout = aiohttp.ClientTimeout(total=300)
+    connector = aiohttp.TCPConnector(limit=args.users)
+
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        async def user():
+            nonlocal next_index, completed, aborted
+            while True:
+                if stop_at is not None:
+                    if time.perf_counter() >= stop_at:
+                        return
+                elif next_index >= args.journeys:
+                    return
+                index = next_index
+                next_index += 1
+                journey = Journey(session, base_url, recorder, index, run_id, random.Random(rnd.random()),
+                                  rnd.random() < args.unique_ratio, args.interview_turns)
+                try:
+                    await journey.run()
+                    completed += 1
+                except JourneyAborted as e:
+                    aborted += 1
+                    if aborted <= 5:
+                        print(f"⚠️  Journey {index} aborted at {e}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(args.users)))
+        return completed, aborted, time.perf_counter() - started
+
+
+def parse_budgets(values):
+    budgets = {}
+    for value in values or []:
+        route, _, seconds = value.partition('=')
+        budgets[route] = float(seconds)
+    return budgets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='benchmark a running server instead of starting one')
+    parser.add_argument('--worker-class', default='gevent')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--users', type=int, default=20, help='concurrent users')
+    parser.add_argument('--journeys', type=int, default=200, help='total journeys (ignored with --duration)')
+    parser.add_argument('--duration', type=float, help='run for this many seconds instead of a fixed count')
+    parser.add_argument('--model-latency', default='lognormal:800:0.5', help="stub model latency spec, see fakes.Latency")
+    parser.add_argument('--twilio-latency', default='fixed:300')
+    parser.add_argument('--unique-ratio', type=float, default=0.3, help='share of journeys with never-seen answers (cache misses)')
+    parser.add_argument('--interview-turns', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--budget', action='append', metavar='ROUTE=SECONDS', help='fail when the route p95 exceeds this')
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+    budgets = parse_budgets(args.budget)
+    Latency(args.model_latency), Latency(args.twilio_latency)  # Fail fast on a bad spec
+
+    print("🚀 MARGEN AI journey benchmark: signup → signin → quiz → careers → roadmap → skill analysis → interview")
+    print(f"   {args.users} users, "
+          + (f"{args.duration:.0f}s" if args.duration else f"{args.journeys} journeys")
+          + f", model latency {args.model_latency}, {args.unique_ratio:.0%} unique profiles")
+    print("=" * 78)
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        port = free_port()
+        server = start_server(args.worker_class, args.workers, port, 0, extra_env={
+            'STUB_MODEL_LATENCY': args.model_latency, 'STUB_TWILIO_LATENCY': args.twilio_latency
+        })
+        base_url = f'http://127.0.0.1:{port}'
+    recorder = Recorder()
+    try:
+        completed, aborted, elapsed = asyncio.run(drive(base_url.rstrip('/'), args, recorder))
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+
+    routes = recorder.summary()
+    requests = sum(route['count'] for route in routes.values())
+    errors = sum(route['errors'] for route in routes.values())
+    print(f"{'endpoint':<22}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for route, stats in routes.items():
+        print(f"{route:<22}{stats['count']:>7}{stats['errors']:>8}{stats['p50_ms']:>10.1f}"
+              f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+    print("=" * 78)
+    print(f"📊 {completed} journeys completed, {aborted} aborted in {elapsed:.1f}s: "
+          f"{completed / elapsed:.2f} journeys/s, {requests / elapsed:.1f} requests/s"
+          + (f", {recorder.recovered} interview sessions rebuilt" if recorder.recovered else ''))
+
+    failures = []
+    for route, seconds in budgets.items():
+        p95 = routes.get(route, {}).get('p95_ms')
+        if p95 is None:
+            failures.append(f"{route}: no samples")
+        elif p95 > seconds * 1000:
+            failures.append(f"{route}: p95 {p95:.0f} ms > budget {seconds * 1000:.0f} ms")
+    error_rate = errors / requests if requests else 1.0
+    if error_rate > args.max_error_rate:
+        failures.append(f"error rate {error_rate:.2%} > {args.max_error_rate:.2%}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'completed': completed, 'aborted': aborted, 'seconds': round(elapsed, 3),
+                       'journeys_per_second': round(completed / elapsed, 3),
+                       'requests_per_second': round(requests / elapsed, 3),
+                       'error_rate': round(error_rate, 4), 'routes': routes, 'failures': failures}, f, indent=2)
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ Within budget")
+
+
+if __name__ == '__main__':
+    main()
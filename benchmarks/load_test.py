@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+MARGEN AI - Worker Model Load Test
+Compares requests/sec of sync and gevent gunicorn workers against the stub model
+
+    python benchmarks/load_test.py --worker-classes sync gevent --concurrency 50 200 500
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BENCH_DIR = os.path.join(ROOT_DIR, 'benchmarks')
+GUNICORN_CONF = os.path.join(ROOT_DIR, 'Backend', 'gunicorn.conf.py')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(worker_class, workers, port, latency_ms, extra_env=None):
+    env = dict(os.environ,
+               GUNICORN_WORKER_CLASS=worker_class,
+               GUNICORN_WORKERS=str(workers),
+               GUNICORN_BIND=f'127.0.0.1:{port}',
+               STUB_MODEL_LATENCY_MS=str(latency_ms),
+               PYTHONWARNINGS='ignore',
+               **(extra_env or {}))
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', GUNICORN_CONF, '--chdir', BENCH_DIR, 'stub_app:app'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"gunicorn ({worker_class}) did not start on port {port}")
+
+
+async def run_level(base_url, concurrency, duration):
+    """Keep `concurrency` clients busy for `duration` seconds; returns (completed, errors, elapsed)"""
+    completed = errors = 0
+    counter = 0
+    stop_at = time.perf_counter() + duration
+    timeout = aiohttp.ClientTimeout(total=120)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        async def client():
+            nonlocal completed, errors, counter
+            while time.perf_counter() < stop_at:
+                counter += 1
+                # Unique interests per request so the response cache never answers
+                payload = {'interests': f'load-test-{counter}', 'skills': 'Python', 'pace': 'Balanced', 'lifeGoals': []}
+                try:
+                    async with session.post(f'{base_url}/generate-careers', json=payload) as response:
+                        await response.read()
+                        if response.status == 200:
+                            completed += 1
+                        else:
+                            errors += 1
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return completed, errors, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--worker-classes', nargs='+', default=['sync', 'gevent'])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[50, 200, 500])
+    parser.add_argument('--duration', type=float, default=15.0, help='seconds per concurrency level')
+    parser.add_argument('--latency-ms', type=float, default=800.0, help='stub model latency')
+    args = parser.parse_args()
+
+    print("🚀 MARGEN AI load test: POST /generate-careers against the stub model")
+    print(f"   {args.workers} workers, {args.latency_ms:.0f} ms model latency, {args.duration:.0f}s per level")
+    print("=" * 64)
+    print(f"{'worker class':<14}{'clients':>8}{'ok':>8}{'errors':>8}{'req/s':>10}")
+
+    for worker_class in args.worker_classes:
+        port = free_port()
+        server = start_server(worker_class, args.workers, port, args.latency_ms)
+        try:
+            # Warm up every worker (imports, first connections) before measuring
+            asyncio.run(run_level(f'http://127.0.0.1:{port}', args.workers * 2, 2.0))
+            for concurrency in args.concurrency:
+                completed, errors, elapsed = asyncio.run(run_level(f'http://127.0.0.1:{port}', concurrency, args.duration))
+                print(f"{worker_class:<14}{concurrency:>8}{completed:>8}{errors:>8}{completed / elapsed:>10.1f}")
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == '__main__':
+    main()
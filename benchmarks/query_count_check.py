@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+MARGEN AI - Query Count Check
+Seeds a throwaway database with a user who has many skills, interests and
+recommendations, then counts the SQL statements each profile/recommendation read
+issues. Exits non-zero when a read path goes over its budget (an N+1 regression).
+
+    python benchmarks/query_count_check.py --skills 40 --interests 15 --recommendations 25
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'Backend'))
+
+from flask import Flask
+from sqlalchemy import event
+
+from database_models import db, User, Skill, Interest, Career, UserSkill, UserInterest, CareerRecommendation
+from sqlite_tuning import configure_sqlite, install_sqlite_pragmas
+from profile_store import load_recommendations, load_user_profile, save_user_profile, user_with_profile
+
+# Statements allowed per read path, whatever the number of rows
+QUERY_BUDGETS = {
+    'load_user_profile': 3,
+    'load_recommendations': 1,
+}
+
+EMAIL = 'query-count@margen.local'
+
+
+class QueryCounter:
+    def __init__(self, engines):
+        self.engines = engines
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    @contextmanager
+    def counting(self):
+        self.count = 0
+        for engine in self.engines:
+            event.listen(engine, 'before_cursor_execute', self._on_execute)
+        try:
+            yield self
+        finally:
+            for engine in self.engines:
+                event.remove(engine, 'before_cursor_execute', self._on_execute)
+
+
+def seed(n_skills, n_interests, n_recommendations):
+    user = User(email=EMAIL)
+    user.set_password('query-count')
+    db.session.add(user)
+    save_user_profile(user, {
+        'skills': [f'Skill {i}' for i in range(n_skills)],
+        'interests': [f'Interest {i}' for i in range(n_interests)],
+        'pace': 'Balanced'
+    })
+    for i in range(n_recommendations):
+        career = Career(title=f'Career {i}', description='Seeded career', category='technology', difficulty_level='intermediate')
+        db.session.add(CareerRecommendation(user=user, career=career, match_percentage=50.0, confidence_score=0.5,
+                                            learning_priority='medium'))
+    db.session.commit()
+    return user.id
+
+
+def lazy_profile(email):
+    """The pre-eager-loading shape: to_dict on lazily loaded rows"""
+    user = User.query.filter_by(email=email).first()
+    return [us.to_dict() for us in user.user_skills] + [ui.to_dict() for ui in user.user_interests]
+
+
+def lazy_recommendations(email):
+    user = User.query.filter_by(email=email).first()
+    return [rec.to_dict() for rec in CareerRecommendation.query.filter_by(user_id=user.id).all()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--skills', type=int, default=40)
+    parser.add_argument('--interests', type=int, default=15)
+    parser.add_argument('--recommendations', type=int, default=25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        configure_sqlite(app, os.path.join(tmp, 'query_count.db'))
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(app)
+        install_sqlite_pragmas(app, db)
+
+        with app.app_context():
+            db.create_all()
+            user_id = seed(args.skills, args.interests, args.recommendations)
+            counter = QueryCounter(db.engines.values())
+
+            print(f"🔎 Query counts ({args.skills} skills, {args.interests} interests, {args.recommendations} recommendations)")
+            print("=" * 64)
+            failures = []
+            checks = [
+                ('load_user_profile', lambda: load_user_profile(user_id), lambda: lazy_profile(EMAIL)),
+                ('load_recommendations', lambda: load_recommendations(user_id, limit=100), lambda: lazy_recommendations(EMAIL)),
+            ]
+            for name, eager, lazy in checks:
+                db.session.expunge_all()
+                with counter.counting():
+                    eager()
+                eager_count = counter.count
+                db.session.expunge_all()
+                with counter.counting():
+                    lazy()
+                lazy_count = counter.count
+                ok = eager_count <= QUERY_BUDGETS[name]
+                print(f"{'✅' if ok else '❌'} {name:<22} {eager_count:>3} queries (budget {QUERY_BUDGETS[name]}, lazy loading: {lazy_count})")
+                if not ok:
+                    failures.append(name)
+
+            # Re-saving the same profile should not issue per-skill lookups either
+            db.session.expunge_all()
+            with counter.counting():
+                user = user_with_profile(db.session, user_id)
+                save_user_profile(user, {'skills': [f'Skill {i}' for i in range(args.skills)],
+                                         'interests': [f'Interest {i}' for i in range(args.interests)]})
+                db.session.commit()
+            print(f"ℹ️  save_user_profile (unchanged) {counter.count:>3} statements")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
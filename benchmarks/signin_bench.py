@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+MARGEN AI - Sign-in Throughput Benchmark
+Runs a login storm of password checks through Backend/credentials.py with the hashing
+inline (workers=0, the old behaviour) and in process pools of growing size, and reports
+checks per second, check latency and how late a 5 ms timer in the same process fires
+(how much the storm starves every other request):
+
+    python benchmarks/signin_bench.py --checks 200 --clients 16
+    python benchmarks/signin_bench.py --method pbkdf2:sha256:600000 --workers 1,2,4,8
+"""
+
+import argparse
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'Backend'))
+
+from credentials import CredentialService  # noqa: E402
+
+PASSWORD = 'bench-password'
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class TimerLag:
+    """Sleeps `interval` in a loop and records how late each wake-up is"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.lags = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            time.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_storm(service, password_hash, checks, clients):
+    """(checks/s, latencies) for `checks` verifications from `clients` threads"""
+    latencies = []
+
+    def check(_):
+        started = time.perf_counter()
+        ok, _ = service.verify(password_hash, PASSWORD)
+        latencies.append(time.perf_counter() - started)
+        if not ok:
+            raise RuntimeError("Password check failed")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(check, range(checks)))
+    return checks / (time.perf_counter() - started), latencies
+
+
+def main():
+    cores = os.cpu_count() or 1
+    default_workers = sorted({0, 1, 2, cores} | {2 ** n for n in range(int(math.log2(cores)) + 1)})
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--method', default=os.getenv('PASSWORD_HASH_METHOD', 'scrypt'), help='werkzeug hash method')
+    parser.add_argument('--workers', default=','.join(map(str, default_workers)),
+                        help='comma-separated pool sizes to try (0 = inline)')
+    parser.add_argument('--checks', type=int, default=100, help='password checks per run')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent sign-ins')
+    args = parser.parse_args()
+
+    print(f"🔐 Sign-in storm: {args.checks} checks from {args.clients} clients, method {args.method}, {cores} cores")
+    print("=" * 74)
+    print(f"{'workers':>8}{'checks/s':>11}{'p50 ms':>10}{'p95 ms':>10}{'timer lag p95':>16}{'max':>10}")
+    baseline = None
+    for workers in (int(value) for value in args.workers.split(',')):
+        # No verified-credential cache here: every check pays for the hash
+        service = CredentialService(method=args.method, workers=workers, max_pending=args.checks, cache_seconds=0)
+        password_hash = service.hash(PASSWORD)
+        service.verify(password_hash, PASSWORD)  # Start the pool processes outside the timed run
+        try:
+            with TimerLag() as lag:
+                rate, latencies = run_storm(service, password_hash, args.checks, args.clients)
+        finally:
+            service.close()
+        baseline = baseline or rate
+        print(f"{workers or 'inline':>8}{rate:>11.1f}{percentile(latencies, 50) * 1000:>10.1f}"
+              f"{percentile(latencies, 95) * 1000:>10.1f}{percentile(lag.lags, 95) * 1000:>13.1f} ms"
+              f"{max(lag.lags) * 1000:>7.1f} ms  ({rate / baseline:.1f}x)")
+
+    cached = CredentialService(method=args.method, workers=0)
+    password_hash = cached.hash(PASSWORD)
+    cached.verify(password_hash, PASSWORD)
+    rate, _ = run_storm(cached, password_hash, args.checks, args.clients)
+    print("=" * 74)
+    print(f"📊 Repeat sign-ins served from the verified-credential cache: {rate:.0f} checks/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+MARGEN AI - Skill Matching Benchmark
+Latency of scoring one user against every career as the skill catalog grows,
+comparing the old nested substring scan with the indexed CareerSkillMatrix
+
+    python benchmarks/skill_index_bench.py --catalog-sizes 1000 10000 50000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Backend'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from skill_index import CareerSkillMatrix  # noqa: E402
+
+WORDS = ['python', 'java', 'react', 'data', 'cloud', 'design', 'security', 'testing', 'analysis', 'mobile',
+         'network', 'devops', 'machine', 'learning', 'web', 'api', 'database', 'linux', 'agile', 'vision',
+         'graph', 'stream', 'kernel', 'compiler', 'frontend', 'backend', 'ux', 'marketing', 'finance', 'audit']
+
+
+def synthetic_catalog(size, rng):
+    names = set()
+    while len(names) < size:
+        names.add(' '.join(rng.sample(WORDS, rng.randint(1, 3))) + f' {rng.randint(0, size)}')
+    return sorted(names)
+
+
+def naive_score(user_skills, careers):
+    """The original O(U x R) substring scan, once per career"""
+    results = []
+    for title, skill_names in careers:
+        required = {name.lower() for name in skill_names}
+        have = {r for r in required if any(u in r for u in user_skills)}
+        results.append((title, round(len(have) / len(required) * 100) if required else 0))
+    return results
+
+
+def timed(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--catalog-sizes', nargs='+', type=int, default=[1000, 10000, 50000])
+    parser.add_argument('--careers', type=int, default=200)
+    parser.add_argument('--skills-per-career', type=int, default=25)
+    parser.add_argument('--user-skills', type=int, default=15)
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    print("📊 Skill matching: one user scored against every career (median ms)")
+    print("=" * 64)
+    print(f"{'catalog':>9}{'build ms':>11}{'indexed ms':>12}{'naive ms':>11}{'speedup':>10}")
+    for size in args.catalog_sizes:
+        names = synthetic_catalog(size, rng)
+        careers = [(f'Career {c}', rng.sample(names, args.skills_per_career)) for c in range(args.careers)]
+        user_skills = [' '.join(rng.sample(WORDS, 1)) for _ in range(args.user_skills)]
+
+        started = time.perf_counter()
+        matrix = CareerSkillMatrix(careers)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        indexed_ms = timed(lambda: matrix.score(user_skills), args.repeats)
+        naive_ms = timed(lambda: naive_score(user_skills, careers), args.repeats)
+        print(f"{size:>9}{build_ms:>11.1f}{indexed_ms:>12.2f}{naive_ms:>11.2f}{naive_ms / indexed_ms:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
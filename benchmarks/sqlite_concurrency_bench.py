@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+MARGEN AI - SQLite Concurrency Benchmark
+Write throughput and "database is locked" error rate for each SQLITE_PROFILE,
+with several processes (like gunicorn workers) signing users up and saving
+profiles while others read
+
+    python benchmarks/sqlite_concurrency_bench.py --processes 4 --threads 8 --duration 10
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+
+
+def make_app(database_path, profile):
+    from flask import Flask
+    from database_models import db
+    from sqlite_tuning import configure_sqlite, install_sqlite_pragmas
+
+    app = Flask(__name__)
+    configure_sqlite(app, database_path, profile=profile)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    install_sqlite_pragmas(app, db)
+    return app, db
+
+
+def worker(database_path, profile, threads, duration, results):
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+    from database_models import User, UserAnalytics
+
+    app, db = make_app(database_path, profile)
+    counts = {'writes': 0, 'reads': 0, 'locked': 0}
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def run(thread_index):
+        with app.app_context():
+            while time.time() < stop_at:
+                try:
+                    if thread_index % 4 == 3:
+                        # Reader: profile lookups, like the read-heavy routes
+                        db.session.execute(text('SELECT COUNT(*) FROM users')).scalar()
+                        field = 'reads'
+                    else:
+                        # Writer: a signup followed by an event row, like /signup + /save-profile
+                        user = User(email=f'{uuid.uuid4().hex}@bench.local', password_hash='x')
+                        db.session.add(user)
+                        db.session.flush()
+                        db.session.add(UserAnalytics(user_id=user.id, event_type='profile_saved'))
+                        db.session.commit()
+                        field = 'writes'
+                except OperationalError as e:
+                    db.session.rollback()
+                    field = 'locked' if 'locked' in str(e) or 'busy' in str(e) else None
+                    if field is None:
+                        raise
+                with lock:
+                    counts[field] += 1
+
+    pool = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    results.put(counts)
+
+
+def run_profile(profile, processes, threads, duration):
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, 'bench.db')
+        app, db = make_app(database_path, profile)
+        with app.app_context():
+            db.create_all()
+            db.engine.dispose()
+
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=worker, args=(database_path, profile, threads, duration, results))
+                 for _ in range(processes)]
+        started = time.time()
+        for p in procs:
+            p.start()
+        totals = {'writes': 0, 'reads': 0, 'locked': 0}
+        for _ in procs:
+            for key, value in results.get().items():
+                totals[key] += value
+        for p in procs:
+            p.join()
+        elapsed = time.time() - started
+    attempts = totals['writes'] + totals['reads'] + totals['locked']
+    return totals, elapsed, (totals['locked'] / attempts * 100) if attempts else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', nargs='+', default=['default', 'production'])
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"🗄️  SQLite concurrency: {args.processes} processes x {args.threads} threads, {args.duration:.0f}s per profile")
+    print("=" * 64)
+    print(f"{'profile':<12}{'writes/s':>10}{'reads/s':>10}{'locked':>9}{'lock %':>9}")
+    for profile in args.profiles:
+        totals, elapsed, lock_rate = run_profile(profile, args.processes, args.threads, args.duration)
+        print(f"{profile:<12}{totals['writes'] / elapsed:>10.1f}{totals['reads'] / elapsed:>10.1f}"
+              f"{totals['locked']:>9}{lock_rate:>8.2f}%")
+
+
+if __name__ == '__main__':
+    main()
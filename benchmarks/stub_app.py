@@ -0,0 +1,27 @@
+"""
+MARGEN AI - Benchmark WSGI Entry Point
+The real Flask app with Gemini and Twilio swapped for the local stand-ins in fakes.py
+
+    gunicorn -c ../Backend/gunicorn.conf.py --chdir benchmarks stub_app:app
+"""
+
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'Backend'))
+sys.path.insert(0, BENCH_DIR)
+
+# genai.configure only needs a non-empty key; nothing is sent upstream
+os.environ.setdefault('GEMINI_API_KEY', 'stub-key')
+
+import app as margen  # noqa: E402
+from fakes import StubModel, StubTwilioClient  # noqa: E402
+
+# STUB_*_LATENCY take a distribution spec (see fakes.Latency), e.g. 'lognormal:800:0.5';
+# the older STUB_*_LATENCY_MS settings give a fixed latency
+margen.model = StubModel(latency=os.getenv('STUB_MODEL_LATENCY') or os.getenv('STUB_MODEL_LATENCY_MS', '800'))
+margen.twilio_client = StubTwilioClient(latency=os.getenv('STUB_TWILIO_LATENCY') or os.getenv('STUB_TWILIO_LATENCY_MS', '300'))
+margen.TWILIO_PHONE_NUMBER = margen.TWILIO_PHONE_NUMBER or '+10000000000'
+
+app = margen.app
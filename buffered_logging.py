@@ -0,0 +1,144 @@
+"""
+MARGEN AI - Buffered Event Logging
+Queue-backed writer for ai_interactions and user_analytics rows: request threads
+only enqueue, a background thread bulk-inserts one transaction per batch
+"""
+
+import atexit
+import json
+import queue
+import threading
+from datetime import datetime
+
+from database_models import db, AIInteraction, UserAnalytics
+
+_STOP = object()
+
+
+class BufferedEventWriter:
+    """Bounded in-memory queue drained by a single writer thread.
+
+    policy='drop' never blocks the caller: when the queue is full the event is
+    counted in `dropped` and discarded. policy='block' applies backpressure by
+    waiting up to `block_timeout` seconds for room before dropping.
+    """
+
+    def __init__(self, max_queue=10000, batch_size=500, flush_interval=1.0, policy='drop', block_timeout=0.05):
+        if policy not in ('drop', 'block'):
+            raise ValueError("policy must be 'drop' or 'block'")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self.app = None
+        self._stats_lock = threading.Lock()
+        self._stats = {'enqueued': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
+
+    def init_app(self, app):
+        """Start the writer thread for `app` and flush what is left when the process exits"""
+        self.app = app
+        self._thread = threading.Thread(target=self._run, name='event-log-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _count(self, field, n=1):
+        with self._stats_lock:
+            self._stats[field] += n
+
+    def _put(self, table, row):
+        try:
+            if self.policy == 'block':
+                self._queue.put((table, row), timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait((table, row))
+        except queue.Full:
+            self._count('dropped')
+            return False
+        self._count('enqueued')
+        return True
+
+    def log_ai_interaction(self, user_id, interaction_type, prompt, response, model_used, tokens_used=None, processing_time_ms=None,
+                           prompt_version=None):
+        """Buffered counterpart of database_models.log_ai_interaction"""
+        return self._put(AIInteraction.__table__, {
+            'user_id': user_id,
+            'interaction_type': interaction_type,
+            'prompt': prompt,
+            'response': response,
+            'model_used': model_used,
+            'prompt_version': prompt_version,
+            'tokens_used': tokens_used,
+            'processing_time_ms': processing_time_ms,
+            'created_at': datetime.utcnow()
+        })
+
+    def log_user_analytics(self, user_id, event_type, event_data=None, session_id=None, ip_address=None, user_agent=None):
+        """Buffered counterpart of database_models.log_user_analytics"""
+        return self._put(UserAnalytics.__table__, {
+            'user_id': user_id,
+            'event_type': event_type,
+            'event_data': json.dumps(event_data) if event_data else None,
+            'session_id': session_id,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'created_at': datetime.utcnow()
+        })
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            while True:
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+                if stopping or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            for _ in range(len(batch) + (1 if stopping else 0)):
+                self._queue.task_done()
+
+    def _write(self, batch):
+        rows_by_table = {}
+        for table, row in batch:
+            rows_by_table.setdefault(table, []).append(row)
+        with self.app.app_context():
+            try:
+                for table, rows in rows_by_table.items():
+                    db.session.execute(table.insert(), rows)
+                db.session.commit()
+                self._count('written', len(batch))
+                self._count('batches')
+            except Exception as e:
+                db.session.rollback()
+                self._count('failed', len(batch))
+                print(f"Event log write failed ({len(batch)} rows): {e}")
+
+    def flush(self):
+        """Block until everything enqueued so far has been written"""
+        self._queue.join()
+
+    def close(self):
+        """Write out the remaining events and stop the writer thread"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout=10)
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queued'] = self._queue.qsize()
+        return stats
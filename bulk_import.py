@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+MARGEN AI - Bulk Catalog Import
+Streams skills, interests, careers, career skills and roadmap entries from CSV or
+JSONL into the database. Names are deduplicated in memory against one preloaded
+name -> id map per table and rows go in with INSERT ... ON CONFLICT DO NOTHING in
+chunked transactions, so re-running an import only adds what is missing.
+
+    python bulk_import.py --skills skills.csv --careers careers.jsonl --career-skills career_skills.csv
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+from sqlalchemy import Boolean, Float, Integer, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database_models import db, Skill, Interest, Career, CareerSkill, Roadmap, RoadmapSkill
+
+TRUE_STRINGS = frozenset({'1', 'true', 'yes', 'y', 't'})
+
+
+def read_records(path):
+    """Yield dicts from a .csv (header row) or .jsonl file without loading it whole"""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def coerce_row(table, record, defaults=None):
+    """Keep only `table`'s columns, turning CSV strings into ints/floats/bools and '' into None"""
+    row = dict(defaults or {})
+    for column in table.columns:
+        if column.name not in record or column.primary_key:
+            continue
+        value = record[column.name]
+        if isinstance(value, str):
+            value = value.strip()
+            if value == '':
+                value = None
+            elif isinstance(column.type, Boolean):
+                value = value.lower() in TRUE_STRINGS
+            elif isinstance(column.type, Integer):
+                value = int(float(value))
+            elif isinstance(column.type, Float):
+                value = float(value)
+        if value is not None or column.name not in row:
+            row[column.name] = value
+    return row
+
+
+def group_by_columns(rows):
+    """Rows split into lists with the same keys. Records need not share a column set, and
+    one executemany needs every row to bind the same parameters; columns a record leaves
+    out are then filled by the table's defaults."""
+    groups = {}
+    for row in rows:
+        groups.setdefault(frozenset(row), []).append(row)
+    return list(groups.values())
+
+
+class BulkImporter:
+    """Chunked, idempotent catalog loader; `stats` holds per-table counts and timings"""
+
+    def __init__(self, session=None, chunk_size=5000):
+        self.session = session or db.session
+        self.chunk_size = chunk_size
+        self.stats = {}
+        self._ids = {}
+
+    def ids(self, model, column='name'):
+        """lowercased name -> id for every row of `model`, loaded once"""
+        key = (model, column)
+        if key not in self._ids:
+            name_column = getattr(model, column)
+            self._ids[key] = {name.lower(): id_ for id_, name in self.session.execute(select(model.id, name_column))}
+        return self._ids[key]
+
+    def _insert(self, table, rows):
+        """INSERT OR IGNORE one chunk in its own transaction; returns how many rows were new"""
+        if not rows:
+            return 0
+        inserted = 0
+        for group in group_by_columns(rows):
+            result = self.session.execute(sqlite_insert(table).on_conflict_do_nothing(), group)
+            inserted += max(result.rowcount, 0)
+        self.session.commit()
+        return inserted
+
+    def _record(self, name, read, inserted, started):
+        stats = self.stats.setdefault(name, {'read': 0, 'inserted': 0, 'seconds': 0.0})
+        stats['read'] += read
+        stats['inserted'] += inserted
+        stats['seconds'] += time.perf_counter() - started
+
+    def _import_named(self, stat_name, model, records, column='name', defaults=None):
+        """Master tables keyed by a unique name: skip names already present, then insert"""
+        started = time.perf_counter()
+        known = self.ids(model, column)
+        read = inserted = 0
+        for chunk in chunked(records, self.chunk_size):
+            read += len(chunk)
+            rows = {}
+            for record in chunk:
+                name = str(record.get(column) or '').strip()
+                if name and name.lower() not in known and name.lower() not in rows:
+                    rows[name.lower()] = coerce_row(model.__table__, dict(record, **{column: name}), defaults)
+            inserted += self._insert(model.__table__, list(rows.values()))
+            if rows:
+                # Pick up the new ids (and any a concurrent import added first)
+                names = [row[column] for row in rows.values()]
+                name_column = getattr(model, column)
+                for id_, name in self.session.execute(select(model.id, name_column).where(name_column.in_(names))):
+                    known[name.lower()] = id_
+        self._record(stat_name, read, inserted, started)
+        return inserted
+
+    def import_skills(self, records):
+        return self._import_named('skills', Skill, records, defaults={'category': 'technical'})
+
+    def import_interests(self, records):
+        return self._import_named('interests', Interest, records, defaults={'category': 'general'})
+
+    def import_careers(self, records):
+        return self._import_named('careers', Career, records, column='title', defaults={
+            'description': '', 'category': 'general', 'difficulty_level': 'intermediate'
+        })
+
+    def import_career_skills(self, records):
+        """Rows of {career, skill, importance_level, proficiency_required}; unknown skills are created"""
+        started = time.perf_counter()
+        careers = self.ids(Career, 'title')
+        read = inserted = 0
+        for chunk in chunked(records, self.chunk_size):
+            read += len(chunk)
+            self._import_named('skills (implied)', Skill, ({'name': record.get('skill')} for record in chunk),
+                               defaults={'category': 'technical'})
+            skills = self.ids(Skill)
+            rows = {}
+            for record in chunk:
+                career_id = careers.get(str(record.get('career') or '').strip().lower())
+                skill_id = skills.get(str(record.get('skill') or '').strip().lower())
+                if career_id is None or skill_id is None:
+                    continue
+                rows[(career_id, skill_id)] = coerce_row(CareerSkill.__table__, record, {
+                    'career_id': career_id, 'skill_id': skill_id,
+                    'importance_level': 'important', 'proficiency_required': 'intermediate'
+                })
+            # unique_career_skill makes the conflict clause skip pairs that already exist
+            inserted += self._insert(CareerSkill.__table__, list(rows.values()))
+        self._record('career_skills', read, inserted, started)
+        return inserted
+
+    def import_roadmap_entries(self, records):
+        """Rows of {career, phase_order, phase_title, skill, skill_order, resource_name, resource_link}.
+        Phases and entries have no unique constraint, so existing ones are preloaded and skipped here."""
+        started = time.perf_counter()
+        careers = self.ids(Career, 'title')
+        phases = {(career_id, order): id_ for id_, career_id, order in
+                  self.session.execute(select(Roadmap.id, Roadmap.career_id, Roadmap.phase_order))}
+        entries = set(self.session.execute(select(RoadmapSkill.roadmap_id, RoadmapSkill.skill_id)).tuples())
+        read = inserted = 0
+        for chunk in chunked(records, self.chunk_size):
+            read += len(chunk)
+            self._import_named('skills (implied)', Skill, ({'name': record.get('skill')} for record in chunk),
+                               defaults={'category': 'technical'})
+            skills = self.ids(Skill)
+
+            new_phases = {}
+            for record in chunk:
+                career_id = careers.get(str(record.get('career') or '').strip().lower())
+                if career_id is None or not record.get('phase_order'):
+                    continue
+                key = (career_id, int(float(record['phase_order'])))
+                if key not in phases and key not in new_phases:
+                    new_phases[key] = {
+                        'career_id': career_id, 'phase_order': key[1],
+                        'title': str(record.get('phase_title') or f"Phase {key[1]}").strip(),
+                        'difficulty_level': record.get('difficulty_level') or 'intermediate', 'is_active': True
+                    }
+            if new_phases:
+                self.session.execute(Roadmap.__table__.insert(), list(new_phases.values()))
+                career_ids = {career_id for career_id, _ in new_phases}
+                for id_, career_id, order in self.session.execute(
+                        select(Roadmap.id, Roadmap.career_id, Roadmap.phase_order).where(Roadmap.career_id.in_(career_ids))):
+                    phases.setdefault((career_id, order), id_)
+
+            rows = []
+            next_order = {}
+            for record in chunk:
+                career_id = careers.get(str(record.get('career') or '').strip().lower())
+                skill_id = skills.get(str(record.get('skill') or '').strip().lower())
+                roadmap_id = phases.get((career_id, int(float(record.get('phase_order') or 0))))
+                if roadmap_id is None or skill_id is None or (roadmap_id, skill_id) in entries:
+                    continue
+                entries.add((roadmap_id, skill_id))
+                next_order[roadmap_id] = next_order.get(roadmap_id, 0) + 1
+                rows.append(coerce_row(RoadmapSkill.__table__, record, {
+                    'roadmap_id': roadmap_id, 'skill_id': skill_id,
+                    'skill_order': next_order[roadmap_id], 'skill_type': 'recommended', 'is_required': True
+                }))
+            for group in group_by_columns(rows):
+                self.session.execute(RoadmapSkill.__table__.insert(), group)
+            self.session.commit()
+            inserted += len(rows)
+        self._record('roadmap_skills', read, inserted, started)
+        return inserted
+
+    def report(self):
+        lines = []
+        for name, stats in self.stats.items():
+            rate = stats['read'] / stats['seconds'] if stats['seconds'] else 0.0
+            lines.append(f"   - {name:<15} {stats['read']:>9} read {stats['inserted']:>9} new  {rate:>10.0f} rows/s")
+        return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default='margen_ai.db')
+    parser.add_argument('--skills', help='CSV/JSONL with name, category, subcategory, description')
+    parser.add_argument('--interests', help='CSV/JSONL with name, category, description')
+    parser.add_argument('--careers', help='CSV/JSONL with title, description, category, difficulty_level, ...')
+    parser.add_argument('--career-skills', help='CSV/JSONL with career, skill, importance_level, proficiency_required')
+    parser.add_argument('--roadmaps', help='CSV/JSONL with career, phase_order, phase_title, skill, skill_order, resource_name, resource_link')
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    from flask import Flask
+    from sqlite_tuning import configure_sqlite, install_sqlite_pragmas
+
+    app = Flask(__name__)
+    configure_sqlite(app, args.database)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    install_sqlite_pragmas(app, db)
+
+    print(f"📥 Importing into {os.path.abspath(args.database)}")
+    print("=" * 50)
+    started = time.perf_counter()
+    try:
+        with app.app_context():
+            db.create_all()
+            importer = BulkImporter(chunk_size=args.chunk_size)
+            if args.skills:
+                importer.import_skills(read_records(args.skills))
+            if args.interests:
+                importer.import_interests(read_records(args.interests))
+            if args.careers:
+                importer.import_careers(read_records(args.careers))
+            if args.career_skills:
+                importer.import_career_skills(read_records(args.career_skills))
+            if args.roadmaps:
+                importer.import_roadmap_entries(read_records(args.roadmaps))
+    except Exception as e:
+        print(f"❌ Import failed: {str(e)}")
+        sys.exit(1)
+
+    print("✅ Import completed")
+    print(importer.report())
+    print(f"⏱️  {time.perf_counter() - started:.1f}s total")
+
+
+if __name__ == '__main__':
+    main()
@@ -20,7 +20,7 @@ class User(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
-    password_hash = db.Column(db.String(128), nullable=False)
+    password_hash = db.Column(db.String(256), nullable=False)
     phone = db.Column(db.String(20), unique=True, nullable=True)
     first_name = db.Column(db.String(50), nullable=True)
     last_name = db.Column(db.String(50), nullable=True)
@@ -28,6 +28,10 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime, nullable=True)
     profile_completed = db.Column(db.Boolean, default=False)
+    profile_data = db.Column(db.Text, nullable=True)  # JSON string, the profile as last saved
+    # Bumped by every profile save (profile_store.save_user_profile): the ETag of GET /profile
+    # and the optimistic lock of PATCH /profile. Logins and rehashes leave it alone.
+    profile_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     
     # Relationships
     user_skills = db.relationship('UserSkill', backref='user', lazy=True, cascade='all, delete-orphan')
@@ -59,20 +63,30 @@ class User(db.Model):
         }
 
 class OTP(db.Model):
-    """OTP verification codes"""
+    """OTP verification codes: one live code per phone, stored as a salted hash"""
     __tablename__ = 'otps'
     
     id = db.Column(db.Integer, primary_key=True)
-    phone = db.Column(db.String(20), nullable=False, index=True)
-    code = db.Column(db.String(6), nullable=False)
+    phone = db.Column(db.String(20), unique=True, nullable=False, index=True)
+    code_hash = db.Column(db.String(100), nullable=False)  # salt:hmac-sha256
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    expires_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
     is_used = db.Column(db.Boolean, default=False)
     
     def is_expired(self):
         """Check if OTP is expired"""
         return datetime.utcnow() > self.expires_at
 
+class RevokedToken(db.Model):
+    """Session tokens signed out before they expired; rows can go once expires_at passes"""
+    __tablename__ = 'revoked_tokens'
+    
+    jti = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
 # -----------------------------------------------------------------------------
 # Skills and Interests Models
 # -----------------------------------------------------------------------------
@@ -240,6 +254,8 @@ class CareerRecommendation(db.Model):
     skill_gaps = db.Column(db.Text, nullable=True)  # JSON string with skill gaps
     learning_priority = db.Column(db.String(20), nullable=False)  # low, medium, high
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # One row per user and career; a new recommendation run refreshes it in place
+    __table_args__ = (db.Index('ux_career_recommendations_user_career', 'user_id', 'career_id', unique=True),)
     
     def to_dict(self):
         return {
@@ -269,6 +285,7 @@ class Roadmap(db.Model):
     estimated_duration = db.Column(db.String(50), nullable=True)
     difficulty_level = db.Column(db.String(20), nullable=False)
     is_active = db.Column(db.Boolean, default=True)
+    generated = db.Column(db.Boolean, nullable=False, default=False)  # written by Backend/roadmap_store.py, not curated
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -379,6 +396,7 @@ class AIInteraction(db.Model):
     prompt = db.Column(db.Text, nullable=False)
     response = db.Column(db.Text, nullable=False)
     model_used = db.Column(db.String(50), nullable=False)  # gemini-pro, etc.
+    prompt_version = db.Column(db.String(80), nullable=True)  # prompt template version id, e.g. find_interests@1+3f2a9c1d
     tokens_used = db.Column(db.Integer, nullable=True)
     processing_time_ms = db.Column(db.Integer, nullable=True)
     user_satisfaction = db.Column(db.Integer, nullable=True)  # 1-5 rating
@@ -392,6 +410,7 @@ class AIInteraction(db.Model):
             'prompt': self.prompt,
             'response': self.response,
             'model_used': self.model_used,
+            'prompt_version': self.prompt_version,
             'tokens_used': self.tokens_used,
             'processing_time_ms': self.processing_time_ms,
             'user_satisfaction': self.user_satisfaction,
@@ -423,6 +442,54 @@ class UserAnalytics(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
+class Job(db.Model):
+    """Background jobs for slow AI generations, run by Backend/job_worker.py"""
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    kind = db.Column(db.String(50), nullable=False)  # future_scope, roadmap, career_batch
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, completed, failed
+    payload = db.Column(db.Text, nullable=False)  # JSON string
+    result = db.Column(db.Text, nullable=True)  # JSON string
+    progress = db.Column(db.Text, nullable=True)  # JSON string
+    error = db.Column(db.Text, nullable=True)
+    attempts = db.Column(db.Integer, default=0)
+    worker_id = db.Column(db.String(100), nullable=True)
+    available_at = db.Column(db.DateTime, nullable=True)  # queued: not before; running: lease end
+    callback_url = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    __table_args__ = (db.Index('ix_jobs_status_created_at', 'status', 'created_at'),)
+
+    def to_dict(self, include_result=True):
+        data = {
+            'jobId': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': json.loads(self.progress) if self.progress else None,
+            'error': self.error,
+            'attempts': self.attempts,
+            'createdAt': self.created_at.isoformat() if self.created_at else None,
+            'startedAt': self.started_at.isoformat() if self.started_at else None,
+            'finishedAt': self.finished_at.isoformat() if self.finished_at else None
+        }
+        if include_result:
+            data['result'] = json.loads(self.result) if self.result else None
+        return data
+
+class InterviewTranscript(db.Model):
+    """Mock interview state shared by every worker, see Backend/interview_sessions.py"""
+    __tablename__ = 'interview_sessions'
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex, the client's sessionId
+    career_title = db.Column(db.String(200), nullable=False)
+    summary = db.Column(db.Text, nullable=False, default='')  # rolling summary of older turns
+    turns = db.Column(db.Text, nullable=False)  # JSON list of [role, text], oldest first
+    revision = db.Column(db.Integer, nullable=False, default=0)  # bumped by every saved turn
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # idle expiry
+
 # -----------------------------------------------------------------------------
 # Database Initialization Functions
 # -----------------------------------------------------------------------------
@@ -430,6 +497,9 @@ class UserAnalytics(db.Model):
 def init_database(app):
     """Initialize database with app"""
     db.init_app(app)
+    if app.config.get('SQLITE_PROFILE'):
+        from sqlite_tuning import install_sqlite_pragmas
+        install_sqlite_pragmas(app, db)
     
     with app.app_context():
         # Create all tables
@@ -469,11 +539,6 @@ def insert_initial_data():
         {'name': 'Project Management', 'category': 'domain', 'subcategory': 'management', 'description': 'Project planning and execution'},
     ]
     
-    for skill_data in initial_skills:
-        if not Skill.query.filter_by(name=skill_data['name']).first():
-            skill = Skill(**skill_data)
-            db.session.add(skill)
-    
     # Insert initial interests
     initial_interests = [
         {'name': 'Artificial Intelligence', 'category': 'technology', 'description': 'AI and machine learning'},
@@ -488,11 +553,6 @@ def insert_initial_data():
         {'name': 'Education', 'category': 'industry', 'description': 'Educational technology'},
     ]
     
-    for interest_data in initial_interests:
-        if not Interest.query.filter_by(name=interest_data['name']).first():
-            interest = Interest(**interest_data)
-            db.session.add(interest)
-    
     # Insert initial careers
     initial_careers = [
         {
@@ -545,13 +605,12 @@ def insert_initial_data():
         }
     ]
     
-    for career_data in initial_careers:
-        if not Career.query.filter_by(title=career_data['title']).first():
-            career = Career(**career_data)
-            db.session.add(career)
-    
-    # Commit all changes
-    db.session.commit()
+    # One preloaded name map and INSERT ... ON CONFLICT DO NOTHING per table
+    from bulk_import import BulkImporter
+    importer = BulkImporter(db.session)
+    importer.import_skills(initial_skills)
+    importer.import_interests(initial_interests)
+    importer.import_careers(initial_careers)
     print("✅ Initial data inserted successfully")
 
 # -----------------------------------------------------------------------------
@@ -579,7 +638,8 @@ def create_user(email, password, phone=None, first_name=None, last_name=None):
     db.session.commit()
     return user
 
-def log_ai_interaction(user_id, interaction_type, prompt, response, model_used, tokens_used=None, processing_time_ms=None):
+def log_ai_interaction(user_id, interaction_type, prompt, response, model_used, tokens_used=None, processing_time_ms=None,
+                       prompt_version=None):
     """Log AI interaction for analytics"""
     interaction = AIInteraction(
         user_id=user_id,
@@ -587,6 +647,7 @@ def log_ai_interaction(user_id, interaction_type, prompt, response, model_used,
         prompt=prompt,
         response=response,
         model_used=model_used,
+        prompt_version=prompt_version,
         tokens_used=tokens_used,
         processing_time_ms=processing_time_ms
     )
@@ -594,6 +655,61 @@ def log_ai_interaction(user_id, interaction_type, prompt, response, model_used,
     db.session.commit()
     return interaction
 
+def migrate_ai_interactions():
+    """Add the prompt_version column to an ai_interactions table created before it existed"""
+    from sqlalchemy import inspect, text
+    columns = {column['name'] for column in inspect(db.engine).get_columns('ai_interactions')}
+    if 'prompt_version' in columns:
+        return False
+    db.session.execute(text('ALTER TABLE ai_interactions ADD COLUMN prompt_version VARCHAR(80)'))
+    db.session.commit()
+    return True
+
+def migrate_roadmaps():
+    """Add the generated column to a roadmaps table created before it existed; roadmaps of
+    careers the roadmap store created are the generated ones"""
+    from sqlalchemy import inspect, text
+    columns = {column['name'] for column in inspect(db.engine).get_columns('roadmaps')}
+    if 'generated' in columns:
+        return False
+    db.session.execute(text('ALTER TABLE roadmaps ADD COLUMN generated BOOLEAN NOT NULL DEFAULT 0'))
+    db.session.execute(text(
+        "UPDATE roadmaps SET generated = 1 WHERE career_id IN (SELECT id FROM careers WHERE category = 'ai_generated')"
+    ))
+    db.session.commit()
+    return True
+
+def upsert_career_recommendations(rows):
+    """Insert CareerRecommendation rows given as dicts, updating the existing row for a
+    (user_id, career_id) pair instead of adding a duplicate. The caller commits."""
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+    if not rows:
+        return
+    rows = [dict(row, created_at=row.get('created_at') or datetime.utcnow()) for row in rows]
+    statement = sqlite_insert(CareerRecommendation.__table__)
+    updated = {column: statement.excluded[column] for column in rows[0] if column not in ('user_id', 'career_id')}
+    db.session.execute(
+        statement.on_conflict_do_update(index_elements=['user_id', 'career_id'], set_=updated),
+        rows
+    )
+
+def migrate_career_recommendations():
+    """Drop duplicate (user, career) recommendations, keeping the newest, and add the
+    unique index a career_recommendations table created before it lacks"""
+    from sqlalchemy import inspect, text
+    indexes = {index['name'] for index in inspect(db.engine).get_indexes('career_recommendations')}
+    if 'ux_career_recommendations_user_career' in indexes:
+        return False
+    db.session.execute(text(
+        'DELETE FROM career_recommendations WHERE id NOT IN '
+        '(SELECT MAX(id) FROM career_recommendations GROUP BY user_id, career_id)'
+    ))
+    db.session.execute(text(
+        'CREATE UNIQUE INDEX ux_career_recommendations_user_career ON career_recommendations (user_id, career_id)'
+    ))
+    db.session.commit()
+    return True
+
 def log_user_analytics(user_id, event_type, event_data=None, session_id=None, ip_address=None, user_agent=None):
     """Log user analytics event"""
     analytics = UserAnalytics(
@@ -8,6 +8,7 @@ import os
 import sys
 from flask import Flask
 from database_models import init_database, insert_initial_data, db
+from sqlite_tuning import configure_sqlite
 
 def main():
     """Initialize the database"""
@@ -16,7 +17,7 @@ def main():
     
     # Create Flask app for database initialization
     app = Flask(__name__)
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///margen_ai.db'
+    configure_sqlite(app, 'margen_ai.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['SECRET_KEY'] = 'your-secret-key-here'
     
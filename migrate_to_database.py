@@ -9,6 +9,8 @@ import sys
 import json
 from datetime import datetime
 from flask import Flask
+from sqlite_tuning import configure_sqlite
+from bulk_import import BulkImporter
 from database_models import (
     db, User, Skill, Interest, Career, UserSkill, UserInterest,
     CareerRecommendation, init_database
@@ -20,7 +22,7 @@ def migrate_mock_data():
     
     # Create Flask app for migration
     app = Flask(__name__)
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///margen_ai.db'
+    configure_sqlite(app, 'margen_ai.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['SECRET_KEY'] = 'migration-key'
     
@@ -74,22 +76,13 @@ def migrate_mock_data():
             }
         ]
         
-        for roadmap_data in mock_roadmaps:
-            existing_career = Career.query.filter_by(title=roadmap_data['title']).first()
-            if not existing_career:
-                career = Career(
-                    title=roadmap_data['title'],
-                    description=roadmap_data['description'],
-                    category=roadmap_data['category'],
-                    difficulty_level=roadmap_data['difficulty'],
-                    estimated_duration=roadmap_data['estimated_duration'],
-                    is_featured=roadmap_data['is_featured']
-                )
-                db.session.add(career)
-                print(f"✅ Migrated career: {roadmap_data['title']}")
-        
-        # Commit all changes
+        # Commit the users, then bulk-insert the careers that are not there yet
         db.session.commit()
+        migrated = BulkImporter(db.session).import_careers(
+            dict(roadmap_data, difficulty_level=roadmap_data['difficulty']) for roadmap_data in mock_roadmaps
+        )
+        print(f"✅ Migrated {migrated} careers")
+        
         print("✅ Migration completed successfully!")
 
 def create_sample_data():
@@ -98,9 +91,10 @@ def create_sample_data():
     
     # Create Flask app
     app = Flask(__name__)
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///margen_ai.db'
+    configure_sqlite(app, 'margen_ai.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['SECRET_KEY'] = 'sample-data-key'
+    db.init_app(app)
     
     with app.app_context():
         # Create sample user
@@ -115,6 +109,8 @@ def create_sample_data():
         db.session.add(sample_user)
         db.session.flush()
         
+        importer = BulkImporter(db.session)
+        
         # Add sample skills
         sample_skills = [
             {"name": "Python", "proficiency": "intermediate", "confidence": 7},
@@ -123,12 +119,13 @@ def create_sample_data():
             {"name": "Communication", "proficiency": "advanced", "confidence": 8}
         ]
         
+        skill_ids = importer.ids(Skill)
         for skill_data in sample_skills:
-            skill = Skill.query.filter_by(name=skill_data['name']).first()
-            if skill:
+            skill_id = skill_ids.get(skill_data['name'].lower())
+            if skill_id:
                 user_skill = UserSkill(
                     user_id=sample_user.id,
-                    skill_id=skill.id,
+                    skill_id=skill_id,
                     proficiency_level=skill_data['proficiency'],
                     confidence_score=skill_data['confidence'],
                     years_experience=1.0,
@@ -142,12 +139,13 @@ def create_sample_data():
             {"name": "Artificial Intelligence", "intensity": "medium", "confidence": 6}
         ]
         
+        interest_ids = importer.ids(Interest)
         for interest_data in sample_interests:
-            interest = Interest.query.filter_by(name=interest_data['name']).first()
-            if interest:
+            interest_id = interest_ids.get(interest_data['name'].lower())
+            if interest_id:
                 user_interest = UserInterest(
                     user_id=sample_user.id,
-                    interest_id=interest.id,
+                    interest_id=interest_id,
                     intensity_level=interest_data['intensity'],
                     confidence_score=interest_data['confidence']
                 )
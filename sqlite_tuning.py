@@ -0,0 +1,202 @@
+"""
+MARGEN AI - SQLite Engine Profiles
+WAL journaling, connection pragmas and pool settings for the app database,
+plus a separate read-only connection pool for read-heavy routes.
+
+Under gevent workers a lock wait inside SQLite's busy handler blocks the whole
+process (sqlite3 never yields to the hub), so there the busy timeout is dropped
+to zero and CooperativeConnection retries "database is locked" with time.sleep,
+which gevent patches into a yield, until the profile's busy timeout is spent.
+"""
+
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+READONLY_BIND = 'readonly'
+
+SQLITE_PROFILES = {
+    # SQLite's own defaults: rollback journal, full fsync on every commit
+    'default': {
+        'pragmas': {},
+        'busy_timeout_ms': 5000,
+        'pool_size': 5,
+        'max_overflow': 10,
+    },
+    # Readers never block the writer and commits skip the per-transaction fsync
+    # (durable at checkpoints); busy writers wait instead of raising "database is locked".
+    'production': {
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -64 * 1024,  # negative = KiB, so 64 MiB per connection
+            'temp_store': 'MEMORY',
+            'wal_autocheckpoint': 1000,
+        },
+        'busy_timeout_ms': 15000,
+        'pool_size': 10,
+        'max_overflow': 20,
+    },
+}
+
+
+# Backoff between lock retries: doubles from the first to the last value
+BUSY_RETRY_DELAYS = (0.001, 0.05)
+
+
+def _gevent_patched():
+    """True once gevent has monkey patched this process (gunicorn's gevent worker does before loading the app)"""
+    if 'gevent' not in sys.modules:
+        return False
+    from gevent import monkey
+    return monkey.is_module_patched('time')
+
+
+def _lock_wait_helps(error):
+    """True for "database is locked" errors that waiting can clear; a WAL snapshot
+    conflict (SQLITE_BUSY_SNAPSHOT) needs a new transaction, so it is raised at once"""
+    code = getattr(error, 'sqlite_errorcode', None)  # Python 3.11+
+    if code is not None:
+        return code == sqlite3.SQLITE_BUSY
+    return 'database is locked' in str(error)
+
+
+def _retry_busy(operation, wait_ms):
+    """Run `operation` until it stops failing on a held lock or `wait_ms` is spent"""
+    deadline = time.monotonic() + wait_ms / 1000.0
+    delay = BUSY_RETRY_DELAYS[0]
+    while True:
+        try:
+            return operation()
+        except sqlite3.OperationalError as e:
+            if not _lock_wait_helps(e) or time.monotonic() + delay > deadline:
+                raise
+        time.sleep(delay)
+        delay = min(delay * 2, BUSY_RETRY_DELAYS[1])
+
+
+class CooperativeCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        return _retry_busy(lambda: super(CooperativeCursor, self).execute(sql, parameters),
+                           self.connection.busy_wait_ms)
+
+    def executemany(self, sql, seq_of_parameters):
+        # The lock is taken by the first row, so a busy error means nothing ran yet;
+        # a list lets the retry walk the rows again
+        seq_of_parameters = list(seq_of_parameters)
+        return _retry_busy(lambda: super(CooperativeCursor, self).executemany(sql, seq_of_parameters),
+                           self.connection.busy_wait_ms)
+
+
+class CooperativeConnection(sqlite3.Connection):
+    """sqlite3 connection that waits for locks with time.sleep (a yield under gevent)
+    instead of inside SQLite. Open it with timeout=0 so SQLite reports a held lock at once;
+    busy_wait_ms is how long to keep retrying."""
+
+    busy_wait_ms = 15000
+
+    def cursor(self, factory=CooperativeCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        return _retry_busy(super().commit, self.busy_wait_ms)
+
+
+def _profile(name):
+    name = name or os.getenv('SQLITE_PROFILE', 'production')
+    if name not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE '{name}', expected one of {sorted(SQLITE_PROFILES)}")
+    return SQLITE_PROFILES[name]
+
+
+def configure_sqlite(app, database_path, profile=None, cooperative=None):
+    """Point `app` at `database_path` with the chosen profile; call before db.init_app(app).
+    `cooperative` (default: whether gevent has patched the process) waits for locks by
+    yielding instead of inside SQLite."""
+    settings = _profile(profile)
+    database_path = os.path.abspath(database_path)
+    pool = {
+        'pool_size': int(os.getenv('SQLITE_POOL_SIZE', settings['pool_size'])),
+        'max_overflow': int(os.getenv('SQLITE_MAX_OVERFLOW', settings['max_overflow'])),
+        'pool_timeout': 30,
+        'pool_recycle': 3600,
+    }
+    # Under gevent SQLite must not wait for locks itself; see CooperativeConnection
+    cooperative = _gevent_patched() if cooperative is None else cooperative
+    settings = dict(settings, cooperative=cooperative)
+    connect_args = {
+        'timeout': 0 if cooperative else settings['busy_timeout_ms'] / 1000.0,
+        # Pooled connections move between threads/greenlets; each is used by one at a time
+        'check_same_thread': False,
+    }
+    if cooperative:
+        connect_args['factory'] = CooperativeConnection
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + database_path
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(pool, connect_args=connect_args)
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds[READONLY_BIND] = dict(
+        pool,
+        url=f'sqlite:///file:{database_path}?mode=ro&uri=true',
+        connect_args=dict(connect_args, uri=True),
+    )
+    app.config['SQLALCHEMY_BINDS'] = binds
+    app.config['SQLITE_PROFILE'] = settings
+
+
+def install_sqlite_pragmas(app, db):
+    """Apply the profile's pragmas on every new connection; call right after db.init_app(app)"""
+    settings = app.config.get('SQLITE_PROFILE') or _profile(None)
+    with app.app_context():
+        engines = dict(db.engines)
+
+    for bind_key, engine in engines.items():
+        if engine.dialect.name != 'sqlite':
+            continue
+        readonly = bind_key == READONLY_BIND
+
+        def on_connect(dbapi_connection, connection_record, readonly=readonly):
+            if not isinstance(dbapi_connection, sqlite3.Connection):
+                return
+            if isinstance(dbapi_connection, CooperativeConnection):
+                dbapi_connection.busy_wait_ms = settings['busy_timeout_ms']
+            busy_timeout_ms = 0 if settings.get('cooperative') else settings['busy_timeout_ms']
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+            for pragma, value in settings['pragmas'].items():
+                # journal_mode is a property of the file; the writer pool sets it
+                if readonly and pragma in ('journal_mode', 'wal_autocheckpoint'):
+                    continue
+                cursor.execute(f"PRAGMA {pragma} = {value}")
+            if readonly:
+                cursor.execute("PRAGMA query_only = ON")
+            cursor.close()
+
+        event.listen(engine, 'connect', on_connect)
+
+
+@contextmanager
+def read_only_session(db):
+    """ORM session on the read-only pool (falls back to db.session without one).
+    Objects are detached when the block ends, so read what you need inside it."""
+    engine = db.engines.get(READONLY_BIND)
+    if engine is None:
+        yield db.session
+        return
+    session = Session(bind=engine)
+    try:
+        yield session
+    finally:
+        session.close()
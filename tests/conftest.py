@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'Backend'))
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Flask app on a throwaway SQLite file with every table created, inside an app context"""
+    from flask import Flask
+    from database_models import db
+    from sqlite_tuning import configure_sqlite, install_sqlite_pragmas
+
+    app = Flask(__name__)
+    configure_sqlite(app, str(tmp_path / 'test.db'))
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    install_sqlite_pragmas(app, db)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
@@ -0,0 +1,87 @@
+import gzip
+import random
+
+import pytest
+from flask import Flask, Response, request
+from werkzeug.datastructures import ETags
+
+from http_cache import HttpCaching, encoded_etag, etag_matches, negotiate_encoding
+
+BODY = 'career roadmap ' * 200  # compresses well
+RANDOM_BODY = random.Random(0).randbytes(2048)  # does not
+
+
+def test_negotiate_encoding_follows_quality_then_server_preference():
+    assert negotiate_encoding('gzip, br', ('br', 'gzip')) == 'br'
+    assert negotiate_encoding('br;q=0.5, gzip', ('br', 'gzip')) == 'gzip'
+    assert negotiate_encoding('*;q=0.1', ('gzip',)) == 'gzip'
+    assert negotiate_encoding('identity', ('br', 'gzip')) is None
+    assert negotiate_encoding(None, ('gzip',)) is None
+
+
+def test_etag_matches_any_encoding_of_a_tag():
+    assert encoded_etag('abc', 'gzip') == 'abc-gzip'
+    assert etag_matches(ETags(['abc-gzip']), 'abc')
+    assert etag_matches(ETags(['abc']), 'abc')
+    assert not etag_matches(ETags(['abd-gzip']), 'abc')
+    assert etag_matches(ETags(star_tag=True), 'abc')
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    HttpCaching(policies={'/static-ish': 'public, max-age=60'}).init_app(app)
+
+    @app.route('/doc')
+    def doc():
+        return Response(BODY, mimetype='text/plain')
+
+    @app.route('/static-ish')
+    def static_ish():
+        return Response(BODY, mimetype='text/plain')
+
+    @app.route('/profile', methods=['GET', 'PATCH'])
+    def profile():
+        body = BODY if request.args.get('body') != 'random' else RANDOM_BODY
+        response = Response(body, mimetype='application/json')
+        response.set_etag('profile-1-3')
+        return response
+
+    return app.test_client()
+
+
+def test_get_is_compressed_under_an_encoded_etag(client):
+    response = client.get('/doc', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data).decode() == BODY
+    tag, weak = response.get_etag()
+    assert tag.endswith('-gzip') and not weak
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+
+def test_if_none_match_from_another_encoding_gets_304(client):
+    plain_tag = client.get('/doc').get_etag()[0]
+    response = client.get('/doc', headers={'Accept-Encoding': 'gzip', 'If-None-Match': f'"{plain_tag}"'})
+    assert response.status_code == 304
+    assert response.get_etag()[0] == encoded_etag(plain_tag, 'gzip')
+    assert response.data == b''
+
+
+def test_route_policy_overrides_the_default(client):
+    assert client.get('/static-ish').headers['Cache-Control'] == 'public, max-age=60'
+    assert client.post('/doc').headers['Cache-Control'] == 'no-store'
+
+
+def test_views_own_etag_survives_a_response_that_does_not_compress(client):
+    response = client.patch('/profile?body=random', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_etag() == ('profile-1-3', False)
+
+
+def test_encoding_suffix_is_removed_again_when_compression_does_not_pay(client):
+    response = client.get('/profile?body=random', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_etag() == ('profile-1-3', False)
+    compressed = client.get('/profile', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.get_etag() == ('profile-1-3-gzip', False)
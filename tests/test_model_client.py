@@ -0,0 +1,126 @@
+import pytest
+
+import model_client
+from model_client import (CircuitBreaker, CircuitOpenError, ModelClient, ModelUnavailableError, SQLiteTokenBucket,
+                          TokenBucket, is_retryable)
+
+
+class FakeClock:
+    """Stands in for the time module inside model_client; sleep advances the clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    time = perf_counter = monotonic
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(model_client, 'time', clock)
+    return clock
+
+
+def test_token_bucket_allows_a_burst_then_paces(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.reserve() == 0.0
+    clock.now += 60
+    assert [bucket.reserve() for _ in range(4)][-1] > 0  # refills only up to capacity
+
+
+def test_sqlite_token_bucket_is_shared_by_every_instance(tmp_path, clock):
+    path = str(tmp_path / 'ratelimit.db')
+    first = SQLiteTokenBucket(rate=1, capacity=2, path=path)
+    second = SQLiteTokenBucket(rate=1, capacity=2, path=path)
+    assert first.reserve() == 0.0
+    assert second.reserve() == 0.0
+    assert first.reserve() == pytest.approx(1.0)
+
+
+class Upstream503(Exception):
+    code = 503
+
+
+def test_is_retryable():
+    assert is_retryable(TimeoutError())
+    assert is_retryable(Upstream503())
+    assert not is_retryable(ValueError('blocked prompt'))
+
+
+def test_breaker_opens_after_consecutive_failures_and_probes_once(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+    assert breaker.retry_after() == pytest.approx(30)
+
+    clock.now += 30
+    assert breaker.allow()  # the probe
+    assert not breaker.allow()  # only one at a time
+    breaker.record_failure()
+    assert breaker.state == 'open' and breaker.trips == 2
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.failures == 0
+
+
+def test_client_retries_retryable_errors_with_backoff(clock):
+    client = ModelClient(breaker=CircuitBreaker(failure_threshold=5), max_attempts=3)
+    calls = []
+
+    def flaky(timeout):
+        calls.append(timeout)
+        if len(calls) < 3:
+            raise Upstream503()
+        return 'answer'
+
+    assert client.call('/generate-careers', flaky) == 'answer'
+    assert len(calls) == 3 and len(clock.slept) == 2
+    assert client.stats()['retries_by_route'] == {'/generate-careers': 2}
+
+
+def test_client_gives_up_and_raises_model_unavailable(clock):
+    client = ModelClient(breaker=CircuitBreaker(failure_threshold=10), max_attempts=2)
+    with pytest.raises(ModelUnavailableError):
+        client.call('/x', lambda timeout: (_ for _ in ()).throw(TimeoutError()))
+    assert client.stats()['failed'] == 1
+
+
+def test_client_passes_non_retryable_errors_through_without_tripping(clock):
+    breaker = CircuitBreaker(failure_threshold=1)
+    client = ModelClient(breaker=breaker)
+    with pytest.raises(ValueError):
+        client.call('/x', lambda timeout: (_ for _ in ()).throw(ValueError('safety block')))
+    assert breaker.state == 'closed'
+
+
+def test_client_rejects_calls_while_the_circuit_is_open(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    client = ModelClient(breaker=breaker)
+    with pytest.raises(CircuitOpenError) as error:
+        client.call('/x', lambda timeout: 'never called')
+    assert error.value.retry_after == pytest.approx(30)
+    assert client.stats()['rejected'] == 1
+
+
+def test_client_fails_fast_when_the_rate_limit_wait_passes_the_deadline(clock):
+    client = ModelClient(limiter=TokenBucket(rate=0.01, capacity=1), default_deadline=5)
+    assert client.call('/x', lambda timeout: 'first') == 'first'
+    with pytest.raises(ModelUnavailableError):
+        client.call('/x', lambda timeout: 'second')
+    assert client.breaker.state == 'closed'
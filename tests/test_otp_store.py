@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+from database_models import db, OTP
+from otp_store import OTPStore, load_or_create_secret
+
+PHONE = '+15550001111'
+
+
+@pytest.fixture
+def store(app):
+    return OTPStore(app, ttl=timedelta(minutes=5), secret='test-secret', max_attempts=3, sweep_interval=0)
+
+
+def wrong(code):
+    return '000000' if code != '000000' else '111111'
+
+
+def test_a_code_verifies_once(store):
+    code = store.issue(PHONE)
+    assert db.session.query(OTP.code_hash).filter(OTP.phone == PHONE).scalar() != code  # never stored in plain text
+    assert store.verify(PHONE, code) == 'ok'
+    assert store.verify(PHONE, code) == 'invalid'
+
+
+def test_wrong_guesses_lock_the_code_even_for_the_right_one(store):
+    code = store.issue(PHONE)
+    assert [store.verify(PHONE, wrong(code)) for _ in range(3)] == ['invalid'] * 3
+    assert store.verify(PHONE, code) == 'locked'
+
+
+def test_a_new_code_resets_the_attempts(store):
+    code = store.issue(PHONE)
+    for _ in range(3):
+        store.verify(PHONE, wrong(code))
+    code = store.issue(PHONE)
+    assert store.verify(PHONE, code) == 'ok'
+
+
+def test_concurrent_guesses_never_exceed_the_attempt_limit(app, store):
+    code = store.issue(PHONE)
+
+    def guess(_):
+        with app.app_context():
+            return store.verify(PHONE, wrong(code))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(guess, range(16)))
+    assert results.count('invalid') == 3
+    assert results.count('locked') == 13
+
+
+def test_expired_and_unknown_codes(store):
+    code = store.issue(PHONE)
+    db.session.query(OTP).update({'expires_at': datetime.utcnow() - timedelta(seconds=1)})
+    db.session.commit()
+    assert store.verify(PHONE, code) == 'expired'
+    assert store.verify('+15559999999', code) == 'invalid'
+    assert store.sweep() == 1
+
+
+def test_store_refuses_an_empty_secret(app):
+    with pytest.raises(ValueError):
+        OTPStore(app, ttl=timedelta(minutes=5), secret='')
+
+
+def test_load_or_create_secret_keeps_the_first_value(tmp_path):
+    path = str(tmp_path / '.otp_secret')
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        secrets = set(pool.map(load_or_create_secret, [path] * 16))
+    assert len(secrets) == 1
+    assert load_or_create_secret(path) in secrets
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['.otp_secret']
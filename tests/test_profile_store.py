@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy.orm.attributes import set_committed_value
+
+from database_models import db, User
+from profile_store import ProfileConflict, merge_patch, save_user_profile, user_with_profile
+
+
+def test_merge_patch_merges_objects_and_replaces_everything_else():
+    target = {'pace': 'Balanced', 'goals': {'short': 'learn', 'long': 'lead'}, 'skills': ['Python', 'SQL']}
+    patch = {'goals': {'long': None, 'mid': 'ship'}, 'skills': ['Go'], 'pace': None}
+    assert merge_patch(target, patch) == {'goals': {'short': 'learn', 'mid': 'ship'}, 'skills': ['Go']}
+    assert target['goals'] == {'short': 'learn', 'long': 'lead'}  # the target is not modified
+
+
+def test_merge_patch_with_a_non_object_patch_replaces_the_target():
+    assert merge_patch({'a': 1}, ['x']) == ['x']
+    assert merge_patch('old', {'a': {'b': None}}) == {'a': {}}
+
+
+def make_user(email='profile@example.com'):
+    user = User(email=email)
+    user.set_password('profile-test')
+    db.session.add(user)
+    db.session.commit()
+    return user_with_profile(db.session, user.id)
+
+
+def test_save_user_profile_bumps_the_version_only_on_change(app):
+    user = make_user()
+    version = user.profile_version
+    assert save_user_profile(user, {'skills': ['Python'], 'pace': 'Fast'})
+    db.session.commit()
+    assert user.profile_version == version + 1
+    assert not save_user_profile(user, {'skills': ['Python'], 'pace': 'Fast'})
+    assert [user_skill.skill.name for user_skill in user.user_skills] == ['Python']
+
+
+def test_save_user_profile_rejects_a_stale_copy(app):
+    user = make_user()
+    user_id, stale_version = user.id, user.profile_version
+    assert save_user_profile(user, {'pace': 'Fast'})
+    db.session.commit()
+    db.session.expunge_all()
+
+    stale = user_with_profile(db.session, user_id)
+    set_committed_value(stale, 'profile_version', stale_version)  # as loaded by a request that started earlier
+    with pytest.raises(ProfileConflict):
+        save_user_profile(stale, {'pace': 'Slow'})
+    db.session.rollback()
+    assert db.session.get(User, user_id).profile_version == stale_version + 1
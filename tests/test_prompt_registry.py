@@ -0,0 +1,69 @@
+import pytest
+
+from prompt_registry import ELLIPSIS, PromptRegistry, PromptTemplate, estimate_tokens, trim_text
+
+
+def test_trim_text_cuts_on_a_word_boundary():
+    assert trim_text('short', 10) == 'short'
+    trimmed = trim_text('alpha beta gamma delta epsilon', 4)  # 16 characters
+    assert trimmed == 'alpha beta' + ELLIPSIS
+
+
+def test_template_is_dedented_and_versioned():
+    template = PromptTemplate('greet', 2, """
+        Hello {name}, welcome to {place}.
+        Bye {name}.
+    """)
+    assert template.text == 'Hello {name}, welcome to {place}.\nBye {name}.'
+    assert template.fields == ('name', 'place', 'name')
+    assert template.version_id.startswith('greet@2+')
+    assert template.version_id != PromptTemplate('greet', 2, 'Hi {name}').version_id
+
+
+def test_template_rejects_format_specs_and_unknown_trim_fields():
+    with pytest.raises(ValueError):
+        PromptTemplate('bad', 1, 'Score {score:.2f}')
+    with pytest.raises(ValueError):
+        PromptTemplate('bad', 1, 'Hi {name}', trim=('other',))
+
+
+def test_render_fills_fields_and_counts_tokens():
+    registry = PromptRegistry()
+    registry.register(PromptTemplate('greet', 1, 'Hello {person}, welcome to {place}.'))
+    prompt = registry.render('greet', person='Ada', place=42)
+    assert prompt.text == 'Hello Ada, welcome to 42.'
+    assert prompt.version == registry.version('greet')
+    assert prompt.trimmed == ()
+    assert prompt.tokens == estimate_tokens('Hello , welcome to .') + estimate_tokens('Ada') + estimate_tokens('42')
+    with pytest.raises(ValueError):
+        registry.register(PromptTemplate('greet', 2, 'Hi {person}'))
+
+
+def test_render_caps_each_user_field():
+    registry = PromptRegistry(max_field_tokens=5)
+    registry.register(PromptTemplate('profile', 1, 'Skills: {skills}. Role: {role}', trim=('skills',)))
+    prompt = registry.render('profile', skills='python ' * 50, role='engineer ' * 50)
+    skills = prompt.text.split('. Role: ')[0][len('Skills: '):]
+    assert skills.endswith(ELLIPSIS) and len(skills) <= 5 * 4 + 1
+    assert prompt.text.endswith('engineer ' * 49 + 'engineer ')  # not in `trim`, never cut
+    assert prompt.trimmed == ('skills',)
+
+
+def test_render_shares_the_budget_and_trims_the_largest_field_first():
+    registry = PromptRegistry(max_field_tokens=1000)
+    registry.register(PromptTemplate('profile', 1, 'I like {interests} and know {skills}.', budget=60,
+                                     trim=('interests', 'skills')))
+    prompt = registry.render('profile', interests='chess', skills='word ' * 400)
+    assert 'chess' in prompt.text  # small fields keep their text
+    assert prompt.trimmed == ('skills',)
+    assert prompt.tokens <= 60
+    assert registry.stats()['profile']['trimmed'] == 1
+
+
+def test_counted_template_tokens_replace_the_estimate():
+    registry = PromptRegistry(count_tokens=lambda text: 1000)
+    template = registry.register(PromptTemplate('greet', 1, 'Hello {person}'))
+    assert registry.template_tokens(template) == estimate_tokens('Hello ')
+    assert registry.count_templates() == 1
+    assert registry.template_tokens(template) == 1000
+    assert registry.count_templates() == 0  # counted once per version
@@ -0,0 +1,34 @@
+from database_models import db, Career, Roadmap
+from roadmap_store import RoadmapStore, validate_roadmap
+
+MILESTONES = validate_roadmap([
+    {'title': 'Foundations', 'skills': [{'name': 'Python', 'resource': {'name': 'Docs', 'link': 'https://docs.python.org'}}]},
+    {'title': 'Modeling', 'skills': [{'name': 'Statistics', 'resource': None}]},
+])
+
+
+def test_generated_roadmaps_round_trip_and_replace_each_other(app):
+    store = RoadmapStore(app, generate=None)
+    store.save('Data  Scientist', MILESTONES)
+    store.save('Data Scientist', MILESTONES[:1])
+    milestones, generated_at = store.lookup('data scientist')
+    assert milestones == MILESTONES[:1]
+    assert generated_at is not None
+    assert Roadmap.query.count() == 1
+
+
+def test_curated_roadmaps_are_kept_and_never_go_stale(app):
+    career = Career(title='UX Designer', description='Curated', category='design', difficulty_level='beginner')
+    career.roadmaps.append(Roadmap(title='Research', phase_order=1, difficulty_level='beginner'))
+    db.session.add(career)
+    db.session.commit()
+
+    store = RoadmapStore(app, generate=None)
+    milestones, generated_at = store.lookup('UX Designer')
+    assert [milestone['title'] for milestone in milestones] == ['Research']
+    assert generated_at is None and not store.is_stale(generated_at)
+
+    store.save('UX Designer', MILESTONES)
+    curated = Roadmap.query.filter_by(title='Research').one()
+    assert curated.is_active is False and curated.generated is False
+    assert [milestone['title'] for milestone in store.lookup('UX Designer')[0]] == ['Foundations', 'Modeling']
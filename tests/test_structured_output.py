@@ -0,0 +1,75 @@
+import pytest
+
+from structured_output import ROADMAP_SCHEMA, ResponseFormat, SchemaError, conform, repair_json
+
+
+def test_repair_json_drops_prose_fences_and_trailing_commas():
+    text = 'Sure! Here it is:\n```json\n[{"title": "A", "n": 1,}, {"title": "B"},]\n```\nHope that helps.'
+    assert repair_json(text) == [{'title': 'A', 'n': 1}, {'title': 'B'}]
+
+
+def test_repair_json_stops_after_the_first_value():
+    assert repair_json('{"a": [1, 2]} and then {"b": 3}') == {'a': [1, 2]}
+
+
+def test_repair_json_closes_a_truncated_answer_after_its_last_complete_element():
+    assert repair_json('[{"title": "A"}, {"title": "B"}, {"title": "C", "desc') == [
+        {'title': 'A'}, {'title': 'B'}, {'title': 'C'}]
+    assert repair_json('[{"title": "A"}, {"title": "B", "tags": ["x", "y') == [{'title': 'A'}, {'title': 'B', 'tags': ['x']}]
+
+
+def test_repair_json_keeps_brackets_inside_strings():
+    assert repair_json('{"a": "x ] } [ y", "b": "q\\"]"}') == {'a': 'x ] } [ y', 'b': 'q"]'}
+
+
+def test_repair_json_without_json_raises():
+    with pytest.raises(ValueError):
+        repair_json('no json here')
+
+
+SCHEMA = {
+    'type': 'array',
+    'min_items': 1,
+    'max_items': 2,
+    'items': {
+        'type': 'object',
+        'required': ['title'],
+        'properties': {
+            'title': {'type': 'string'},
+            'match': {'type': 'integer'},
+            'remote': {'type': 'boolean'},
+        },
+    },
+}
+
+
+def test_conform_cleans_values_and_drops_unknown_keys():
+    value = [{'title': '  Data Scientist ', 'match': '87.6%', 'extra': 1}]
+    assert conform(value, SCHEMA) == [{'title': 'Data Scientist', 'match': 88}]
+
+
+def test_conform_drops_items_and_optional_fields_that_do_not_fit():
+    dropped = []
+    value = [{'title': 'A', 'remote': 'yes'}, {'title': ''}, {'title': 'C'}, {'title': 'D'}]
+    assert conform(value, SCHEMA, dropped=dropped) == [{'title': 'A'}, {'title': 'C'}]
+    assert dropped == ['$[0].remote', '$[1]']
+
+
+def test_conform_wraps_a_lone_object_in_a_list():
+    assert conform({'title': 'A'}, SCHEMA) == [{'title': 'A'}]
+
+
+def test_conform_raises_when_required_data_is_missing():
+    with pytest.raises(SchemaError):
+        conform([{'match': 3}], SCHEMA)
+    with pytest.raises(SchemaError):
+        conform({'title': 'A'}, {'type': 'array', 'items': {'type': 'string'}})
+
+
+def test_response_format_reports_repaired_answers():
+    response_format = ResponseFormat(ROADMAP_SCHEMA)
+    clean = '[{"title": "Basics", "skills": [{"name": "Python"}]}]'
+    assert response_format.parse_with_outcome(clean)[1] == 'clean'
+    value, outcome = response_format.parse_with_outcome(clean[:-1] + ', {"title": "Adv')
+    assert outcome == 'repaired'
+    assert [milestone['title'] for milestone in value] == ['Basics']